@@ -0,0 +1,331 @@
+# Scripts/benchmark.py
+"""
+Offline benchmark suite for the RAG index and the agentic pipeline.
+
+Stages (each can be skipped):
+  load      - time load_documents() and the parallel iter_document_chunks()
+  index     - time create_vector_store() into a throwaway directory
+  retrieval - latency and known-item recall@k for several TOP_K values
+  pipeline  - end-to-end debug_pipeline over Test_inputs/ and generated
+              tracebacks, with the LLM replaced by a deterministic local stand-in
+
+Nothing touches the network: Hugging Face is forced offline (the embedding
+model must already be in the local cache) and no Anthropic calls are made.
+Results go to a JSON file so runs can be compared across commits:
+
+    python Scripts/benchmark.py --out bench.json --max-chunks 2000 --jobs 40
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+os.environ.setdefault("RETRY_BACKOFF_SECONDS", "0")   # measure work, not the pause between attempts
+
+# ensure project root is on sys.path so `rag`/`agents` are importable
+this_file = Path(__file__).resolve()
+project_root = this_file.parent.parent  # two levels: Scripts/ -> project root
+sys.path.insert(0, str(project_root))
+
+from config import TOP_K_RESULTS  # noqa: E402
+
+
+# ---------- deterministic stand-in model ----------
+class LocalStubLLM:
+    """
+    Deterministic replacement for ChatAnthropic.predict(). Root-cause prompts
+    get a canned analysis; patch prompts get a patch that runs the user's code
+    under a try/except, except for roughly one prompt in `fail_every`, which
+    gets a failing patch so retries are exercised too.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, fail_every: int = 3):
+        self.latency = latency_ms / 1000.0
+        self.fail_every = max(0, fail_every)
+        self.calls = 0
+        self.prompt_chars = 0
+
+    def predict(self, prompt: str) -> str:
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if self.latency:
+            time.sleep(self.latency)
+        digest = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16)
+
+        if prompt.startswith("You are an expert Python debugging assistant"):
+            return ("1) Probable cause: the failing operation receives a value it cannot handle.\n"
+                    "   Diagnostic: print the inputs right before the failing line.\n"
+                    "2) Preferred fix: guard the failing operation.")
+
+        if self.fail_every and digest % self.fail_every == 0:
+            return "```python\nraise RuntimeError('stub patch did not fix the issue')\n```"
+
+        snippet = ""
+        marker = "User code (if provided):\n"
+        if marker in prompt:
+            snippet = prompt.split(marker, 1)[1].split("\n\n- If you", 1)[0]
+            if snippet.strip() == "None":
+                snippet = ""
+        return (
+            "```python\n"
+            f"_src = {snippet!r}\n"
+            "try:\n"
+            "    exec(compile(_src, 'snippet', 'exec'))\n"
+            "except Exception as e:\n"
+            "    print('handled', type(e).__name__)\n"
+            "```"
+        )
+
+
+class _StubDoc:
+    def __init__(self, page_content: str):
+        self.page_content = page_content
+
+
+class _StubRetriever:
+    """Used when no index was built in this run (e.g. --skip load,index)."""
+
+    def get_relevant_documents(self, query):
+        return [_StubDoc("Built-in Exceptions: IndexError is raised when a sequence "
+                         "subscript is out of range.")]
+
+
+# ---------- helpers ----------
+def _peak_rss_mb() -> dict:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def _pct(values, pct):
+    from batch import _percentile
+    return _percentile(values, pct)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=project_root, capture_output=True,
+                              text=True).stdout.strip()
+    except Exception:
+        return ""
+
+
+def generate_tracebacks(n: int, seed: int = 0):
+    """Synthetic CI-style error logs with varying paths, lines and values."""
+    rng = random.Random(seed)
+    templates = [
+        ("IndexError", "list index out of range", "items = [1, 2, 3]\nprint(items[{v}])\n"),
+        ("KeyError", "'{w}'", "cfg = {{'a': 1}}\nprint(cfg['{w}'])\n"),
+        ("ZeroDivisionError", "division by zero", "total = {v}\nprint(total / 0)\n"),
+        ("TypeError", "can only concatenate str (not \"int\") to str", "print('n=' + {v})\n"),
+        ("AttributeError", "'NoneType' object has no attribute '{w}'", "obj = None\nobj.{w}()\n"),
+        ("NameError", "name '{w}' is not defined", "print({w})\n"),
+    ]
+    words = ["user_id", "config", "payload", "session", "retries", "token"]
+    jobs = []
+    for i in range(n):
+        exc, msg, code = templates[i % len(templates)]
+        v, w = rng.randint(3, 999), rng.choice(words)
+        path = f"/builds/{rng.randint(1000, 9999)}/src/module_{i % 7}.py"
+        line = rng.randint(2, 400)
+        log = (
+            f"2024-01-{1 + i % 28:02d} 12:{i % 60:02d}:00 ERROR job failed\n"
+            "Traceback (most recent call last):\n"
+            f'  File "{path}", line {line}, in <module>\n'
+            f"    main()\n"
+            f'  File "{path}", line {line - 1}, in main\n'
+            f"    handle()\n"
+            f"{exc}: {msg.format(v=v, w=w)}\n"
+        )
+        jobs.append({"id": f"gen-{i}", "error_log": log, "user_code_snippet": code.format(v=v, w=w)})
+    return jobs
+
+
+def test_input_jobs():
+    """Run each Test_inputs/*.py file to capture its real traceback."""
+    jobs = []
+    for path in sorted((project_root / "Test_inputs").glob("*.py")):
+        code = path.read_text(encoding="utf-8")
+        r = subprocess.run([sys.executable, str(path)], capture_output=True, text=True, timeout=30)
+        if r.returncode != 0 and r.stderr.strip():
+            jobs.append({"id": path.name, "error_log": r.stderr, "user_code_snippet": code})
+    return jobs
+
+
+# ---------- stages ----------
+def bench_load(docs_dir: str, workers: int):
+    from rag.document_loader import load_documents, iter_document_chunks
+
+    t0 = time.perf_counter()
+    docs = load_documents(docs_dir)
+    serial = time.perf_counter() - t0
+
+    parse_times = {}
+    t0 = time.perf_counter()
+    n_stream = sum(1 for _ in iter_document_chunks(docs_dir, workers=workers, parse_times=parse_times))
+    parallel = time.perf_counter() - t0
+
+    slowest = sorted(parse_times.items(), key=lambda kv: kv[1], reverse=True)[:5]
+    return docs, {
+        "chunks": len(docs),
+        "serial_seconds": serial,
+        "parallel_seconds": parallel,
+        "parallel_workers": workers or os.cpu_count(),
+        "parallel_chunks": n_stream,
+        "slowest_files": {os.path.basename(p): s for p, s in slowest},
+        "chunks_per_second_serial": len(docs) / serial if serial else 0.0,
+    }
+
+
+def bench_index(docs, persist_dir: str, max_chunks: int):
+    from rag.vector_store import create_vector_store
+
+    sample = docs[:max_chunks] if max_chunks else docs
+    t0 = time.perf_counter()
+    create_vector_store(sample, collection_name="autodoc", persist_directory=persist_dir, backend="chroma")
+    elapsed = time.perf_counter() - t0
+    return sample, {
+        "chunks": len(sample),
+        "seconds": elapsed,
+        "chunks_per_second": len(sample) / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_retrieval(sample, persist_dir: str, ks, n_queries: int, seed: int = 0):
+    from rag.vector_store import load_langchain_vectorstore
+    from rag.retriever import DocRetriever
+
+    t0 = time.perf_counter()
+    retriever = DocRetriever(load_langchain_vectorstore(persist_directory=persist_dir),
+                             persist_directory=persist_dir, backend="chroma")
+    retriever.embed_query("warm up")
+    open_seconds = time.perf_counter() - t0
+
+    rng = random.Random(seed)
+    targets = rng.sample(sample, min(n_queries, len(sample)))
+    out = {"open_seconds": open_seconds, "queries": len(targets), "by_k": {}}
+    for k in ks:
+        embed_lat, search_lat, hits = [], [], 0
+        for doc in targets:
+            query = doc.page_content[:300]
+            t0 = time.perf_counter()
+            vec = retriever.embed_query(query)
+            t1 = time.perf_counter()
+            results = retriever.search_by_vector(vec, k)
+            t2 = time.perf_counter()
+            embed_lat.append(t1 - t0)
+            search_lat.append(t2 - t1)
+            hits += any(r.page_content == doc.page_content for r in results)
+        out["by_k"][str(k)] = {
+            "recall": hits / len(targets) if targets else 0.0,
+            "embed_p50_ms": 1000 * _pct(embed_lat, 50),
+            "embed_p95_ms": 1000 * _pct(embed_lat, 95),
+            "search_p50_ms": 1000 * _pct(search_lat, 50),
+            "search_p95_ms": 1000 * _pct(search_lat, 95),
+        }
+    return out
+
+
+def bench_pipeline(jobs, concurrency: int, max_attempts: int, stub: LocalStubLLM, persist_dir=None):
+    import registry
+    from batch import run_batch, BatchStats
+    from agents.llm_cache import LLMResponseCache
+    from agents.fix_memory import FixMemory
+    from agents.retriever_agent import RetrieverAgent
+    from agents.root_cause_agent import RootCauseAgent
+    from agents.patch_generator_agent import PatchGeneratorAgent
+
+    # caches off: every job pays the full pipeline, so runs are comparable
+    no_cache = LLMResponseCache(enabled=False)
+    registry.set_instance("root_cause_agent", RootCauseAgent(cache=no_cache, llm=stub))
+    registry.set_instance("patch_generator_agent", PatchGeneratorAgent(cache=no_cache, llm=stub))
+    registry.set_instance("fix_memory", FixMemory(enabled=False))
+    if persist_dir is None:
+        registry.set_instance("retriever_agent", RetrieverAgent(_StubRetriever()))
+    else:
+        from rag.vector_store import load_langchain_vectorstore
+        from rag.retriever import DocRetriever
+        registry.set_instance("retriever_agent", RetrieverAgent(
+            DocRetriever(load_langchain_vectorstore(persist_directory=persist_dir), persist_directory=persist_dir,
+                         backend="chroma")))
+    registry.warm_up()
+
+    stats = BatchStats()
+    for _ in run_batch(jobs, concurrency=concurrency, max_attempts=max_attempts, stats=stats):
+        pass
+    summary = stats.summary()
+    summary["llm_calls"] = stub.calls
+    summary["avg_prompt_chars"] = stub.prompt_chars / stub.calls if stub.calls else 0.0
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the RAG index and pipeline.")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--docs", default=os.path.join(project_root, "data", "docs"))
+    parser.add_argument("--skip", default="", help="comma-separated stages to skip: load,index,retrieval,pipeline")
+    parser.add_argument("--workers", type=int, default=0, help="parser processes for the parallel load")
+    parser.add_argument("--max-chunks", type=int, default=2000, help="chunks to index (0 = all)")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", default=f"1,3,{TOP_K_RESULTS},10")
+    parser.add_argument("--jobs", type=int, default=30, help="generated tracebacks for the pipeline stage")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="simulated LLM latency")
+    args = parser.parse_args(argv)
+
+    skip = {s.strip() for s in args.skip.split(",") if s.strip()}
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "stages": {},
+    }
+    tmp_db = tempfile.mkdtemp(prefix="bench_vector_db_")
+    docs = sample = None
+    try:
+        if "load" not in skip or "index" not in skip:
+            print("== load ==")
+            docs, results["stages"]["load"] = bench_load(args.docs, args.workers)
+        if "index" not in skip and docs:
+            print("== index ==")
+            sample, results["stages"]["index"] = bench_index(docs, tmp_db, args.max_chunks)
+        if "retrieval" not in skip and sample:
+            print("== retrieval ==")
+            ks = [int(k) for k in args.k.split(",") if k.strip()]
+            results["stages"]["retrieval"] = bench_retrieval(sample, tmp_db, ks, args.queries)
+        if "pipeline" not in skip:
+            print("== pipeline ==")
+            jobs = test_input_jobs() + generate_tracebacks(args.jobs)
+            stub = LocalStubLLM(latency_ms=args.stub_latency_ms)
+            results["stages"]["pipeline"] = bench_pipeline(
+                jobs, args.concurrency, args.max_attempts, stub, tmp_db if sample else None
+            )
+    finally:
+        shutil.rmtree(tmp_db, ignore_errors=True)
+
+    results["peak_rss_mb"] = _peak_rss_mb()
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 # Scripts/build_index.py
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # ensure project root is on sys.path so `rag` package is importable
@@ -8,10 +9,44 @@ this_file = Path(__file__).resolve()
 project_root = this_file.parent.parent  # two levels: Scripts/ -> project root
 sys.path.insert(0, str(project_root))
 
-from rag.document_loader import load_documents
-from rag.vector_store import create_vector_store
+from rag.document_loader import iter_document_chunks
+from rag.vector_store import create_vector_store, update_vector_store
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index documentation into the Chroma vector DB.")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only re-embed new/changed files and purge removed ones (uses the index manifest)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="parser processes (default: LOADER_WORKERS or cpu count; 1 = serial)",
+    )
+    parser.add_argument(
+        "--embed-workers", type=int, default=None,
+        help="embedding processes on CPU (default: EMBEDDING_WORKERS; 0 = cpu count, 1 = in-process)",
+    )
+    parser.add_argument(
+        "--quantization-report", action="store_true",
+        help="don't build; print int8 recall-vs-memory figures for the existing flat store (VECTOR_BACKEND=flat)",
+    )
+    args = parser.parse_args()
+
+    if args.quantization_report:
+        from config import VECTOR_DB_PATH, TOP_K_RESULTS
+        from rag.flat_store import flat_store_dir, quantization_report
+        try:
+            report = quantization_report(flat_store_dir(VECTOR_DB_PATH, "autodoc"), k=TOP_K_RESULTS)
+        except FileNotFoundError as e:
+            print(f"❌ {e}. Build the index with VECTOR_BACKEND=flat first.")
+            sys.exit(1)
+        print(f"{report['chunks']} chunks x {report['dim']} dims, recall@{report['k']} vs exact float32 search")
+        for layout, nbytes in report["bytes"].items():
+            print(f"  {layout:<11} {nbytes / 2**20:9.1f} MiB")
+        for shortlist, recall in report["recall"].items():
+            print(f"  int8, {shortlist:<14} recall {recall:.3f}")
+        sys.exit(0)
+
     docs_dir = os.path.join(project_root, "data", "docs")
     print(f"Project root: {project_root}")
     print(f"Looking for documents in: {docs_dir}\n")
@@ -21,15 +56,25 @@ if __name__ == "__main__":
         sys.exit(1)
 
     try:
-        print("Loading documents ... (this may take a moment for PDFs)")
-        docs = load_documents(docs_dir)
-        print(f"\nTotal chunks returned by loader: {len(docs)}")
-        if len(docs) == 0:
+        if args.incremental:
+            print("Updating vector store incrementally ...")
+            update_vector_store(docs_dir, workers=args.workers, embed_workers=args.embed_workers)
+            print("Done.")
+            sys.exit(0)
+
+        print("Loading documents and building vector store ... (files are parsed in parallel while chunks are embedded)")
+        parse_times = {}
+        try:
+            create_vector_store(iter_document_chunks(docs_dir, workers=args.workers, parse_times=parse_times),
+                                embed_workers=args.embed_workers, docs_dir=docs_dir)
+        except ValueError:
             print("❌ No chunks to index. Fix input documents and retry.")
             sys.exit(1)
 
-        print("Building vector store ...")
-        create_vector_store(docs)
+        slowest = sorted(parse_times.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        print("Slowest files to parse:")
+        for path, secs in slowest:
+            print(f"  {secs:7.2f}s  {os.path.relpath(path, docs_dir)}")
         print("Done.")
     except KeyboardInterrupt:
         print("Interrupted by user.")
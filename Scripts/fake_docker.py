@@ -0,0 +1,109 @@
+# Scripts/fake_docker.py
+"""
+Minimal stand-in for the `docker` CLI, enough to drive agents/docker_pool.py
+without a daemon:
+
+    DOCKER_CLI="python Scripts/fake_docker.py" USE_DOCKER_SANDBOX=1 DOCKER_POOL_SIZE=2 ...
+
+Supported: run -d, exec [-w DIR], cp SRC NAME:DEST, rm -f NAME..., ps -q.
+A "container" is a directory under $FAKE_DOCKER_STATE (default tmp/fake_docker);
+container paths are mapped onto it and commands run on the host. The image is
+ignored. `rm -f` (or deleting the directory) makes health checks fail.
+"""
+
+import os
+import sys
+import shutil
+import subprocess
+
+STATE_DIR = os.path.abspath(os.getenv("FAKE_DOCKER_STATE", os.path.join("tmp", "fake_docker")))
+
+
+def _root(name: str) -> str:
+    return os.path.join(STATE_DIR, name)
+
+
+def _host_path(name: str, path: str) -> str:
+    if path.startswith("/"):
+        return os.path.join(_root(name), path.lstrip("/"))
+    return path
+
+
+def _fail(msg: str, code: int = 1) -> int:
+    print(f"Error: {msg}", file=sys.stderr)
+    return code
+
+
+def _take_flags(args, with_value=("-w", "--name", "-v", "-e", "--network", "--memory", "--memory-swap", "--cpus",
+                                  "--pids-limit", "--ulimit")):
+    """Split leading flags from positional args; returns (flags dict, rest)."""
+    flags = {}
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        if args[i] in with_value and i + 1 < len(args):
+            flags[args[i]] = args[i + 1]
+            i += 2
+        else:
+            flags[args[i]] = True
+            i += 1
+    return flags, args[i:]
+
+
+def cmd_run(args) -> int:
+    flags, rest = _take_flags(args)
+    if "-d" not in flags:
+        return _fail("fake docker only supports detached `run -d`")
+    name = flags.get("--name") or f"fake-{os.getpid()}"
+    if os.path.exists(_root(name)):
+        return _fail(f"container name {name} already in use", 125)
+    os.makedirs(_host_path(name, flags.get("-w", "/work")), exist_ok=True)
+    print(name)
+    return 0
+
+
+def cmd_exec(args) -> int:
+    flags, rest = _take_flags(args)
+    if len(rest) < 2:
+        return _fail("exec needs a container and a command")
+    name, cmd = rest[0], rest[1:]
+    if not os.path.isdir(_root(name)):
+        return _fail(f"No such container: {name}")
+    cwd = _host_path(name, flags.get("-w", "/"))
+    cmd = [_host_path(name, a) if a.startswith("/work") else a for a in cmd]
+    try:
+        return subprocess.run(cmd, cwd=cwd).returncode
+    except FileNotFoundError as e:
+        return _fail(str(e), 127)
+
+
+def cmd_cp(args) -> int:
+    if len(args) != 2 or ":" not in args[1]:
+        return _fail("only `cp SRC CONTAINER:DEST` is supported")
+    name, dest = args[1].split(":", 1)
+    if not os.path.isdir(_root(name)):
+        return _fail(f"No such container: {name}")
+    shutil.copy(args[0], _host_path(name, dest))
+    return 0
+
+
+def cmd_rm(args) -> int:
+    _, names = _take_flags(args)
+    for name in names:
+        shutil.rmtree(_root(name), ignore_errors=True)
+    return 0
+
+
+def cmd_ps(args) -> int:
+    if os.path.isdir(STATE_DIR):
+        for name in sorted(os.listdir(STATE_DIR)):
+            print(name)
+    return 0
+
+
+COMMANDS = {"run": cmd_run, "exec": cmd_exec, "cp": cmd_cp, "rm": cmd_rm, "ps": cmd_ps}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(_fail(f"unsupported command; expected one of {sorted(COMMANDS)}"))
+    os.makedirs(STATE_DIR, exist_ok=True)
+    sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
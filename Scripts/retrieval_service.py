@@ -0,0 +1,21 @@
+# Scripts/retrieval_service.py
+import sys
+import argparse
+from pathlib import Path
+
+# ensure project root is on sys.path so `rag` package is importable
+this_file = Path(__file__).resolve()
+project_root = this_file.parent.parent  # two levels: Scripts/ -> project root
+sys.path.insert(0, str(project_root))
+
+from config import RETRIEVAL_SERVICE_HOST, RETRIEVAL_SERVICE_PORT
+from rag.retrieval_service import serve
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve retrieval (one embedding model + index) to every pipeline process on this host. "
+                    "Point them at it with RETRIEVAL_SERVICE_URL=http://HOST:PORT.")
+    parser.add_argument("--host", default=RETRIEVAL_SERVICE_HOST, help="bind address (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=RETRIEVAL_SERVICE_PORT, help="port (default: %(default)s)")
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,230 @@
+# agents/docker_pool.py
+"""
+Pool of long-lived sandbox containers for the Docker execution path.
+
+Instead of `docker run --rm` per attempt, containers are started once from
+SANDBOX_DOCKER_IMAGE (`sleep infinity`) and every run gets a fresh scratch
+dir inside one of them via `docker cp` + `docker exec`. Containers are health
+checked when they have been idle for a while and recycled after
+`max_runs` runs or whenever a run leaves them in an unknown state (host-side
+timeout, failed cleanup).
+
+The docker CLI is configurable (DOCKER_CLI), so the pool can be driven by
+Scripts/fake_docker.py when no daemon is available.
+"""
+
+import time
+import uuid
+import shlex
+import threading
+import subprocess
+from collections import deque
+from typing import Deque, List, Optional
+
+
+class _Container:
+    def __init__(self, name: str):
+        self.name = name
+        self.runs = 0
+        self.last_used = time.monotonic()
+        self.dirty = False
+
+
+class DockerContainerPool:
+    def __init__(
+        self,
+        image: str,
+        size: int = 2,
+        max_runs: int = 50,
+        docker_cmd: str = "docker",
+        health_check_after: float = 30.0,
+        command_timeout: float = 60.0,
+        run_flags: Optional[List[str]] = None,
+    ):
+        self.image = image
+        self.size = max(1, size)
+        self.max_runs = max(1, max_runs)
+        self.docker = shlex.split(docker_cmd)
+        self.health_check_after = health_check_after
+        self.command_timeout = command_timeout
+        # resource limits for every container (agents/sandbox_limits.docker_flags)
+        self.run_flags = list(run_flags or [])
+        self._idle: Deque[_Container] = deque()
+        self._started = 0
+        # guards _idle/_started; notified whenever a container is released or a slot frees up
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {"started": 0, "recycled": 0, "runs": 0, "unhealthy": 0}
+
+    # ---- docker helpers ----
+    def _docker(self, args: List[str], timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(self.docker + args, capture_output=True, text=True,
+                              timeout=timeout or self.command_timeout)
+
+    def _start_container(self) -> _Container:
+        name = f"debug-sandbox-{uuid.uuid4().hex[:8]}"
+        r = self._docker(["run", "-d", "--rm", "--name", name, "-w", "/work",
+                          *self.run_flags, self.image, "sleep", "infinity"])
+        if r.returncode != 0:
+            raise RuntimeError(f"docker run failed: {r.stderr.strip()}")
+        c = _Container(name)
+        if not self._healthy(c):
+            self._remove(c)
+            raise RuntimeError(f"sandbox container {name} failed its health check")
+        self.stats["started"] += 1
+        return c
+
+    def _healthy(self, c: _Container) -> bool:
+        try:
+            return self._docker(["exec", c.name, "true"], timeout=15).returncode == 0
+        except Exception:
+            return False
+
+    def _remove(self, c: _Container):
+        try:
+            self._docker(["rm", "-f", c.name], timeout=30)
+        except Exception:
+            pass
+
+    # ---- pool management ----
+    def _acquire(self) -> _Container:
+        while True:
+            with self._cond:
+                while not self._idle and self._started >= self.size:
+                    self._cond.wait()
+                c = self._idle.popleft() if self._idle else None
+                if c is None:
+                    self._started += 1
+            if c is None:
+                try:
+                    return self._start_container()
+                except Exception:
+                    self._free_slot()
+                    raise
+            if time.monotonic() - c.last_used < self.health_check_after or self._healthy(c):
+                return c
+            self.stats["unhealthy"] += 1
+            self._discard(c)
+
+    def _free_slot(self):
+        with self._cond:
+            self._started -= 1
+            # a waiter may now start a replacement container
+            self._cond.notify()
+
+    def _discard(self, c: _Container):
+        self._remove(c)
+        self._free_slot()
+
+    def _release(self, c: _Container):
+        c.last_used = time.monotonic()
+        if self._closed or c.dirty or c.runs >= self.max_runs:
+            self.stats["recycled"] += 1
+            self._discard(c)
+            return
+        with self._cond:
+            self._idle.append(c)
+            self._cond.notify()
+
+    def start(self):
+        """Pre-start every container (otherwise they start on first use)."""
+        containers = [self._acquire() for _ in range(self.size - self._started)]
+        for c in containers:
+            self._release(c)
+
+    def _exec_cancellable(self, args: List[str], timeout: float, cancel_event: threading.Event):
+        """`docker exec` that gives up when `cancel_event` is set; returns None if cancelled."""
+        proc = subprocess.Popen(self.docker + args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                out, err = proc.communicate(timeout=max(0.0, min(deadline - time.monotonic(), 0.05)))
+                return subprocess.CompletedProcess(proc.args, proc.returncode, out, err)
+            except subprocess.TimeoutExpired:
+                if cancel_event.is_set():
+                    # don't drain the pipes: processes left in the container may still hold them
+                    proc.kill()
+                    proc.wait()
+                    proc.stdout.close()
+                    proc.stderr.close()
+                    return None
+                if time.monotonic() >= deadline:
+                    proc.kill()
+                    proc.communicate()
+                    raise subprocess.TimeoutExpired(proc.args, timeout)
+
+    def run(self, file_path: str, timeout: float, cancel_event: Optional[threading.Event] = None) -> dict:
+        c = None
+        try:
+            c = self._acquire()
+            scratch = f"/work/{uuid.uuid4().hex[:12]}"
+            r = self._docker(["exec", c.name, "mkdir", "-p", scratch])
+            if r.returncode != 0:
+                c.dirty = True
+                return {"stdout": "", "stderr": f"DOCKER ERROR: {r.stderr.strip()}", "returncode": -1}
+            r = self._docker(["cp", file_path, f"{c.name}:{scratch}/runfile.py"])
+            if r.returncode != 0:
+                c.dirty = True
+                return {"stdout": "", "stderr": f"DOCKER ERROR: {r.stderr.strip()}", "returncode": -1}
+
+            c.runs += 1
+            self.stats["runs"] += 1
+            started = time.monotonic()
+            try:
+                # in-container `timeout` stops the patch; the host-side timeout is a backstop
+                cmd = ["exec", "-w", scratch, c.name, "timeout", f"{int(timeout)}s", "python", "runfile.py"]
+                if cancel_event is None:
+                    r = self._docker(cmd, timeout=timeout + 10)
+                else:
+                    r = self._exec_cancellable(cmd, timeout + 10, cancel_event)
+                    if r is None:
+                        # the patch is still running inside; recycling the container stops it
+                        c.dirty = True
+                        return {"stdout": "", "stderr": "CANCELLED", "returncode": -1, "cancelled": True}
+            except subprocess.TimeoutExpired as e:
+                c.dirty = True  # the patch may still be running inside the container
+                return {"stdout": "", "stderr": f"TIMEOUT: {e}", "returncode": -1}
+
+            cleanup = self._docker(["exec", c.name, "rm", "-rf", scratch])
+            if cleanup.returncode != 0:
+                c.dirty = True
+            # `timeout` exits 124 when it fires, but so may the patch itself: only the former ran the full limit
+            if r.returncode == 124 and time.monotonic() - started >= int(timeout):
+                return {"stdout": "", "stderr": f"TIMEOUT: patch timed out after {timeout} seconds", "returncode": -1}
+            if r.returncode in (137, 152):
+                # killed inside the container (OOM killer / CPU rlimit); recycle it to be safe
+                c.dirty = True
+            return {"stdout": r.stdout, "stderr": r.stderr, "returncode": r.returncode}
+        except Exception as e:
+            if c is not None:
+                c.dirty = True
+            return {"stdout": "", "stderr": f"DOCKER ERROR: {e}", "returncode": -1}
+        finally:
+            if c is not None:
+                self._release(c)
+
+    def close(self):
+        self._closed = True
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for c in idle:
+            self._discard(c)
+
+
+_pool: Optional[DockerContainerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_docker_pool() -> DockerContainerPool:
+    """Process-wide container pool shared by every ExecutionAgent."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import atexit
+            from config import SANDBOX_DOCKER_IMAGE, DOCKER_POOL_SIZE, DOCKER_POOL_MAX_RUNS, DOCKER_CLI
+            from agents.sandbox_limits import docker_flags
+            _pool = DockerContainerPool(SANDBOX_DOCKER_IMAGE, DOCKER_POOL_SIZE, DOCKER_POOL_MAX_RUNS, DOCKER_CLI,
+                                        run_flags=docker_flags())
+            atexit.register(_pool.close)
+        return _pool
@@ -1,66 +1,250 @@
+import sys
 import subprocess
 import tempfile
+import threading
+import time
 import os
 import shutil
 import uuid
-from config import EXECUTION_TIMEOUT, USE_DOCKER_SANDBOX, SANDBOX_DOCKER_IMAGE
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+import tracing
+from utils import Cancelled
+from agents.static_check import check_patch, format_errors, select_code
+from agents.sandbox_limits import limited_command, docker_flags, usage_from_rusage, kill_reason
+from config import (EXECUTION_TIMEOUT, USE_DOCKER_SANDBOX, SANDBOX_DOCKER_IMAGE, USE_WARM_POOL, DOCKER_POOL_SIZE, DOCKER_CLI,
+                    STATIC_CHECK_ENABLED)
+
+
+class ExecutionCancelled(Cancelled):
+    pass
+
+
+class ExecutionTimeout(subprocess.TimeoutExpired):
+    """TimeoutExpired that keeps the resource usage measured when the child was killed."""
+
+    def __init__(self, cmd, timeout, usage: dict):
+        super().__init__(cmd, timeout)
+        self.usage = usage
+
+
+def _cancelled_result():
+    return {"stdout": "", "stderr": "CANCELLED", "returncode": -1, "cancelled": True}
+
+
+def _rejected_result(errors):
+    return {"stdout": "", "stderr": format_errors(errors), "returncode": 1, "static_check": errors}
+
 
 class ExecutionAgent:
-    def __init__(self, timeout: int = EXECUTION_TIMEOUT):
+    def __init__(self, timeout: int = EXECUTION_TIMEOUT, use_warm_pool: bool = USE_WARM_POOL,
+                 static_check: bool = STATIC_CHECK_ENABLED):
         self.timeout = timeout
+        self.static_check = static_check
+        # fork-based pool needs os.fork (POSIX); elsewhere fall back to cold starts
+        self.use_warm_pool = use_warm_pool and hasattr(os, "fork")
 
     def _extract_code(self, text: str):
-        # crude: return first fenced python block
-        if "```" in text:
-            parts = text.split("```")
-            for i in range(1, len(parts), 2):
-                block = parts[i]
-                # remove optional "python" header
-                if block.strip().startswith("python"):
-                    block = block.split("\n", 1)[1] if "\n" in block else ""
-                return block
-        return text  # fallback: assume the whole text is runnable code
-
-    def _run_local(self, file_path: str):
+        # best Python block among all fences; the whole text when there are none
+        return select_code(text)
+
+    def _communicate(self, cmd: List[str], timeout: float, cancel_event: Optional[threading.Event] = None,
+                     limited: bool = False):
+        """
+        subprocess.run(capture_output=True, timeout=...) that also polls
+        `cancel_event` and kills the child as soon as it is set. With
+        `limited`, the child runs under the sandbox rlimits and its resource
+        usage is measured; returns (stdout, stderr, returncode, usage).
+        """
+        if limited and hasattr(os, "wait4"):
+            return self._communicate_measured(cmd, timeout, cancel_event)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                wait_for = max(0.0, remaining) if cancel_event is None else max(0.0, min(remaining, 0.05))
+                out, err = proc.communicate(timeout=wait_for)
+                return out, err, proc.returncode, {}
+            except subprocess.TimeoutExpired:
+                if cancel_event is not None and cancel_event.is_set():
+                    proc.kill()
+                    proc.communicate()
+                    raise ExecutionCancelled()
+                if time.monotonic() >= deadline:
+                    proc.kill()
+                    proc.communicate()
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+
+    def _communicate_measured(self, cmd: List[str], timeout: float, cancel_event: Optional[threading.Event] = None):
+        """_communicate under rlimits, reaping the child with wait4() to get its rusage."""
+        proc = subprocess.Popen(limited_command(cmd), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        output = {}
+
+        def _drain(name, pipe):
+            output[name] = pipe.read()
+
+        readers = [threading.Thread(target=_drain, args=item, daemon=True)
+                   for item in (("stdout", proc.stdout), ("stderr", proc.stderr))]
+        for t in readers:
+            t.start()
+        deadline = time.monotonic() + timeout
+        poll = 0.001
+        killed = None
+        while True:
+            pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if killed is None and cancel_event is not None and cancel_event.is_set():
+                killed = "cancelled"
+            elif killed is None and time.monotonic() >= deadline:
+                killed = "timeout"
+            if killed is not None:
+                proc.kill()
+                _, status, ru = os.wait4(proc.pid, 0)
+                break
+            time.sleep(poll)
+            poll = min(poll * 2, 0.01)
+        proc.returncode = os.waitstatus_to_exitcode(status)   # reaped here, so Popen must not wait again
+        # processes the patch left behind may still hold the pipes; don't wait for them forever
+        for t in readers:
+            t.join(timeout=1.0)
+        if killed == "cancelled":
+            raise ExecutionCancelled()
+        if killed == "timeout":
+            raise ExecutionTimeout(cmd, timeout, usage_from_rusage(ru))
+        return output.get("stdout", ""), output.get("stderr", ""), proc.returncode, usage_from_rusage(ru)
+
+    def _run_local(self, file_path: str, cancel_event: Optional[threading.Event] = None):
+        if self.use_warm_pool:
+            from agents.warm_pool import get_warm_pool
+            return get_warm_pool().run(file_path, self.timeout, cancel_event)
         try:
-            r = subprocess.run(["python", file_path], capture_output=True, text=True, timeout=self.timeout)
-            return {"stdout": r.stdout, "stderr": r.stderr, "returncode": r.returncode}
+            stdout, stderr, rc, usage = self._communicate([sys.executable, file_path], self.timeout, cancel_event, limited=True)
+            return {"stdout": stdout, "stderr": stderr, "returncode": rc, **usage}
+        except ExecutionCancelled:
+            return _cancelled_result()
         except subprocess.TimeoutExpired as e:
-            return {"stdout": "", "stderr": f"TIMEOUT: {e}", "returncode": -1}
+            return {"stdout": "", "stderr": f"TIMEOUT: {e}", "returncode": -1, **getattr(e, "usage", {})}
         except Exception as e:
             return {"stdout": "", "stderr": f"EXEC ERROR: {e}", "returncode": -1}
 
-    def _run_docker(self, file_path: str):
+    def _run_docker(self, file_path: str, cancel_event: Optional[threading.Event] = None):
+        if DOCKER_POOL_SIZE > 0:
+            from agents.docker_pool import get_docker_pool
+            return get_docker_pool().run(file_path, self.timeout, cancel_event)
+        tmpdir = tempfile.mkdtemp()
+        container_name = f"debug-sandbox-{uuid.uuid4().hex[:8]}"
         try:
-            tmpdir = tempfile.mkdtemp()
             shutil.copy(file_path, os.path.join(tmpdir, "runfile.py"))
-            container_name = f"debug-sandbox-{uuid.uuid4().hex[:8]}"
-            cmd = [
-                "docker", "run", "--rm", "--name", container_name,
+            cmd = shlex.split(DOCKER_CLI) + [
+                "run", "--rm", "--name", container_name,
                 "-v", f"{tmpdir}:/work",
                 "-w", "/work",
+                *docker_flags(),
                 SANDBOX_DOCKER_IMAGE,
                 "python", "runfile.py"
             ]
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout + 10)
-            shutil.rmtree(tmpdir, ignore_errors=True)
-            return {"stdout": r.stdout, "stderr": r.stderr, "returncode": r.returncode}
+            stdout, stderr, rc, _ = self._communicate(cmd, self.timeout + 10, cancel_event)
+            return {"stdout": stdout, "stderr": stderr, "returncode": rc}
+        except ExecutionCancelled:
+            # killing the docker client does not stop the container itself
+            subprocess.run(shlex.split(DOCKER_CLI) + ["rm", "-f", container_name], capture_output=True)
+            return _cancelled_result()
         except Exception as e:
             return {"stdout": "", "stderr": f"DOCKER ERROR: {e}", "returncode": -1}
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
 
-    def run(self, code_text: str):
-        code = self._extract_code(code_text)
+    def run(self, code_text: str, cancel_event: Optional[threading.Event] = None):
+        if cancel_event is not None and cancel_event.is_set():
+            return _cancelled_result()
+        if self.static_check:
+            check = check_patch(code_text)
+            if not check["ok"]:
+                # fails the same way every time: don't spend a subprocess on it
+                tracing.accumulate("static_rejections", 1)
+                tracing.annotate(static_check=[e["kind"] for e in check["errors"]])
+                return self._account(_rejected_result(check["errors"]))
+            code = check["code"]
+        else:
+            code = self._extract_code(code_text)
         f = tempfile.NamedTemporaryFile(delete=False, suffix=".py", mode="w", encoding="utf-8")
+        t0 = time.perf_counter()
         try:
             f.write(code)
             f.flush()
             f.close()
             if USE_DOCKER_SANDBOX:
-                return self._run_docker(f.name)
+                out = self._run_docker(f.name, cancel_event)
             else:
-                return self._run_local(f.name)
+                out = self._run_local(f.name, cancel_event)
+            return self._account(out)
         finally:
+            tracing.accumulate("subprocess_seconds", time.perf_counter() - t0)
+            tracing.accumulate("runs", 1)
             try:
                 os.remove(f.name)
             except Exception:
                 pass
+
+    def _account(self, out: dict) -> dict:
+        """Fill in cpu_seconds / max_rss (None when not measured) and kill_reason."""
+        out.setdefault("cpu_seconds", None)
+        out.setdefault("max_rss", None)
+        out["kill_reason"] = kill_reason(out, docker=USE_DOCKER_SANDBOX)
+        if out["cpu_seconds"] is not None:
+            tracing.accumulate("cpu_seconds", out["cpu_seconds"])
+        if out["kill_reason"]:
+            tracing.annotate(kill_reason=out["kill_reason"])
+        return out
+
+    def run_many(self, patches: List[str], accept: Callable[[dict], Tuple[bool, str]],
+                 cancel_event: Optional[threading.Event] = None):
+        """
+        Execute candidate patches concurrently. Each finished result is passed
+        to `accept` (e.g. ValidatorAgent.run); the first accepted candidate wins
+        and the still-running ones are cancelled, as are all of them when the
+        caller's `cancel_event` is set.
+
+        Returns (winner_index or None, [{"execution_result", "validation"}, ...])
+        in the order of `patches`.
+        """
+        outer_cancel = cancel_event
+        cancel_event = threading.Event()
+        if outer_cancel is not None:
+            # forward the caller's cancellation to the race's own event
+            def _forward():
+                while not cancel_event.is_set():
+                    if outer_cancel.wait(0.05):
+                        cancel_event.set()
+            threading.Thread(target=_forward, daemon=True).start()
+        results: List[dict] = [{} for _ in patches]
+        winner = None
+        parent_span = tracing.current_span()
+
+        def _run(patch):
+            with tracing.use_span(parent_span):
+                return self.run(patch, cancel_event)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(patches))) as executor:
+            futures = {executor.submit(_run, p): i for i, p in enumerate(patches)}
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    out = fut.result()
+                except Exception as e:
+                    out = {"stdout": "", "stderr": f"EXEC ERROR: {e}", "returncode": -1}
+                if out.get("cancelled"):
+                    results[i] = {"execution_result": out, "validation": {"success": False, "message": "cancelled"}}
+                    continue
+                success, message = accept(out)
+                results[i] = {"execution_result": out, "validation": {"success": bool(success), "message": str(message)}}
+                if success and winner is None:
+                    winner = i
+                    cancel_event.set()
+        cancel_event.set()   # also stops the forwarding thread
+        if winner is None and outer_cancel is not None and outer_cancel.is_set():
+            raise ExecutionCancelled()
+        return winner, results
@@ -0,0 +1,119 @@
+# agents/fingerprint.py
+"""
+Traceback normalisation and fingerprinting.
+
+Recurring failures usually differ only in timestamps, absolute paths, line
+numbers, object addresses or data values quoted in the message. The
+normaliser keeps what identifies the failure — exception type, the message
+with those masked (quoted identifiers such as a missing key or name are
+kept), the (file basename, function) frame stack and the source line of the
+innermost frame — so the same bug seen twice produces the same fingerprint,
+while `KeyError: 'user'` and `KeyError: 'timeout'` do not.
+"""
+
+import re
+import json
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+
+# Patterns that make a text look like a Python error (shared with PatchGeneratorAgent).
+TRACEBACK_PATTERNS = [
+    r"Traceback \(most recent call last\):",
+    r"File \".*\", line \d+",
+    r"(Error|Exception):"
+]
+
+_FRAME_RE = re.compile(r'File "(?P<file>[^"]+)", line (?P<line>\d+)(?:, in (?P<func>[^\s]+))?')
+_EXC_LINE_RE = re.compile(
+    r"^\s*(?P<type>[A-Za-z_][\w.]*(?:Error|Exception|Warning|Exit|Interrupt|StopIteration))"
+    r"(?::\s?(?P<message>.*))?\s*$",
+    re.MULTILINE,
+)
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][\w.]{0,63}")
+
+
+def _mask_quoted(m: re.Match) -> str:
+    # names, keys and attributes identify the bug; other quoted values are data
+    return m.group(0) if _IDENTIFIER_RE.fullmatch(m.group(0)[1:-1]) else "<str>"
+
+
+# message normalisation, applied in order
+_MESSAGE_SUBS: List[Tuple[re.Pattern, Any]] = [
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<ts>"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"(?:[A-Za-z]:)?(?:[\\/][\w.\-]+){2,}"), "<path>"),
+    (re.compile(r"'[^']*'|\"[^\"]*\""), _mask_quoted),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "<num>"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def looks_like_traceback(text: str) -> bool:
+    if not text or len(text.strip()) < 10:  # very short inputs
+        return False
+    return any(re.search(p, text, re.IGNORECASE) for p in TRACEBACK_PATTERNS)
+
+
+def normalize_message(message: str) -> str:
+    for pattern, repl in _MESSAGE_SUBS:
+        message = pattern.sub(repl, message)
+    return message.strip()
+
+
+def _normalize_frame(file: str, func: Optional[str]) -> str:
+    base = re.split(r"[\\/]", file)[-1]
+    # temp files written by the sandbox / runners get random names
+    if re.fullmatch(r"tmp[\w]+\.py", base):
+        base = "<tmp>.py"
+    return f"{base}:{func or '?'}"
+
+
+def _frame_source(text: str, end: int) -> str:
+    """The code line printed under a frame header ending at `end`, if any."""
+    lines = text[end:].split("\n", 2)
+    line = lines[1].strip() if len(lines) > 1 else ""
+    if not line or _FRAME_RE.match(line) or _EXC_LINE_RE.match(line) or line.startswith("Traceback"):
+        return ""
+    return " ".join(line.split())
+
+
+def normalize_traceback(text: str) -> Dict[str, Any]:
+    """
+    Returns {"exc_type", "message", "frames", "source"} for the innermost
+    exception in `text`; "source" is the code line of the innermost frame.
+    Consecutive repeated frames (recursion) are collapsed.
+    """
+    text = text or ""
+    exc_type, message = None, ""
+    for m in _EXC_LINE_RE.finditer(text):
+        exc_type, message = m.group("type"), m.group("message") or ""
+
+    frames: List[str] = []
+    source = ""
+    for m in _FRAME_RE.finditer(text):
+        frame = _normalize_frame(m.group("file"), m.group("func"))
+        source = _frame_source(text, m.end())
+        if not frames or frames[-1] != frame:
+            frames.append(frame)
+
+    return {
+        "exc_type": exc_type.split(".")[-1] if exc_type else None,
+        "message": normalize_message(message),
+        "frames": frames,
+        "source": source,
+    }
+
+
+def fingerprint(text: str, extra: Optional[str] = None) -> Optional[str]:
+    """
+    Stable fingerprint of a traceback, or None when no exception line is found.
+    `extra` (e.g. the user's code snippet) is folded in when given.
+    """
+    norm = normalize_traceback(text)
+    if not norm["exc_type"]:
+        return None
+    payload = json.dumps(norm, sort_keys=True)
+    if extra:
+        payload += "\x00" + extra.strip()
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
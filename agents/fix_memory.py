@@ -0,0 +1,96 @@
+# agents/fix_memory.py
+"""
+Memory of validated fixes, keyed by traceback fingerprint (agents/fingerprint.py).
+
+When ValidatorAgent accepts a patch, the pipeline remembers it under the
+fingerprint of the original error log. A later job with the same fingerprint
+(and a frame stack or code snippet to go by) re-executes the remembered patch
+first and only falls back to the full retrieve/analyze/generate graph if that
+no longer validates or reproduces the original error; the failed replay is
+then the generator's first piece of feedback.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import Optional, Dict, Any
+
+from config import FIX_MEMORY_ENABLED, FIX_MEMORY_PATH
+
+
+class FixMemory:
+    def __init__(self, path: str = FIX_MEMORY_PATH, enabled: bool = FIX_MEMORY_ENABLED):
+        self.path = path
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fixes ("
+                " fingerprint TEXT PRIMARY KEY, exc_type TEXT, patch_text TEXT NOT NULL,"
+                " root_cause_summary TEXT, hits INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS fixes_exc_type ON fixes(exc_type)")
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, fingerprint: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not self.enabled or not fingerprint:
+            return None
+        with self._lock:
+            row = self._db().execute(
+                "SELECT patch_text, root_cause_summary, exc_type, hits FROM fixes WHERE fingerprint = ?",
+                (fingerprint,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"patch_text": row[0], "root_cause_summary": row[1], "exc_type": row[2], "hits": row[3]}
+
+    def remember(self, fingerprint: Optional[str], patch_text: str, root_cause_summary: str = "",
+                 exc_type: Optional[str] = None):
+        if not self.enabled or not fingerprint or not patch_text:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO fixes (fingerprint, exc_type, patch_text, root_cause_summary, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(fingerprint) DO UPDATE SET patch_text = excluded.patch_text,"
+                " root_cause_summary = excluded.root_cause_summary, last_used = excluded.last_used",
+                (fingerprint, exc_type, patch_text, root_cause_summary or "", now, now),
+            )
+            db.commit()
+
+    def record_hit(self, fingerprint: str):
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE fixes SET hits = hits + 1, last_used = ? WHERE fingerprint = ?",
+                       (time.time(), fingerprint))
+            db.commit()
+
+    def forget(self, fingerprint: str):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM fixes WHERE fingerprint = ?", (fingerprint,))
+            db.commit()
+
+
+_memory: Optional[FixMemory] = None
+_memory_lock = threading.Lock()
+
+
+def get_fix_memory() -> FixMemory:
+    """Process-wide fix memory shared by concurrent pipelines."""
+    global _memory
+    with _memory_lock:
+        if _memory is None:
+            _memory = FixMemory()
+        return _memory
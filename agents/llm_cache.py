@@ -0,0 +1,134 @@
+# agents/llm_cache.py
+"""
+Disk-backed LLM response cache shared by RootCauseAgent and PatchGeneratorAgent.
+
+Entries are keyed on sha256(namespace, model, temperature, prompt) and stored
+in SQLite, so the cache survives restarts and can be shared by several worker
+processes. Eviction is LRU on last access, bounded by entry count, plus a TTL.
+
+Patch responses are stored unvalidated and only served once
+`mark_validated()` has been called for them (after ValidatorAgent accepted the
+patch), so an unverified patch is never replayed.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional, Dict, Any
+
+from config import LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+
+
+class LLMResponseCache:
+    def __init__(
+        self,
+        path: str = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+        enabled: bool = LLM_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL, validated INTEGER NOT NULL,"
+                " created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache(last_access)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str, namespace: str = "") -> str:
+        h = hashlib.sha256()
+        for part in (namespace, model, repr(float(temperature)), prompt):
+            h.update(part.encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def get(self, key: str, require_validated: bool = False) -> Optional[str]:
+        if not self.enabled or not key:
+            return None
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT response, validated, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds > 0 and now - row[2] > self.ttl_seconds) \
+                    or (require_validated and not row[1]):
+                self.misses += 1
+                return None
+            db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, validated: bool = True):
+        if not self.enabled or not key:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT INTO llm_cache (key, response, validated, created, last_access) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET response = excluded.response,"
+                " validated = MAX(validated, excluded.validated), last_access = excluded.last_access",
+                (key, response, int(validated), now, now),
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def mark_validated(self, key: Optional[str]):
+        if not self.enabled or not key:
+            return
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE llm_cache SET validated = 1 WHERE key = ?", (key,))
+            db.commit()
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        if self.ttl_seconds > 0:
+            db.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,))
+        if self.max_entries > 0:
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM llm_cache")
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if self.enabled else 0
+            return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """Process-wide cache instance used by the LLM agents by default."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
@@ -1,58 +1,184 @@
-import re
+from concurrent.futures import ThreadPoolExecutor
 from langchain_anthropic import ChatAnthropic
-from config import ANTHROPIC_API_KEY
+import tracing
+from config import ANTHROPIC_API_KEY, SPECULATIVE_TEMPERATURES
+from agents.llm_cache import get_llm_cache
+from agents.fingerprint import looks_like_traceback
+from agents.prompt_builder import build_context, estimate_tokens
+from utils import call_cancellable
 
+# Prompt variants used for speculative candidates, to diversify beyond temperature alone.
+CANDIDATE_HINTS = [
+    "",
+    "Prefer the smallest possible change to the failing line.\n",
+    "Prefer a defensive fix (input validation / guarding the failing operation).\n",
+    "Consider that the root cause may be upstream of the failing line; fix it there.\n",
+]
+FEEDBACK_ATTEMPTS = 2        # most recent failed attempts shown to the model on a retry
+
+
+def format_feedback(feedback: list = None) -> str:
+    """Prompt section listing the latest failed attempts ({patch, stderr, returncode} dicts)."""
+    if not feedback:
+        return ""
+    parts = ["Previous attempts that failed (do not repeat them; fix what their output shows):\n"]
+    for i, fb in enumerate(feedback[-FEEDBACK_ATTEMPTS:], 1):
+        parts.append(
+            f"Attempt {i} patch:\n{fb.get('patch') or ''}\n"
+            f"Attempt {i} result (exit code {fb.get('returncode')}):\n{fb.get('stderr') or ''}\n\n"
+        )
+    return "".join(parts)
 
 
 class PatchGeneratorAgent:
-    def __init__(self, model_name: str = "claude-sonnet-4-20250514", temperature: float = 0.5):
-        self.llm = ChatAnthropic(
+    def __init__(self, model_name: str = "claude-sonnet-4-20250514", temperature: float = 0.5, cache=None, llm=None):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.cache = cache or get_llm_cache()
+        # an injected `llm` (any object with .predict(prompt)) is used for every temperature
+        self._fixed_llm = llm
+        self.llm = llm or ChatAnthropic(
             model=model_name,
             temperature=temperature,
             anthropic_api_key=ANTHROPIC_API_KEY,
             max_retries=2
         )
+        self._llms = {temperature: self.llm}
+
+    def _llm_for(self, temperature: float):
+        if self._fixed_llm is not None:
+            return self._fixed_llm
+        if temperature not in self._llms:
+            self._llms[temperature] = ChatAnthropic(
+                model=self.model_name,
+                temperature=temperature,
+                anthropic_api_key=ANTHROPIC_API_KEY,
+                max_retries=2
+            )
+        return self._llms[temperature]
+
+    def _predict(self, prompt: str, temperature: float, cancel_event=None):
+        """
+        Cached LLM call. Patches are stored unvalidated and only replayed after
+        mark_validated(); returns (patch_text, cache_key, cached). A set
+        `cancel_event` abandons the in-flight call (raises utils.Cancelled).
+        """
+        key = self.cache.key(self.model_name, temperature, prompt, "patch")
+        tracing.accumulate("prompt_chars", len(prompt))
+        tracing.accumulate("prompt_tokens", estimate_tokens(prompt))
+        cached = self.cache.get(key, require_validated=True)
+        if cached is not None:
+            tracing.accumulate("response_chars", len(cached))
+            tracing.accumulate("cache_hits", 1)
+            return cached, key, True
+        llm = self._llm_for(temperature)
+        resp = call_cancellable(lambda: llm.predict(prompt), cancel_event).strip()
+        self.cache.put(key, resp, validated=False)
+        tracing.accumulate("response_chars", len(resp))
+        tracing.accumulate("llm_calls", 1)
+        return resp, key, False
+
+    def mark_validated(self, cache_key: str):
+        self.cache.mark_validated(cache_key)
 
     def _looks_like_valid_error(self, text: str) -> bool:
         """
         Check if the text contains patterns that look like a real Python error/traceback.
         """
-        if not text or len(text.strip()) < 10:  # very short inputs
-            return False
+        return looks_like_traceback(text)
 
-        patterns = [
-            r"Traceback \(most recent call last\):",
-            r"File \".*\", line \d+",
-            r"(Error|Exception):"
-        ]
-        return any(re.search(p, text, re.IGNORECASE) for p in patterns)
+    def _diagnostic(self):
+        return {
+            "type": "diagnostic_only",
+            "message": (
+                "The provided input does not look like a valid Python error log or traceback.\n"
+                "Please provide the full Python error message (including any 'Traceback' lines) "
+                "and, if possible, the relevant code snippet."
+            )
+        }
 
-    def run(self, error_log: str, root_cause_summary: str, retrieved_docs: list, user_code_snippet: str = None):
-        # 1. If error log is too vague, return diagnostic-only response
-        if not self._looks_like_valid_error(error_log):
-            return {
-                "type": "diagnostic_only",
-                "message": (
-                    "The provided input does not look like a valid Python error log or traceback.\n"
-                    "Please provide the full Python error message (including any 'Traceback' lines) "
-                    "and, if possible, the relevant code snippet."
-                )
-            }
-
-
-        docs_text = "\n\n".join(retrieved_docs[:6]) if retrieved_docs else ""
-        prompt = (
+    def _context(self, error_log: str, root_cause_summary: str, retrieved_docs: list, user_code_snippet: str = None,
+                 feedback: list = None):
+        """
+        Budgeted error log + docs. Everything else in the prompt (preamble, section
+        headings, rules, root cause, user code, retry feedback and the longest
+        candidate hint) is sent in full, so it is charged up front by
+        rendering the prompt with an empty error log and no docs.
+        """
+        fixed_text = self._build_prompt({"error_log": "", "docs": []}, root_cause_summary, user_code_snippet,
+                                        max(CANDIDATE_HINTS, key=len), feedback)
+        return build_context(error_log, retrieved_docs, fixed_text=fixed_text)
+
+    def _build_prompt(self, ctx: dict, root_cause_summary: str, user_code_snippet: str = None, hint: str = "",
+                      feedback: list = None):
+        docs_text = "\n\n".join(ctx["docs"])
+        return (
             "You are a careful Python coding assistant. Produce a **minimal** code patch or snippet to fix the issue.\n\n"
-            f"Error log:\n{error_log}\n\n"
+            f"Error log:\n{ctx['error_log']}\n\n"
             f"Root cause analysis (short):\n{root_cause_summary}\n\n"
             f"Relevant docs:\n{docs_text}\n\n"
             f"User code (if provided):\n{user_code_snippet or 'None'}\n\n"
+            f"{format_feedback(feedback)}"
+            f"{hint}"
             "- If you are not confident the issue is in Python, respond exactly with:\n"
             "  I don't know - not a Python error.\n\n"
             "Return only fenced Python code blocks (```python ... ```).  or the exact phrase above if not a Python error."
         )
-        resp = self.llm.predict(prompt)
+
+    def run(self, error_log: str, root_cause_summary: str, retrieved_docs: list, user_code_snippet: str = None,
+            cancel_event=None, feedback: list = None):
+        # 1. If error log is too vague, return diagnostic-only response
+        if not self._looks_like_valid_error(error_log):
+            return self._diagnostic()
+
+        ctx = self._context(error_log, root_cause_summary, retrieved_docs, user_code_snippet, feedback)
+        prompt = self._build_prompt(ctx, root_cause_summary, user_code_snippet, feedback=feedback)
+        resp, key, cached = self._predict(prompt, self.temperature, cancel_event)
+        return {
+            "type": "patch",
+            "patch_text": resp,
+            "patch_cache_key": key,
+            "cached": cached,
+        }
+
+    def run_candidates(self, error_log: str, root_cause_summary: str, retrieved_docs: list,
+                       user_code_snippet: str = None, n: int = 3, cancel_event=None, feedback: list = None):
+        """
+        Speculative mode: request `n` diverse patches concurrently, varying
+        temperature and prompt hint per candidate. Candidates whose LLM call
+        fails are dropped; if every call fails the last error is raised.
+        """
+        if not self._looks_like_valid_error(error_log):
+            return self._diagnostic()
+
+        temps = SPECULATIVE_TEMPERATURES or [self.temperature]
+        variants = [(temps[i % len(temps)], CANDIDATE_HINTS[i % len(CANDIDATE_HINTS)]) for i in range(max(1, n))]
+
+        ctx = self._context(error_log, root_cause_summary, retrieved_docs, user_code_snippet, feedback)
+        parent_span = tracing.current_span()
+
+        def _one(variant):
+            temperature, hint = variant
+            prompt = self._build_prompt(ctx, root_cause_summary, user_code_snippet, hint, feedback)
+            with tracing.use_span(parent_span):
+                return self._predict(prompt, temperature, cancel_event)
+
+        candidates, last_error = [], None
+        with ThreadPoolExecutor(max_workers=len(variants)) as executor:
+            futures = [executor.submit(_one, v) for v in variants]
+            for i, (fut, (temperature, _)) in enumerate(zip(futures, variants)):
+                try:
+                    patch_text, key, cached = fut.result()
+                    candidates.append({"patch_text": patch_text, "temperature": temperature, "variant": i,
+                                       "patch_cache_key": key, "cached": cached})
+                except Exception as e:
+                    last_error = e
+        if not candidates:
+            raise last_error
+
         return {
             "type": "patch",
-            "patch_text": resp.strip()
+            "patch_text": candidates[0]["patch_text"],
+            "patch_cache_key": candidates[0]["patch_cache_key"],
+            "candidates": candidates,
         }
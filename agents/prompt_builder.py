@@ -0,0 +1,245 @@
+# agents/prompt_builder.py
+"""
+Token-budgeted context for the LLM prompts.
+
+RootCauseAgent and PatchGeneratorAgent used to paste the top-k raw chunks and
+the whole error log into every prompt. `build_context()` fits both into
+PROMPT_TOKEN_BUDGET instead:
+
+- retrieved chunks: the CHUNK_OVERLAP region shared with an earlier chunk is
+  cut, near-identical chunks (repeated PDF headers, the same page indexed
+  twice) are dropped, and the rest fill the budget in relevance order;
+- error log: repeated frames (recursion) and runs of library frames are
+  collapsed; if it is still too long the outermost frames go first, so the
+  innermost frames and the exception line always survive.
+
+Token counts are estimated (~4 chars per token); no tokenizer is needed.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+import tracing
+from config import CHUNK_OVERLAP, TOP_K_RESULTS, PROMPT_TOKEN_BUDGET, PROMPT_ERROR_LOG_SHARE, PROMPT_DEDUP_THRESHOLD
+
+CHARS_PER_TOKEN = 4
+MIN_DOC_TOKENS = 64          # don't bother including a truncated chunk smaller than this
+_MIN_OVERLAP_CHARS = 32
+
+_FRAME_RE = re.compile(r'^\s*File "(?P<file>[^"]+)", line (?P<line>\d+)')
+_LIBRARY_MARKERS = ("site-packages", "dist-packages", "<frozen ", "/lib/python3", "\\lib\\python3")
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# ---------- retrieved chunks ----------
+def _shingles(text: str, n: int = 3) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _strip_overlap(prev: str, text: str) -> str:
+    """Drop the prefix of `text` that repeats the tail of `prev` (splitter overlap)."""
+    probe = text[:_MIN_OVERLAP_CHARS]
+    if len(probe) < _MIN_OVERLAP_CHARS:
+        return text
+    start = max(0, len(prev) - 2 * CHUNK_OVERLAP - _MIN_OVERLAP_CHARS)
+    idx = prev.find(probe, start)
+    while idx != -1:
+        tail = prev[idx:]
+        if text.startswith(tail):
+            return text[len(tail):].lstrip()
+        idx = prev.find(probe, idx + 1)
+    return text
+
+
+def dedupe_chunks(docs: List[str], threshold: float = PROMPT_DEDUP_THRESHOLD) -> Tuple[List[str], int]:
+    """
+    Returns (unique chunks in the original order, number dropped). A chunk is
+    dropped when most of its word 3-grams already appear in a kept chunk.
+    """
+    kept: List[str] = []
+    kept_shingles: List[set] = []
+    dropped = 0
+    for doc in docs:
+        text = (doc or "").strip()
+        for prev in kept:
+            text = _strip_overlap(prev, text)
+        sh = _shingles(text)
+        if not sh:
+            dropped += 1
+            continue
+        if any(len(sh & other) / min(len(sh), len(other)) >= threshold for other in kept_shingles):
+            dropped += 1
+            continue
+        kept.append(text)
+        kept_shingles.append(sh)
+    return kept, dropped
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # prefer a line / sentence boundary in the last quarter
+    boundary = max(cut.rfind("\n"), cut.rfind(". "))
+    if boundary > limit * 3 // 4:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " ..."
+
+
+# ---------- error log ----------
+def _is_library(frame_line: str) -> bool:
+    return any(marker in frame_line for marker in _LIBRARY_MARKERS)
+
+
+def _split_items(lines: List[str]) -> List[Tuple[str, List[str]]]:
+    """Group a log into ("frame", [File line, source lines...]) and ("text", [line]) items."""
+    items: List[Tuple[str, List[str]]] = []
+    for line in lines:
+        if _FRAME_RE.match(line):
+            items.append(("frame", [line]))
+        elif items and items[-1][0] == "frame" and line.startswith("    ") and len(items[-1][1]) < 4:
+            items[-1][1].append(line)     # source line / caret markers under a frame
+        else:
+            items.append(("text", [line]))
+    return items
+
+
+def _collapse_repeats(items):
+    """Collapse consecutive repeats of a frame or of a short frame cycle (recursion)."""
+    out = []
+    i = 0
+    while i < len(items):
+        collapsed = False
+        for period in (1, 2, 3):
+            block = items[i:i + period]
+            if len(block) < period or any(kind != "frame" for kind, _ in block):
+                break
+            reps = 1
+            while items[i + reps * period:i + (reps + 1) * period] == block:
+                reps += 1
+            if reps > 1:
+                out.extend(block)
+                label = "frame" if period == 1 else f"{period} frames"
+                out.append(("note", [f"  [previous {label} repeated {reps - 1} more times]"]))
+                i += reps * period
+                collapsed = True
+                break
+        if not collapsed:
+            out.append(items[i])
+            i += 1
+    return out
+
+
+def _collapse_library(items):
+    """Replace runs of library frames with a marker, keeping a run's last frame if it is innermost."""
+    out = []
+    i = 0
+    while i < len(items):
+        kind, lines = items[i]
+        if kind != "frame" or not _is_library(lines[0]):
+            out.append(items[i])
+            i += 1
+            continue
+        j = i
+        while j < len(items) and items[j][0] in ("frame", "note") and (
+                items[j][0] == "note" or _is_library(items[j][1][0])):
+            j += 1
+        innermost = j >= len(items) or items[j][0] == "text"
+        run = items[i:j]
+        keep_last = run[-1] if innermost and run[-1][0] == "frame" else None
+        omitted = sum(1 for k, _ in run if k == "frame") - (1 if keep_last else 0)
+        if omitted >= 2:
+            out.append(("note", [f"  ... {omitted} library frames omitted ..."]))
+            if keep_last:
+                out.append(keep_last)
+        else:
+            out.extend(run)
+        i = j
+    return out
+
+
+def _items_tokens(items) -> int:
+    return sum(estimate_tokens("\n".join(lines)) + 1 for _, lines in items)
+
+
+def compress_traceback(error_log: str, max_tokens: int) -> str:
+    """Shrink an error log to about `max_tokens`, keeping innermost frames and exception lines."""
+    if not error_log or estimate_tokens(error_log) <= max_tokens:
+        return error_log or ""
+    items = _collapse_library(_collapse_repeats(_split_items(error_log.splitlines())))
+
+    if _items_tokens(items) > max_tokens:
+        # drop frames from the outermost end; headers and exception lines stay
+        excess = _items_tokens(items) - max_tokens
+        frame_idx = [i for i, (k, _) in enumerate(items) if k == "frame"]
+        dropped = set()
+        for i in frame_idx[:-2]:               # always keep the two innermost frames
+            if excess <= 0:
+                break
+            dropped.add(i)
+            excess -= estimate_tokens("\n".join(items[i][1])) + 1
+        if dropped:
+            first = min(dropped)
+            marker = ("note", [f"  ... {len(dropped)} outer frames omitted ..."])
+            items = [marker if i == first else it for i, it in enumerate(items) if i == first or i not in dropped]
+
+    text = "\n".join(line for _, lines in items for line in lines)
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) > limit:
+        # still too long (e.g. megabytes of log output): keep a short head and the tail
+        head = limit // 5
+        text = text[:head] + "\n... [log truncated] ...\n" + text[-(limit - head):]
+    return text
+
+
+# ---------- assembly ----------
+def build_context(error_log: str, retrieved_docs: Optional[List[str]], fixed_text: str = "",
+                  budget: int = PROMPT_TOKEN_BUDGET, max_docs: int = TOP_K_RESULTS) -> Dict:
+    """
+    Fit the error log and retrieved docs into `budget` tokens minus whatever
+    `fixed_text` (instructions, root-cause summary, user code) already uses.
+    Returns {"error_log", "docs", "stats"}; stats are also put on the active
+    tracing span.
+    """
+    available = max(0, budget - estimate_tokens(fixed_text))
+    docs, deduped = dedupe_chunks(list(retrieved_docs or [])[:max_docs])
+    doc_need = sum(estimate_tokens(d) for d in docs)
+
+    # the log gets its share, plus whatever the docs leave unused
+    log_cap = max(int(available * PROMPT_ERROR_LOG_SHARE), available - doc_need, MIN_DOC_TOKENS)
+    log_text = compress_traceback(error_log, log_cap)
+    remaining = available - estimate_tokens(log_text)
+
+    kept: List[str] = []
+    truncated = 0
+    for doc in docs:
+        tokens = estimate_tokens(doc)
+        if tokens <= remaining:
+            kept.append(doc)
+            remaining -= tokens
+        elif remaining >= MIN_DOC_TOKENS:
+            kept.append(_truncate(doc, remaining))
+            truncated += 1
+            remaining = 0
+        else:
+            break
+
+    stats = {
+        "ctx_error_log_tokens_in": estimate_tokens(error_log),
+        "ctx_error_log_tokens": estimate_tokens(log_text),
+        "ctx_docs_in": len(retrieved_docs or []),
+        "ctx_docs_deduped": deduped,
+        "ctx_docs_kept": len(kept),
+        "ctx_docs_truncated": truncated,
+        "ctx_doc_tokens": sum(estimate_tokens(d) for d in kept),
+    }
+    tracing.annotate(**stats)
+    return {"error_log": log_text, "docs": kept, "stats": stats}
@@ -1,8 +1,105 @@
+import hashlib
+import threading
+from array import array
+
+import tracing
+from utils import LRUCache
+from config import RETRIEVAL_EMBED_CACHE_SIZE, RETRIEVAL_RESULT_CACHE_SIZE
+
+
 class RetrieverAgent:
-    def __init__(self, retriever):
-        self.retriever = retriever
+    def __init__(self, retriever=None, embed_cache_size: int = RETRIEVAL_EMBED_CACHE_SIZE,
+                 result_cache_size: int = RETRIEVAL_RESULT_CACHE_SIZE, client=None, retriever_factory=None):
+        # with a retrieval service client (rag/retrieval_service.py) the in-process
+        # retriever is only built, from `retriever_factory`, if the service is unreachable
+        self._retriever = retriever
+        self._retriever_factory = retriever_factory
+        self._build_lock = threading.Lock()
+        self.client = client
+        # the embedding model and Chroma client are shared across concurrent pipelines
+        self._lock = threading.Lock()
+        # two-level cache: query text -> embedding, (embedding, k, index version) -> texts
+        self._embeddings = LRUCache(embed_cache_size)
+        self._results = LRUCache(result_cache_size)
+        self._index_version = None
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            with self._build_lock:
+                if self._retriever is None:
+                    self._retriever = self._retriever_factory()
+        return self._retriever
+
+    def _cacheable(self) -> bool:
+        return all(hasattr(self.retriever, a) for a in ("embed_query", "search_by_vector", "index_version"))
 
     def run(self, query: str):
-        docs = self.retriever.get_relevant_documents(query)
-        # return raw text content (page_content)
-        return [d.page_content for d in docs]
+        if self.client is not None:
+            texts = self.client.retrieve(query)
+            if texts is not None:
+                tracing.annotate(query_chars=len(query), retrieval="service")
+                return texts
+        return self._run_local(query)
+
+    def _run_local(self, query: str):
+        if not self._cacheable():
+            with self._lock:
+                docs = self.retriever.get_relevant_documents(query)
+            # return raw text content (page_content)
+            return [d.page_content for d in docs]
+
+        version = self.retriever.index_version()
+        if version != self._index_version:
+            # index rebuilt: ranked results are stale, query embeddings are not
+            self._results.clear()
+            self._index_version = version
+
+        qkey = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        k = getattr(self.retriever, "k", None)
+        lexical_only = getattr(self.retriever, "lexical_only", None)
+        if lexical_only is not None:
+            # identifier-only queries: BM25 hits without touching the embedding model
+            lkey = ("lexical", qkey, k, version)
+            texts = self._results.get(lkey)
+            cached = texts is not None
+            if texts is None:
+                docs = lexical_only(query, k)
+                if docs is not None:
+                    texts = tuple(d.page_content for d in docs)
+                    self._results.put(lkey, texts)
+            if texts is not None:
+                tracing.annotate(query_chars=len(query), retrieval="lexical", results_cached=cached)
+                return list(texts)
+
+        vector = self._embeddings.get(qkey)
+        tracing.annotate(query_chars=len(query), embedding_cached=vector is not None)
+        if vector is None:
+            with self._lock:
+                vector = self.retriever.embed_query(query)
+            self._embeddings.put(qkey, vector)
+
+        hybrid = hasattr(self.retriever, "search_hybrid")
+        if hybrid:
+            # fused ranking depends on the query text as well as its embedding
+            rkey = ("hybrid", qkey, k, version)
+        else:
+            rkey = (hashlib.sha1(array("f", vector).tobytes()).hexdigest(), k, version)
+        texts = self._results.get(rkey)
+        tracing.annotate(retrieval="hybrid" if hybrid else "vector", results_cached=texts is not None)
+        if texts is None:
+            with self._lock:
+                if hybrid:
+                    docs = self.retriever.search_hybrid(query, vector, k)
+                else:
+                    docs = self.retriever.search_by_vector(vector, k)
+            texts = tuple(d.page_content for d in docs)
+            self._results.put(rkey, texts)
+        return list(texts)
+
+    def clear_cache(self):
+        self._embeddings.clear()
+        self._results.clear()
+
+    def cache_stats(self):
+        return {"embeddings": self._embeddings.stats(), "results": self._results.stats()}
@@ -1,27 +1,49 @@
 import os
 from langchain_anthropic import ChatAnthropic
+import tracing
 from config import ANTHROPIC_API_KEY
+from agents.llm_cache import get_llm_cache
+from agents.prompt_builder import build_context, estimate_tokens
+from utils import call_cancellable
 
 
 
 class RootCauseAgent:
-    def __init__(self, model_name: str = "claude-sonnet-4-20250514", temperature: float = 0.5):
-        self.llm = ChatAnthropic(
+    def __init__(self, model_name: str = "claude-sonnet-4-20250514", temperature: float = 0.5, cache=None, llm=None):
+        self.model_name = model_name
+        self.temperature = temperature
+        self.cache = cache or get_llm_cache()
+        # `llm` lets callers plug in any object with .predict(prompt) (e.g. a local stand-in)
+        self.llm = llm or ChatAnthropic(
             model=model_name,
             temperature=temperature,
             anthropic_api_key=ANTHROPIC_API_KEY,
             max_retries=2
         )
 
-    def run(self, error_log: str, retrieved_docs: list):
-        docs_text = "\n\n".join(retrieved_docs[:6]) if retrieved_docs else "No docs found."
+    INSTRUCTIONS = (
+        "1) Give 2-3 probable root causes (short). For each: reason and 1 diagnostic step.\n"
+        "2) Recommend 1 preferred fix to attempt first (short).\n\n"
+        "Return your response as plain text. If you are unsure or you think it is another language then python, say 'I don't know' and propose diagnostics."
+    )
+
+    def run(self, error_log: str, retrieved_docs: list, cancel_event=None):
+        ctx = build_context(error_log, retrieved_docs, fixed_text=self.INSTRUCTIONS)
+        docs_text = "\n\n".join(ctx["docs"]) if ctx["docs"] else "No docs found."
         prompt = (
             "You are an expert Python debugging assistant.\n\n"
-            f"Error log:\n{error_log}\n\n"
+            f"Error log:\n{ctx['error_log']}\n\n"
             f"Retrieved docs (top results):\n{docs_text}\n\n"
-            "1) Give 2-3 probable root causes (short). For each: reason and 1 diagnostic step.\n"
-            "2) Recommend 1 preferred fix to attempt first (short).\n\n"
-            "Return your response as plain text. If you are unsure or you think it is another language then python, say 'I don't know' and propose diagnostics."
+            f"{self.INSTRUCTIONS}"
         )
-        resp = self.llm.predict(prompt)
+        tracing.annotate(prompt_tokens=estimate_tokens(prompt))
+        key = self.cache.key(self.model_name, self.temperature, prompt, "root_cause")
+        cached = self.cache.get(key)
+        if cached is not None:
+            tracing.annotate(prompt_chars=len(prompt), response_chars=len(cached), cached=True)
+            return cached
+        # a set cancel_event abandons the in-flight call (raises utils.Cancelled)
+        resp = call_cancellable(lambda: self.llm.predict(prompt), cancel_event)
+        self.cache.put(key, resp)
+        tracing.annotate(prompt_chars=len(prompt), response_chars=len(resp), cached=False)
         return resp
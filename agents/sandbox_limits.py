@@ -0,0 +1,125 @@
+# agents/sandbox_limits.py
+"""
+Per-run resource limits for the execution sandbox.
+
+EXECUTION_TIMEOUT only bounds wall-clock time, so a runaway patch could
+allocate gigabytes or spin every core until then. Local runs (plain
+subprocess and warm-pool children) get rlimits on CPU seconds, address
+space, open files and (opt-in) processes; Docker runs get the matching
+`--cpus/--memory/--pids-limit/--ulimit` flags.
+
+Plain subprocess runs set their rlimits in a small exec shim
+(`limited_command()`) rather than a Popen `preexec_fn`: the sandbox is
+driven from threads (batch, speculative candidates, job workers), and
+running Python between fork and exec in a threaded parent can deadlock.
+
+`kill_reason()` classifies a finished run so ValidatorAgent can tell "the
+fix is wrong" from "the run was stopped for using too much".
+
+Stdlib only; a limit of 0 disables it.
+"""
+
+import sys
+import json
+import signal
+from typing import Dict, List, Optional, Tuple
+
+from config import (SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_MAX_OPEN_FILES, SANDBOX_MAX_PROCESSES,
+                    SANDBOX_LOCAL_MAX_PROCESSES, SANDBOX_DOCKER_CPUS)
+
+try:
+    import resource
+except ImportError:          # Windows: no rlimits, runs are only bounded by the timeout
+    resource = None
+
+KILL_REASONS = ("timeout", "cpu_limit", "memory_limit", "open_files_limit", "process_limit")
+
+
+def rlimits() -> Dict[str, Tuple[int, int]]:
+    """{resource name: (soft, hard)} for a sandboxed run, e.g. {"RLIMIT_CPU": (20, 21)}."""
+    limits = {}
+    if SANDBOX_CPU_SECONDS > 0:
+        # SIGXCPU at the soft limit, SIGKILL a second later if it is ignored
+        limits["RLIMIT_CPU"] = (SANDBOX_CPU_SECONDS, SANDBOX_CPU_SECONDS + 1)
+    if SANDBOX_MEMORY_MB > 0:
+        limits["RLIMIT_AS"] = (SANDBOX_MEMORY_MB * 1024 * 1024,) * 2
+    if SANDBOX_MAX_OPEN_FILES > 0:
+        limits["RLIMIT_NOFILE"] = (SANDBOX_MAX_OPEN_FILES,) * 2
+    if SANDBOX_LOCAL_MAX_PROCESSES > 0 and sys.platform.startswith("linux"):
+        # counted per real user across all its processes and threads, not per run; root is exempt
+        limits["RLIMIT_NPROC"] = (SANDBOX_LOCAL_MAX_PROCESSES,) * 2
+    return limits if resource is not None else {}
+
+
+# argv: limits JSON, then the command to exec; -S skips site so the shim costs a few ms
+_SHIM = (
+    "import os, sys, json, resource\n"
+    "for name, (soft, hard) in json.loads(sys.argv[1]).items():\n"
+    "    res = getattr(resource, name, None)\n"
+    "    if res is None:\n"
+    "        continue\n"
+    "    cur_hard = resource.getrlimit(res)[1]\n"
+    "    if cur_hard != resource.RLIM_INFINITY:\n"
+    "        soft, hard = min(soft, cur_hard), min(hard, cur_hard)\n"
+    "    resource.setrlimit(res, (soft, hard))\n"
+    "os.execvp(sys.argv[2], sys.argv[2:])\n"
+)
+
+
+def limited_command(cmd: List[str]) -> List[str]:
+    """`cmd` wrapped so it runs under rlimits(); unchanged when there is nothing to limit."""
+    limits = rlimits()
+    if not limits:
+        return list(cmd)
+    return [sys.executable, "-S", "-c", _SHIM, json.dumps(limits), *cmd]
+
+
+def docker_flags() -> List[str]:
+    """`docker run` flags enforcing the same limits on a container."""
+    flags = []
+    if SANDBOX_DOCKER_CPUS:
+        flags += ["--cpus", SANDBOX_DOCKER_CPUS]
+    if SANDBOX_MEMORY_MB > 0:
+        # no swap on top of the memory limit
+        flags += ["--memory", f"{SANDBOX_MEMORY_MB}m", "--memory-swap", f"{SANDBOX_MEMORY_MB}m"]
+    if SANDBOX_MAX_PROCESSES > 0:
+        flags += ["--pids-limit", str(SANDBOX_MAX_PROCESSES)]
+    if SANDBOX_MAX_OPEN_FILES > 0:
+        flags += ["--ulimit", f"nofile={SANDBOX_MAX_OPEN_FILES}:{SANDBOX_MAX_OPEN_FILES}"]
+    if SANDBOX_CPU_SECONDS > 0:
+        flags += ["--ulimit", f"cpu={SANDBOX_CPU_SECONDS}:{SANDBOX_CPU_SECONDS + 1}"]
+    return flags
+
+
+def usage_from_rusage(ru) -> Dict[str, Optional[float]]:
+    """{"cpu_seconds", "max_rss"} (max_rss in bytes) from a resource.struct_rusage."""
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"cpu_seconds": round(ru.ru_utime + ru.ru_stime, 4), "max_rss": ru.ru_maxrss * scale}
+
+
+def kill_reason(result: dict, docker: bool = False) -> Optional[str]:
+    """Which limit (one of KILL_REASONS) stopped the run, or None if it ended on its own."""
+    if result.get("cancelled"):
+        return None
+    rc = result.get("returncode")
+    stderr = result.get("stderr") or ""
+    tail = stderr[-2000:]
+    if stderr.startswith("TIMEOUT"):
+        return "timeout"
+    cpu = result.get("cpu_seconds")
+    if rc == -getattr(signal, "SIGXCPU", 24) or (
+            SANDBOX_CPU_SECONDS > 0 and cpu is not None and cpu >= SANDBOX_CPU_SECONDS and rc != 0):
+        return "cpu_limit"
+    if docker and rc == 152:                       # 128 + SIGXCPU inside the container
+        return "cpu_limit"
+    if SANDBOX_MEMORY_MB > 0 and ("MemoryError" in tail or (docker and rc == 137)):
+        return "memory_limit"                      # 137 = OOM-killed container process
+    if "Too many open files" in tail:
+        return "open_files_limit"
+    process_limit = SANDBOX_MAX_PROCESSES if docker else SANDBOX_LOCAL_MAX_PROCESSES
+    if process_limit > 0 and "Resource temporarily unavailable" in tail and (
+            "fork" in tail or "BlockingIOError" in tail or "can't start new thread" in tail):
+        return "process_limit"
+    return None
+
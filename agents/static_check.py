@@ -0,0 +1,164 @@
+# agents/static_check.py
+"""
+In-process checks on a generated patch before it is handed to the sandbox.
+
+A patch that does not parse, whose best fenced block is prose or shell, that
+unconditionally imports a module the sandbox does not have, or that is just the generator's
+"I don't know - not a Python error." reply fails the same way every time.
+Catching those here costs microseconds instead of a subprocess or container
+round trip. ExecutionAgent returns the errors as a failed execution result
+(`static_check` lists them), so they reach the validator and the next
+attempt's prompt like any other failure.
+
+Only imports that always run are checked: a guarded fallback
+(`try: import ujson ... except ImportError: import json`, or an import under
+`if sys.version_info < ...`) is the usual fix for a ModuleNotFoundError, so
+imports inside guarded `try` bodies, `if` branches and function bodies are
+left to the sandbox.
+"""
+
+import ast
+import re
+import sys
+import importlib.util
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from config import USE_DOCKER_SANDBOX, SANDBOX_MODULES
+
+DIAGNOSTIC_PHRASE = "I don't know - not a Python error."
+
+_FENCE_RE = re.compile(r"```[ \t]*(?P<lang>[\w+\-.]*)[^\n]*\n(?P<body>.*?)```", re.DOTALL)
+_PYTHON_LANGS = {"", "python", "python3", "py", "py3"}
+# except clauses that make the imports in their try body optional
+_IMPORT_GUARDS = {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+
+def fenced_blocks(text: str) -> List[Tuple[str, str]]:
+    """(language tag, body) of every fenced block in `text`, in order."""
+    return [(m.group("lang").lower(), m.group("body")) for m in _FENCE_RE.finditer(text or "")]
+
+
+def _compiles(code: str) -> bool:
+    try:
+        compile(code, "<patch>", "exec")
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+
+def select_code(text: str) -> str:
+    """
+    The code to run from an LLM reply: among the Python (or untagged) fenced
+    blocks, the longest one that compiles, else the longest one; the whole
+    reply when it has no fences.
+    """
+    blocks = fenced_blocks(text)
+    if not blocks:
+        # an unterminated fence: drop the opening line and run the rest
+        if "```" in (text or ""):
+            rest = text.split("```", 1)[1]
+            return rest.split("\n", 1)[1] if "\n" in rest else ""
+        return text or ""
+    python = [body for lang, body in blocks if lang in _PYTHON_LANGS] or [body for _, body in blocks]
+    valid = [body for body in python if _compiles(body)]
+    return max(valid or python, key=len)
+
+
+@lru_cache(maxsize=None)
+def _importable_locally(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def module_available(name: str, docker: bool = USE_DOCKER_SANDBOX) -> bool:
+    """
+    Whether top-level module `name` can be imported in the sandbox: the
+    stdlib plus SANDBOX_MODULES in Docker mode, this interpreter's
+    environment for local runs (which run sys.executable).
+    """
+    if name in sys.builtin_module_names or name in sys.stdlib_module_names or name in SANDBOX_MODULES:
+        return True
+    return not docker and _importable_locally(name)
+
+
+def _guards_imports(handler: ast.ExceptHandler) -> bool:
+    """Whether the except clause catches a failed import (bare except included)."""
+    if handler.type is None:
+        return True
+    types = handler.type.elts if isinstance(handler.type, ast.Tuple) else [handler.type]
+    for t in types:
+        name = t.attr if isinstance(t, ast.Attribute) else getattr(t, "id", None)
+        if name in _IMPORT_GUARDS:
+            return True
+    return False
+
+
+def _imported_modules(body: List[ast.stmt]) -> List[Tuple[str, int, int]]:
+    """
+    (top-level module, line, relative level) of the imports that always run
+    when the module executes: module level, class bodies, `with` blocks and
+    unguarded `try` bodies. `if`/loop branches, function bodies and guarded
+    `try` bodies (and their handlers) are conditional and skipped.
+    """
+    found = []
+    for node in body:
+        if isinstance(node, ast.Import):
+            found.extend((alias.name.split(".")[0], node.lineno, 0) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            found.append(((node.module or "").split(".")[0], node.lineno, node.level))
+        elif isinstance(node, (ast.ClassDef, ast.With, ast.AsyncWith)):
+            found.extend(_imported_modules(node.body))
+        elif isinstance(node, (ast.Try, getattr(ast, "TryStar", ast.Try))):
+            if not any(_guards_imports(h) for h in node.handlers):
+                found.extend(_imported_modules(node.body))
+            found.extend(_imported_modules(node.orelse))
+            found.extend(_imported_modules(node.finalbody))
+    return found
+
+
+def _error(kind: str, message: str, line: Optional[int] = None) -> Dict:
+    return {"kind": kind, "message": message, "line": line}
+
+
+def check_patch(text: str, docker: bool = USE_DOCKER_SANDBOX) -> Dict:
+    """
+    Returns {"ok", "code", "errors"}; each error is {"kind", "message", "line"}
+    with kind one of diagnostic, empty, syntax, import.
+    """
+    if (text or "").strip().startswith(DIAGNOSTIC_PHRASE.rstrip(".")):
+        return {"ok": False, "code": "",
+                "errors": [_error("diagnostic", "the model answered that this is not a Python error")]}
+    code = select_code(text)
+    if not code.strip():
+        return {"ok": False, "code": code, "errors": [_error("empty", "no code found in the patch")]}
+
+    try:
+        tree = ast.parse(code, "<patch>")
+        # compiling the tree also catches e.g. 'return' outside a function or a misplaced 'nonlocal'
+        compile(tree, "<patch>", "exec")
+    except SyntaxError as e:
+        return {"ok": False, "code": code,
+                "errors": [_error("syntax", f"{type(e).__name__}: {e.msg}", e.lineno)]}
+    except ValueError as e:           # e.g. null bytes in the source
+        return {"ok": False, "code": code, "errors": [_error("syntax", f"ValueError: {e}")]}
+
+    errors, seen = [], set()
+    for name, line, level in _imported_modules(tree.body):
+        if level:
+            errors.append(_error("import", "relative import in a standalone script", line))
+        elif name not in seen and not module_available(name, docker):
+            errors.append(_error("import", f"module '{name}' is not available in the sandbox", line))
+        seen.add(name)
+    return {"ok": not errors, "code": code, "errors": errors}
+
+
+def format_errors(errors: List[Dict]) -> str:
+    """stderr text for a rejected patch, one error per line."""
+    lines = ["STATIC CHECK FAILED (patch was not executed):"]
+    for err in errors:
+        where = f"line {err['line']}: " if err.get("line") else ""
+        lines.append(f"  [{err['kind']}] {where}{err['message']}")
+    return "\n".join(lines)
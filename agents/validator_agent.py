@@ -1,7 +1,22 @@
+# what the patch did when the sandbox stopped it (see agents/sandbox_limits.kill_reason)
+KILL_MESSAGES = {
+    "timeout": "ran past the execution timeout (infinite loop or blocking call?)",
+    "cpu_limit": "exceeded the CPU time limit (runaway computation?)",
+    "memory_limit": "exceeded the memory limit (unbounded allocation?)",
+    "open_files_limit": "exceeded the open-files limit (leaking file handles?)",
+    "process_limit": "exceeded the process limit (fork/thread bomb?)",
+}
+
+
 class ValidatorAgent:
     def run(self, execution_result: dict):
         rc = execution_result.get("returncode")
         if rc == 0:
             return True, "Return code 0 — likely fixed."
         stderr = execution_result.get("stderr") or ""
+        if execution_result.get("static_check"):
+            return False, f"Patch rejected before execution. {stderr[:1000]}"
+        reason = execution_result.get("kill_reason")
+        if reason:
+            return False, f"Patch was killed by the sandbox: {KILL_MESSAGES.get(reason, reason)}. stderr excerpt: {stderr[-1000:]}"
         return False, f"Non-zero return code ({rc}). stderr excerpt: {stderr[:1000]}"
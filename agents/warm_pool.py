@@ -0,0 +1,359 @@
+# agents/warm_pool.py
+"""
+Warm interpreter pool for local sandbox runs (forkserver-style).
+
+Each pool worker is a long-lived `python` process that pre-imports heavy
+modules once (numpy, pandas, ...) and then waits for jobs on stdin. For every
+job it forks a fresh child which runs the patch file as `__main__` with
+stdout/stderr redirected to files, so runs stay isolated from each other while
+skipping interpreter startup and the heavy imports.
+
+Protocol (one JSON object per line):
+  client -> worker: {"path", "stdout_path", "stderr_path", "timeout", "rlimits"}
+  worker -> client: {"returncode", "timed_out", "cpu_seconds", "max_rss"}
+The child applies `rlimits` ({name: [soft, hard]}, see agents/sandbox_limits)
+right after the fork; RLIMIT_AS counts on top of the address space the
+pre-imports already use.
+SIGUSR1 to the worker kills the job's process group (cancellation); the
+worker then answers as usual and stays in the pool.
+
+This module only imports the standard library at top level because it is
+also executed directly as the worker program.
+"""
+
+import os
+import sys
+import json
+import time
+import select
+import signal
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from typing import Deque, List, Optional
+
+
+# ---------- worker side ----------
+_current_child: Optional[int] = None
+
+
+def _cancel_current(signum, frame):
+    pid = _current_child
+    if not pid:
+        return
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        try:
+            os.kill(pid, signal.SIGKILL)   # child had not called setsid() yet
+        except ProcessLookupError:
+            pass
+
+
+def _print_exception(exc: BaseException, path: str):
+    import traceback
+    # drop runpy/worker frames so the traceback looks like `python file.py`
+    tb = exc.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != path:
+        tb = tb.tb_next
+    traceback.print_exception(type(exc), exc, tb)
+
+
+def _address_space() -> int:
+    """Current virtual memory size of this process in bytes (0 if unknown)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _apply_rlimits(limits: dict):
+    import resource
+    for name, (soft, hard) in limits.items():
+        res = getattr(resource, name, None)
+        if res is None:
+            continue
+        if name == "RLIMIT_AS":
+            # the forked child starts with the worker's (pre-imported) address space
+            base = _address_space()
+            soft, hard = soft + base, hard + base
+        _, cur_hard = resource.getrlimit(res)
+        if cur_hard != resource.RLIM_INFINITY:
+            soft, hard = min(soft, cur_hard), min(hard, cur_hard)
+        resource.setrlimit(res, (soft, hard))
+
+
+def _child_main(req: dict) -> int:
+    import runpy
+
+    path = req["path"]
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    _apply_rlimits(req.get("rlimits") or {})
+    os.setsid()  # own process group, so a timeout kills anything the patch spawned
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    out_fd = os.open(req["stdout_path"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    err_fd = os.open(req["stderr_path"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    os.dup2(out_fd, 1)
+    os.dup2(err_fd, 2)
+
+    sys.argv = [path]
+    sys.path[0] = os.path.dirname(path)
+    code = 0
+    try:
+        runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        _print_exception(e, path)
+        code = 1
+    return code
+
+
+def _run_forked(req: dict) -> dict:
+    global _current_child
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = _child_main(req)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code & 0xFF)
+
+    _current_child = pid
+    deadline = time.monotonic() + float(req.get("timeout", 20))
+    timed_out = False
+    while True:
+        wpid, status, ru = os.wait4(pid, os.WNOHANG)
+        if wpid:
+            break
+        if time.monotonic() >= deadline:
+            timed_out = True
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, status, ru = os.wait4(pid, 0)
+            break
+        time.sleep(0.005)
+    _current_child = None
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"returncode": os.waitstatus_to_exitcode(status), "timed_out": timed_out,
+            "cpu_seconds": round(ru.ru_utime + ru.ru_stime, 4), "max_rss": ru.ru_maxrss * scale}
+
+
+def _serve(preimports: List[str]):
+    # keep the protocol channel private: anything printed by pre-imports or by
+    # the worker itself goes to stderr instead of corrupting responses
+    channel = os.fdopen(os.dup(1), "w", buffering=1)
+    os.dup2(2, 1)
+
+    for name in preimports:
+        try:
+            __import__(name)
+        except Exception:
+            pass  # unavailable modules are simply imported cold by the patch
+
+    signal.signal(signal.SIGUSR1, _cancel_current)
+    channel.write("READY\n")
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            res = _run_forked(json.loads(line))
+        except Exception as e:
+            res = {"returncode": -1, "timed_out": False, "error": repr(e)}
+        channel.write(json.dumps(res) + "\n")
+
+
+# ---------- client side ----------
+class _Worker:
+    def __init__(self, python: str, preimports: List[str]):
+        self.proc = subprocess.Popen(
+            [python, os.path.abspath(__file__), ",".join(preimports)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        self.runs = 0
+
+    def readline(self, timeout: float) -> Optional[str]:
+        ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        if not ready:
+            return None
+        return self.proc.stdout.readline()
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self):
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class WarmInterpreterPool:
+    """
+    Pool of pre-started, pre-imported interpreters. `run()` keeps the result
+    shape of ExecutionAgent._run_local: {"stdout", "stderr", "returncode"}.
+    """
+
+    def __init__(self, size: int = 2, preimports: Optional[List[str]] = None, python: str = sys.executable,
+                 startup_timeout: float = 60.0, rlimits: Optional[dict] = None):
+        self.size = max(1, size)
+        self.rlimits = rlimits or {}
+        self.preimports = [m.strip() for m in (preimports or []) if m.strip()]
+        self.python = python
+        self.startup_timeout = startup_timeout
+        self._idle: Deque[_Worker] = deque()
+        self._spawned = 0
+        # guards _idle/_spawned; notified whenever a worker is released or a slot frees up
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def _spawn(self) -> _Worker:
+        w = _Worker(self.python, self.preimports)
+        line = w.readline(self.startup_timeout)
+        if line is None or line.strip() != "READY":
+            w.kill()
+            raise RuntimeError("warm interpreter failed to start")
+        return w
+
+    def _acquire(self) -> _Worker:
+        with self._cond:
+            while not self._idle and self._spawned >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.popleft()
+            self._spawned += 1
+        try:
+            return self._spawn()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        with self._cond:
+            self._spawned -= 1
+            # a waiter may now spawn a replacement worker
+            self._cond.notify()
+
+    def _release(self, w: _Worker):
+        if self._closed or not w.alive():
+            w.kill()
+            self._free_slot()
+            return
+        with self._cond:
+            self._idle.append(w)
+            self._cond.notify()
+
+    def start(self):
+        """Pre-spawn every worker (otherwise they start on first use)."""
+        workers = [self._acquire() for _ in range(self.size - self._spawned)]
+        for w in workers:
+            self._release(w)
+
+    def run(self, file_path: str, timeout: float, cancel_event: Optional[threading.Event] = None) -> dict:
+        out_fd, out_path = tempfile.mkstemp(suffix=".stdout")
+        err_fd, err_path = tempfile.mkstemp(suffix=".stderr")
+        os.close(out_fd)
+        os.close(err_fd)
+        w = None
+        try:
+            w = self._acquire()
+            req = {"path": os.path.abspath(file_path), "stdout_path": out_path,
+                   "stderr_path": err_path, "timeout": timeout, "rlimits": self.rlimits}
+            w.proc.stdin.write(json.dumps(req) + "\n")
+            w.proc.stdin.flush()
+            deadline = time.monotonic() + timeout + 10
+            cancelled = False
+            line = None
+            while line is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                polling = cancel_event is not None and not cancelled
+                line = w.readline(min(remaining, 0.05) if polling else remaining)
+                if line is None and polling and cancel_event.is_set():
+                    cancelled = True
+                    os.kill(w.proc.pid, signal.SIGUSR1)
+                    deadline = min(deadline, time.monotonic() + 5)
+            if cancelled and line:
+                w.runs += 1
+                return {"stdout": "", "stderr": "CANCELLED", "returncode": -1, "cancelled": True}
+            if not line:
+                # worker hung or died; drop it and report like a failed exec
+                w.kill()
+                return {"stdout": "", "stderr": "EXEC ERROR: warm interpreter did not respond", "returncode": -1}
+            w.runs += 1
+            res = json.loads(line)
+            usage = {k: res[k] for k in ("cpu_seconds", "max_rss") if k in res}
+            if res.get("timed_out"):
+                return {"stdout": "", "stderr": f"TIMEOUT: patch timed out after {timeout} seconds", "returncode": -1,
+                        **usage}
+            if "error" in res:
+                return {"stdout": "", "stderr": f"EXEC ERROR: {res['error']}", "returncode": -1}
+            with open(out_path, "r", encoding="utf-8", errors="replace") as fh:
+                stdout = fh.read()
+            with open(err_path, "r", encoding="utf-8", errors="replace") as fh:
+                stderr = fh.read()
+            return {"stdout": stdout, "stderr": stderr, "returncode": res["returncode"], **usage}
+        except Exception as e:
+            return {"stdout": "", "stderr": f"EXEC ERROR: {e}", "returncode": -1}
+        finally:
+            if w is not None:
+                self._release(w)
+            for p in (out_path, err_path):
+                try:
+                    os.remove(p)
+                except Exception:
+                    pass
+
+    def close(self):
+        self._closed = True
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for w in idle:
+            w.kill()
+
+
+_pool: Optional[WarmInterpreterPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_warm_pool() -> WarmInterpreterPool:
+    """Process-wide pool shared by every ExecutionAgent."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import atexit
+            from config import WARM_POOL_SIZE, WARM_POOL_PREIMPORTS
+            from agents.sandbox_limits import rlimits
+            _pool = WarmInterpreterPool(WARM_POOL_SIZE, WARM_POOL_PREIMPORTS.split(","), rlimits=rlimits())
+            atexit.register(_pool.close)
+        return _pool
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1].split(",") if len(sys.argv) > 1 else [])
@@ -1,9 +1,19 @@
 import streamlit as st
-from graph import debug_pipeline
+import registry
+from graph import iter_debug_pipeline
 
 st.set_page_config(page_title="Agentic RAG Debugger", layout="wide")
 st.title("🔧 Agentic RAG — Autonomous Code Debugger")
 
+
+@st.cache_resource(show_spinner="Loading embedding model, vector store and agents ...")
+def _warm_up_agents():
+    # built once per server process and reused across script reruns and sessions
+    return registry.warm_up()
+
+
+_warm_up_agents()
+
 st.markdown("""
 Paste an error log below (from Python, PyTorch, etc.).  
 Optionally upload the failing `.py` file (or paste the snippet).  
@@ -23,12 +33,59 @@ if uploaded_file:
     except Exception:
         code_snippet = None
 
+NODE_LABELS = {
+    "retrieve": "Retrieving related docs",
+    "analyze": "Analyzing root cause",
+    "generate": "Generating patch",
+    "execute": "Running patch in sandbox",
+    "validate": "Validating",
+}
+
+
+def _render_event(status, ev):
+    """Show one iter_debug_pipeline event inside the live status box."""
+    kind = ev["type"]
+    if kind == "node_started":
+        status.update(label=f"Attempt {ev['attempt']}: {NODE_LABELS.get(ev['node'], ev['node'])} ...")
+    elif kind == "attempt_started":
+        status.markdown(f"#### Attempt {ev['attempt']}")
+    elif kind == "fix_memory_hit":
+        status.write("Found a previously validated fix for this error — re-running it.")
+    elif kind == "retrieved_docs":
+        # st.status is itself an expander, and expanders can't be nested
+        status.write(f"Retrieved {len(ev['docs'])} doc chunk(s)")
+        for doc in ev["docs"]:
+            status.caption(doc[:300])
+    elif kind == "root_cause":
+        status.write("Root cause summary:")
+        status.text(ev["summary"][:2000])
+    elif kind == "patch" and ev.get("patch_text"):
+        status.write("Patch generated:")
+        status.code(ev["patch_text"][:4000])
+    elif kind == "execution":
+        er = ev.get("execution_result") or {}
+        status.json({"returncode": er.get("returncode"), "stderr": (er.get("stderr") or "")[:1000]})
+    elif kind == "validation":
+        v = ev.get("validation") or {}
+        (status.success if v.get("success") else status.warning)(v.get("message", ""))
+    elif kind == "error":
+        status.error(ev["error"])
+
+
 if st.button("Debug"):
     if not error_log.strip():
         st.error("Please paste an error log.")
     else:
-        with st.spinner("Running agentic RAG debugger..."):
-            res = debug_pipeline(error_log, user_code_snippet=code_snippet)
+        # clicking Stop reruns the script; the abandoned event generator then cancels the run
+        st.button("Stop")
+        res = {"status": "failed", "message": "pipeline ended without a result"}
+        with st.status("Running agentic RAG debugger...", expanded=True) as status:
+            for ev in iter_debug_pipeline(error_log, user_code_snippet=code_snippet):
+                _render_event(status, ev)
+                if ev["type"] == "done":
+                    res = ev["result"]
+            status.update(label=f"Finished: {res['status']}",
+                          state="complete" if res["status"] == "fixed" else "error", expanded=False)
         st.write("Attempts:", res.get("attempts"))
 
         if res["status"] == "fixed":
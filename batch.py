@@ -0,0 +1,197 @@
+# batch.py
+"""
+Concurrent batch debugging over graph.debug_pipeline.
+
+Input is either a directory or a JSONL file:
+  - directory: every *.log / *.txt file is an error log; a sibling file with
+    the same stem and a .py extension is used as the code snippet.
+  - JSONL: one object per line with "error_log" and optionally "id",
+    "user_code_snippet" and "max_attempts".
+
+Pipelines run on a thread pool (the work is dominated by LLM calls and
+sandbox subprocesses), results are streamed as they finish, and a summary
+with throughput and p50/p95 latency per stage is printed at the end.
+
+    python batch.py ci_failures/ --concurrency 16 --out results.jsonl
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from config import BATCH_CONCURRENCY, MAX_ATTEMPTS
+
+LOG_EXTENSIONS = (".log", ".txt")
+
+
+def load_jobs(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield job dicts from a directory of logs or a JSONL file."""
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.lower().endswith(LOG_EXTENSIONS):
+                continue
+            log_path = os.path.join(path, name)
+            with open(log_path, "r", encoding="utf-8", errors="replace") as fh:
+                job = {"id": name, "error_log": fh.read()}
+            snippet_path = os.path.splitext(log_path)[0] + ".py"
+            if os.path.exists(snippet_path):
+                with open(snippet_path, "r", encoding="utf-8", errors="replace") as fh:
+                    job["user_code_snippet"] = fh.read()
+            yield job
+        return
+
+    with open(path, "r", encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Skipping malformed JSONL line {lineno}: {e}", file=sys.stderr)
+                continue
+            if not job.get("error_log"):
+                print(f"⚠️ Skipping line {lineno}: missing 'error_log'", file=sys.stderr)
+                continue
+            job.setdefault("id", str(lineno))
+            yield job
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class BatchStats:
+    """Thread-safe latency/throughput accumulator for a batch run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.total: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, result: Dict[str, Any]):
+        with self._lock:
+            self.total.append(result["elapsed"])
+            self.statuses[result["status"]] = self.statuses.get(result["status"], 0) + 1
+            for attempt in (result.get("result") or {}).get("history", []):
+                for stage, secs in (attempt.get("timings") or {}).items():
+                    self.stages.setdefault(stage, []).append(secs)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            wall = time.perf_counter() - self.started
+            n = len(self.total)
+            return {
+                "jobs": n,
+                "statuses": dict(self.statuses),
+                "wall_seconds": round(wall, 3),
+                "throughput_per_min": round(60.0 * n / wall, 2) if wall > 0 else 0.0,
+                "latency": {
+                    "pipeline": {"p50": _percentile(self.total, 50), "p95": _percentile(self.total, 95)},
+                    **{
+                        stage: {"p50": _percentile(v, 50), "p95": _percentile(v, 95), "count": len(v)}
+                        for stage, v in self.stages.items()
+                    },
+                },
+            }
+
+
+def _run_job(job: Dict[str, Any], max_attempts: int) -> Dict[str, Any]:
+    from graph import debug_pipeline
+
+    start = time.perf_counter()
+    try:
+        res = debug_pipeline(
+            job["error_log"],
+            user_code_snippet=job.get("user_code_snippet"),
+            max_attempts=int(job.get("max_attempts") or max_attempts),
+        )
+        status = res.get("status", "failed")
+    except Exception as e:
+        res = {"status": "error", "message": repr(e)}
+        status = "error"
+    return {"id": job.get("id"), "status": status, "elapsed": time.perf_counter() - start, "result": res}
+
+
+def run_batch(
+    jobs: Iterable[Dict[str, Any]],
+    concurrency: int = BATCH_CONCURRENCY,
+    max_attempts: int = MAX_ATTEMPTS,
+    stats: Optional[BatchStats] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run debug_pipeline over `jobs` with at most `concurrency` pipelines in
+    flight, yielding {"id", "status", "elapsed", "result"} as each finishes.
+    Jobs are pulled lazily, so large inputs are never fully materialised.
+    """
+    concurrency = max(1, concurrency)
+    jobs = iter(jobs)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(_run_job, job, max_attempts))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                result = fut.result()
+                if stats is not None:
+                    stats.add(result)
+                yield result
+            for job in jobs:
+                pending.add(executor.submit(_run_job, job, max_attempts))
+                if len(pending) >= concurrency:
+                    break
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Debug many error logs concurrently.")
+    parser.add_argument("input", help="directory of *.log/*.txt files or a JSONL file")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+    parser.add_argument("--out", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--metrics-out", default=None, help="write Prometheus-text node metrics here at the end")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input not found: {args.input}", file=sys.stderr)
+        return 1
+
+    import registry
+    print("Warming up agents ...", file=sys.stderr)
+    registry.warm_up()
+
+    stats = BatchStats()
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        for result in run_batch(load_jobs(args.input), args.concurrency, args.max_attempts, stats):
+            out.write(json.dumps(result, default=str) + "\n")
+            out.flush()
+            print(f"[{result['status']}] {result['id']} in {result['elapsed']:.1f}s", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(json.dumps(stats.summary(), indent=2), file=sys.stderr)
+    if args.metrics_out:
+        from tracing import METRICS
+        METRICS.write_prometheus(args.metrics_out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,24 +6,103 @@ ANTHROPIC_API_KEY = 'Your-API-Key'
 # Paths
 VECTOR_DB_PATH = 'data/vector_db'
 DOCS_PATH = 'data/docs'                 # Local PDF's and text are stored here
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "")   # per-file state for incremental builds; "" = next to each backend's collection
+
+# Vector backend: "chroma" (persistent Chroma client) or "flat" (memory-mapped NumPy matrix, rag/flat_store.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+FLAT_STORE_DTYPE = os.getenv("FLAT_STORE_DTYPE", "float32")    # float16 halves the file and page-cache footprint
+FLAT_STORE_QUANTIZATION = os.getenv("FLAT_STORE_QUANTIZATION", "none")   # "int8": search on int8 codes, re-rank exactly
+FLAT_RERANK_FACTOR = int(os.getenv("FLAT_RERANK_FACTOR", "10"))          # shortlist = factor * k rows re-ranked
 
 # Embeddings (Hugging Face)
 EMBEDDING_MODEL = "all-MiniLM-L6-v2"
 EMBEDDING_BATCH_SIZE = 64
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))            # CPU index builds: encoder processes; 0 = os.cpu_count()
+EMBEDDING_TOKEN_BUDGET = int(os.getenv("EMBEDDING_TOKEN_BUDGET", "8192"))  # padded tokens per batch in the embedding pool
 USE_GPU = None
 
 # RAG SETTING
 CHUNK_SIZE = 800
 CHUNK_OVERLAP = 100
 TOP_K_RESULTS = 6
+RETRIEVAL_EMBED_CACHE_SIZE = int(os.getenv("RETRIEVAL_EMBED_CACHE_SIZE", "256"))     # query text -> embedding
+RETRIEVAL_RESULT_CACHE_SIZE = int(os.getenv("RETRIEVAL_RESULT_CACHE_SIZE", "1024"))  # (embedding, k, index) -> docs
+HYBRID_RETRIEVAL = bool(int(os.getenv("HYBRID_RETRIEVAL", "1")))     # fuse BM25 (rag/lexical_index.py) with vector hits
+LEXICAL_FAST_PATH = bool(int(os.getenv("LEXICAL_FAST_PATH", "1")))   # identifier-only queries skip the embedding model
+RRF_K = int(os.getenv("RRF_K", "60"))                                # reciprocal-rank-fusion constant
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "")       # e.g. http://127.0.0.1:8765; empty = retrieve in-process
+RETRIEVAL_SERVICE_HOST = os.getenv("RETRIEVAL_SERVICE_HOST", "127.0.0.1")
+RETRIEVAL_SERVICE_PORT = int(os.getenv("RETRIEVAL_SERVICE_PORT", "8765"))
+RETRIEVAL_SERVICE_MAX_BATCH = int(os.getenv("RETRIEVAL_SERVICE_MAX_BATCH", "32"))          # queries per embedding call
+RETRIEVAL_SERVICE_BATCH_WAIT_MS = float(os.getenv("RETRIEVAL_SERVICE_BATCH_WAIT_MS", "5"))  # how long a batch may wait to fill
+RETRIEVAL_SERVICE_TIMEOUT = float(os.getenv("RETRIEVAL_SERVICE_TIMEOUT", "10"))            # client seconds before falling back
+
+# Index build pipeline
+PARSE_CACHE_ENABLED = bool(int(os.getenv("PARSE_CACHE_ENABLED", "1")))  # reuse extracted PDF text across builds
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", "data/cache/parsed")
+DEDUP_ENABLED = bool(int(os.getenv("DEDUP_ENABLED", "1")))       # strip page furniture + drop near-duplicate chunks
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))    # estimated Jaccard (word 3-grams) that counts as a duplicate
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", "0"))           # parser processes; 0 = os.cpu_count()
+LOADER_MAX_PENDING = int(os.getenv("LOADER_MAX_PENDING", "0"))   # files in flight; 0 = one per worker
 
 # Execution sandbox
 USE_DOCKER_SANDBOX = bool(int(os.getenv("USE_DOCKER_SANDBOX", "0")))
 SANDBOX_DOCKER_IMAGE = os.getenv("SANDBOX_DOCKER_IMAGE", "python:3.11-slim")
+DOCKER_CLI = os.getenv("DOCKER_CLI", "docker")                      # e.g. "python Scripts/fake_docker.py" for testing
+DOCKER_POOL_SIZE = int(os.getenv("DOCKER_POOL_SIZE", "0"))          # >0: reuse long-lived containers via docker exec
+DOCKER_POOL_MAX_RUNS = int(os.getenv("DOCKER_POOL_MAX_RUNS", "50")) # recycle a container after this many runs
+USE_WARM_POOL = bool(int(os.getenv("USE_WARM_POOL", "0")))          # local runs fork from pre-started interpreters
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", "2"))
+WARM_POOL_PREIMPORTS = os.getenv("WARM_POOL_PREIMPORTS", "numpy,pandas")
+STATIC_CHECK_ENABLED = bool(int(os.getenv("STATIC_CHECK_ENABLED", "1")))   # parse/import checks before running a patch
+SANDBOX_MODULES = [m.strip() for m in os.getenv("SANDBOX_MODULES", "").split(",") if m.strip()]  # non-stdlib modules in the Docker image
+# Per-run sandbox limits (agents/sandbox_limits.py); 0 disables a limit
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "20"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "2048"))        # address space (local) / container memory (Docker)
+SANDBOX_MAX_OPEN_FILES = int(os.getenv("SANDBOX_MAX_OPEN_FILES", "256"))
+SANDBOX_MAX_PROCESSES = int(os.getenv("SANDBOX_MAX_PROCESSES", "512"))  # Docker --pids-limit (per container)
+# Local runs: RLIMIT_NPROC. Linux counts it per real user across *all* of that user's processes and threads,
+# not per run, so on a shared (e.g. CI) user any value can make a patch's fork/thread creation fail for
+# reasons unrelated to the patch. Off by default; only set it for a dedicated sandbox user.
+SANDBOX_LOCAL_MAX_PROCESSES = int(os.getenv("SANDBOX_LOCAL_MAX_PROCESSES", "0"))
+SANDBOX_DOCKER_CPUS = os.getenv("SANDBOX_DOCKER_CPUS", "1")            # --cpus per container; "" = unlimited
 
 # Agent settings
 MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "3"))
 EXECUTION_TIMEOUT = int(os.getenv("EXECUTION_TIMEOUT", "20"))
+SPECULATIVE_CANDIDATES = int(os.getenv("SPECULATIVE_CANDIDATES", "1"))   # >1: race N patches per attempt
+SPECULATIVE_TEMPERATURES = [float(t) for t in os.getenv("SPECULATIVE_TEMPERATURES", "0.2,0.5,0.8").split(",") if t.strip()]
+RETRY_BACKOFF_SECONDS = float(os.getenv("RETRY_BACKOFF_SECONDS", "0"))   # pause between attempts (retries reuse unchanged work, so none by default)
+
+# LLM response cache (agents/llm_cache.py)
+LLM_CACHE_ENABLED = bool(int(os.getenv("LLM_CACHE_ENABLED", "1")))   # 0 bypasses the cache entirely
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Validated-fix memory keyed by traceback fingerprint (agents/fix_memory.py)
+FIX_MEMORY_ENABLED = bool(int(os.getenv("FIX_MEMORY_ENABLED", "1")))
+FIX_MEMORY_PATH = os.getenv("FIX_MEMORY_PATH", "data/cache/fix_memory.sqlite")
+
+# Tracing / metrics (tracing.py)
+TRACING_ENABLED = bool(int(os.getenv("TRACING_ENABLED", "0")))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")          # append spans as JSONL when set
+
+# Prompt assembly (agents/prompt_builder.py)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))            # estimated input tokens per prompt
+PROMPT_ERROR_LOG_SHARE = float(os.getenv("PROMPT_ERROR_LOG_SHARE", "0.4"))     # max share of the budget for the error log
+PROMPT_DEDUP_THRESHOLD = float(os.getenv("PROMPT_DEDUP_THRESHOLD", "0.8"))     # shingle overlap that counts as a duplicate chunk
+
+# Batch debugging (batch.py)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Durable job queue + worker pool (job_queue.py)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/queue/jobs.sqlite")
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))       # a job whose worker stops heartbeating is retried after this
+JOB_MAX_RUNS = int(os.getenv("JOB_MAX_RUNS", "3"))                      # claims per job before it is marked dead
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))                        # worker processes; 0 = os.cpu_count()
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))  # pipelines in flight per worker process
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
 
 # Temp dir for runner files
 TEMP_DIR = "tmp"
\ No newline at end of file
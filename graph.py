@@ -14,36 +14,85 @@ Behavior:
  - No patch generation, no execution, and no temp files for vague input.
 
 Runner follows 'next_node' if provided, otherwise uses the graph edge order.
+
+Progress can be observed as it happens: `on_event` receives node
+started/finished events plus typed results (retrieved docs, root cause,
+patch, execution, validation), and `iter_debug_pipeline()` turns them into a
+generator. A set `cancel_event` stops the run between nodes, kills in-flight
+sandbox runs and abandons pending LLM calls.
+
+Retries are incremental: nodes declare the state keys they read (`inputs`)
+and write (`outputs`), and within one pipeline run a node whose inputs hash
+the same as last time restores its memoized outputs instead of running. A
+retry whose stderr fingerprints to the original error (or to the previous
+attempt's stderr) therefore skips straight to `generate`, which gets the
+failed attempts as feedback.
 """
 
-import sys, os, time
-from typing import Dict, Any, List, Optional, Callable
+import sys, os, time, copy, json, queue, hashlib, threading
+from typing import Dict, Any, Iterator, List, Optional, Callable
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from rag.retriever import get_retriever
-from agents.retriever_agent import RetrieverAgent
-from agents.root_cause_agent import RootCauseAgent
-from agents.patch_generator_agent import PatchGeneratorAgent
-from agents.execution_agent import ExecutionAgent
-from agents.validator_agent import ValidatorAgent
-from config import MAX_ATTEMPTS
+import registry
+from tracing import Tracer
+from agents.fingerprint import fingerprint, normalize_traceback, normalize_message
+from utils import Cancelled
+from config import MAX_ATTEMPTS, RETRY_BACKOFF_SECONDS, SPECULATIVE_CANDIDATES, TRACE_EXPORT_PATH
+
+# Agents are built lazily by the process-wide registry and shared by concurrent
+# pipelines (see batch.py); call registry.warm_up() to load them eagerly.
+def __getattr__(name: str):
+    # keep `graph.retriever_agent` & co. working without importing them eagerly
+    if name in registry.PIPELINE_COMPONENTS:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-# instantiate agents
-retriever_agent = RetrieverAgent(get_retriever())
-root_cause_agent = RootCauseAgent()
-patch_generator_agent = PatchGeneratorAgent()
-execution_agent = ExecutionAgent()
-validator_agent = ValidatorAgent()
+def _event(event_type: str, **fields) -> Dict[str, Any]:
+    return {"type": event_type, "ts": time.time(), **fields}
 
 
 class AgenticGraph:
-    def __init__(self):
+    def __init__(self, tracer: Optional[Tracer] = None,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cancel_event: Optional[threading.Event] = None):
         self.nodes: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.node_events: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+        self.node_inputs: Dict[str, tuple] = {}
+        self.node_outputs: Dict[str, tuple] = {}
+        # node -> (input hash, outputs, next node); lives as long as the graph, i.e. one pipeline run
+        self._memo: Dict[str, tuple] = {}
         self.edges: Dict[str, List[str]] = {}
         self.entry: Optional[str] = None
+        self.tracer = tracer or Tracer(enabled=False)
+        self.on_event = on_event
+        self.cancel_event = cancel_event
 
-    def add_node(self, name: str, fn: Callable[[Dict[str, Any]], Any]):
+    def add_node(self, name: str, fn: Callable[[Dict[str, Any]], Any],
+                 event: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+                 inputs: Optional[tuple] = None, outputs: tuple = ()):
+        """
+        `event(state)` builds the typed event emitted after the node ran (e.g. {"type": "patch", ...}).
+        Nodes with `inputs` are memoized: when those state keys are unchanged
+        since the node last ran, the `outputs` keys are restored instead.
+        """
         self.nodes[name] = fn
+        if event is not None:
+            self.node_events[name] = event
+        if inputs is not None:
+            self.node_inputs[name] = tuple(inputs)
+            self.node_outputs[name] = tuple(outputs)
+
+    def _input_key(self, name: str, state: Dict[str, Any]) -> Optional[str]:
+        keys = self.node_inputs.get(name)
+        if keys is None:
+            return None
+        payload = json.dumps([state.get(k) for k in keys], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _emit(self, event_type: str, **fields):
+        if self.on_event is not None:
+            self.on_event(_event(event_type, **fields))
 
     def add_edge(self, src: str, dst: str):
         self.edges.setdefault(src, []).append(dst)
@@ -63,17 +112,47 @@ class AgenticGraph:
         state = init_state
         current = self.entry
         visited = set()
+        timings = state.setdefault("timings", {})
 
         while current is not None:
             agent_fn = self.nodes.get(current)
             if not callable(agent_fn):
                 break
-
-            result = agent_fn(state)
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise Cancelled()
+
+            attempt = state.get("attempt")
+            input_key = self._input_key(current, state)
+            memo = self._memo.get(current)
+            if input_key is not None and memo is not None and memo[0] == input_key:
+                # inputs unchanged since this node last ran: reuse its outputs
+                _, outputs, next_node = memo
+                for k in self.node_outputs[current]:
+                    if k in outputs:
+                        state[k] = copy.deepcopy(outputs[k])
+                    else:
+                        state.pop(k, None)
+                state.pop("_next_node", None)
+                state.setdefault("reused_nodes", []).append(current)
+                self._emit("node_finished", node=current, attempt=attempt, seconds=0.0, reused=True)
+                self._emit_node_event(current, attempt, state, reused=True)
+                current = self._next(current, next_node, visited)
+                continue
+
+            state.pop("_next_node", None)
+            state.pop("_node_failed", None)
+            self._emit("node_started", node=current, attempt=attempt)
+            t0 = time.perf_counter()
+            with self.tracer.span(current, attempt):
+                result = agent_fn(state)
+            elapsed = time.perf_counter() - t0
+            timings[current] = timings.get(current, 0.0) + elapsed
+            self._emit("node_finished", node=current, attempt=attempt, seconds=elapsed)
 
             # EARLY: If an agent explicitly returns diagnostic_only, stop immediately.
             if isinstance(result, dict) and result.get("type") == "diagnostic_only":
                 state["diagnostic"] = result.get("message", "")
+                self._emit("diagnostic", attempt=attempt, message=state["diagnostic"])
                 # make validation reflect diagnostic outcome
                 state["validation"] = {"success": False, "message": state["diagnostic"]}
                 break
@@ -84,7 +163,7 @@ class AgenticGraph:
                 state, next_node = result
             elif isinstance(result, dict):
                 # Merge only known safe keys to avoid overriding full state.
-                for k in ("patch_text", "execution_result", "root_cause_summary", "_next_node", "next_node"):
+                for k in ("patch_text", "patch_cache_key", "candidates", "execution_result", "root_cause_summary", "_next_node", "next_node"):
                     if k in result:
                         state[k] = result[k]
                 next_node = result.get("_next_node") or result.get("next_node")
@@ -92,41 +171,61 @@ class AgenticGraph:
                 # assume the node mutated state in place
                 state = state
 
+            self._emit_node_event(current, attempt, state)
+
             # respect explicit state-set next node
             if not next_node:
                 next_node = state.get("_next_node")
 
-            outgoing = self.edges.get(current, [])
-            if not next_node and outgoing:
-                next_node = outgoing[0]
+            # failed nodes (they set _node_failed) are retried next time rather than memoized
+            if input_key is not None and not state.pop("_node_failed", False):
+                outputs = {k: state[k] for k in self.node_outputs[current] if k in state}
+                self._memo[current] = (input_key, copy.deepcopy(outputs), next_node)
 
-            # loop prevention for immediate repeats
-            visited_key = (current, next_node)
-            if visited_key in visited:
-                break
-            visited.add(visited_key)
-
-            current = next_node
+            current = self._next(current, next_node, visited)
 
         return state
 
+    def _emit_node_event(self, node: str, attempt, state: Dict[str, Any], **extra):
+        if self.on_event is not None and node in self.node_events:
+            payload = self.node_events[node](state)
+            self._emit(payload.pop("type"), node=node, attempt=attempt, **payload, **extra)
+
+    def _next(self, current: str, next_node: Optional[str], visited: set) -> Optional[str]:
+        outgoing = self.edges.get(current, [])
+        if not next_node and outgoing:
+            next_node = outgoing[0]
+
+        # loop prevention for immediate repeats
+        visited_key = (current, next_node)
+        if visited_key in visited:
+            return None
+        visited.add(visited_key)
+        return next_node
+
 
 # ---------- Node implementations ----------
-def build_agentic_graph() -> AgenticGraph:
-    g = AgenticGraph()
+def build_agentic_graph(tracer: Optional[Tracer] = None,
+                        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        cancel_event: Optional[threading.Event] = None) -> AgenticGraph:
+    g = AgenticGraph(tracer, on_event, cancel_event)
+    # only passed when set, so stand-in agents without the parameter keep working
+    cancel_kw = {"cancel_event": cancel_event} if cancel_event is not None else {}
 
     def node_retrieve(state: Dict[str, Any]) -> Dict[str, Any]:
         query = state.get("query") or state.get("error_log", "")
         try:
-            state["retrieved_docs"] = retriever_agent.run(query)
+            state["retrieved_docs"] = registry.get("retriever_agent").run(query)
         except Exception as e:
             state.setdefault("execution_result", {})["retrieve_error"] = str(e)
             state["_next_node"] = "validate"
+            state["_node_failed"] = True
         return state
 
     def node_analyze(state: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            res = root_cause_agent.run(state.get("error_log", ""), state.get("retrieved_docs", []))
+            res = registry.get("root_cause_agent").run(state.get("error_log", ""), state.get("retrieved_docs", []),
+                                                        **cancel_kw)
             if isinstance(res, dict):
                 if "next_node" in res:
                     state["_next_node"] = res["next_node"]
@@ -135,21 +234,30 @@ def build_agentic_graph() -> AgenticGraph:
                 state["root_cause_summary"] = res
         except Exception as e:
             state.setdefault("execution_result", {})["analyze_error"] = str(e)
+            state["_node_failed"] = True
         return state
 
     def node_generate(state: Dict[str, Any]) -> Any:
         # IMPORTANT: return the raw agent response so run_one_pass() can early-detect diagnostic_only.
         try:
-            res = patch_generator_agent.run(
+            args = (
                 state.get("error_log", ""),
                 state.get("root_cause_summary", ""),
                 state.get("retrieved_docs", []),
                 state.get("user_code_snippet"),
             )
+            # failed earlier attempts, only passed when present so stand-in agents keep working
+            kwargs = dict(cancel_kw, **({"feedback": state["feedback"]} if state.get("feedback") else {}))
+            state.pop("candidates", None)
+            if SPECULATIVE_CANDIDATES > 1:
+                res = registry.get("patch_generator_agent").run_candidates(*args, n=SPECULATIVE_CANDIDATES, **kwargs)
+            else:
+                res = registry.get("patch_generator_agent").run(*args, **kwargs)
             # return raw response (string or dict). run_one_pass will handle diagnostic dicts.
             return res
         except Exception as e:
             state.setdefault("execution_result", {})["generate_error"] = str(e)
+            state["_node_failed"] = True
             return state
 
     def node_execute(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -159,28 +267,61 @@ def build_agentic_graph() -> AgenticGraph:
                 state.setdefault("execution_result", {})["error"] = "No patch to execute."
                 state["_next_node"] = "validate"
                 return state
-            out = execution_agent.run(patch)
+            candidates = state.get("candidates") or []
+            if len(candidates) > 1:
+                # speculative mode: race all candidates, first validated one wins
+                winner, results = registry.get("execution_agent").run_many(
+                    [c["patch_text"] for c in candidates], accept=registry.get("validator_agent").run, **cancel_kw
+                )
+                for c, r in zip(candidates, results):
+                    c.update(r)
+                chosen = candidates[winner if winner is not None else 0]
+                state["patch_text"] = chosen["patch_text"]
+                state["patch_cache_key"] = chosen.get("patch_cache_key")
+                out = chosen["execution_result"]
+            else:
+                out = registry.get("execution_agent").run(patch, **cancel_kw)
             state["execution_result"] = out
             if isinstance(out, dict) and out.get("critical_failure"):
                 state["_next_node"] = "retrieve"
         except Exception as e:
             state["execution_result"] = {"stderr": "", "error": str(e)}
+            state["_node_failed"] = True
         return state
 
     def node_validate(state: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            success, message = validator_agent.run(state.get("execution_result", {}))
+            success, message = registry.get("validator_agent").run(state.get("execution_result", {}))
             state["validation"] = {"success": bool(success), "message": str(message)}
+            if success:
+                # only validated patches may be replayed from the LLM cache
+                registry.get("patch_generator_agent").mark_validated(state.get("patch_cache_key"))
+                registry.get("fix_memory").remember(
+                    state.get("fingerprint"), state.get("patch_text") or "",
+                    state.get("root_cause_summary") or "", state.get("exc_type"),
+                )
         except Exception as e:
             state["validation"] = {"success": False, "message": f"validator error: {e}"}
         return state
 
-    # register nodes & edges
-    g.add_node("retrieve", node_retrieve)
-    g.add_node("analyze", node_analyze)
-    g.add_node("generate", node_generate)
-    g.add_node("execute", node_execute)
-    g.add_node("validate", node_validate)
+    # register nodes & edges (with the typed event each one emits and the state keys it reads / writes)
+    g.add_node("retrieve", node_retrieve,
+               lambda s: {"type": "retrieved_docs", "docs": list(s.get("retrieved_docs") or [])},
+               inputs=("query_key",), outputs=("retrieved_docs",))
+    g.add_node("analyze", node_analyze,
+               lambda s: {"type": "root_cause", "summary": s.get("root_cause_summary") or ""},
+               inputs=("error_log", "retrieved_docs"), outputs=("root_cause_summary",))
+    g.add_node("generate", node_generate,
+               lambda s: {"type": "patch", "patch_text": s.get("patch_text"), "candidates": len(s.get("candidates") or [])},
+               inputs=("error_log", "root_cause_summary", "retrieved_docs", "user_code_snippet", "feedback"),
+               outputs=("patch_text", "patch_cache_key", "candidates"))
+    g.add_node("execute", node_execute,
+               lambda s: {"type": "execution", "execution_result": s.get("execution_result")},
+               inputs=("patch_text", "candidates"),
+               outputs=("execution_result", "patch_text", "patch_cache_key", "candidates"))
+    # validate is cheap and has side effects (fix memory, LLM cache), so it always runs
+    g.add_node("validate", node_validate,
+               lambda s: {"type": "validation", "validation": s.get("validation")})
 
     g.add_edge("retrieve", "analyze")
     g.add_edge("analyze", "generate")
@@ -192,15 +333,243 @@ def build_agentic_graph() -> AgenticGraph:
 
 
 # ---------- Pipeline ----------
-def debug_pipeline(error_log: str, user_code_snippet: Optional[str] = None, max_attempts: int = MAX_ATTEMPTS) -> Dict[str, Any]:
-    state: Dict[str, Any] = {"error_log": error_log, "user_code_snippet": user_code_snippet}
-    graph = build_agentic_graph()
-    attempt = 0
+FEEDBACK_PATCH_CHARS = 1500
+FEEDBACK_STDERR_CHARS = 800
+
+
+def _retrieval_key(error_log: str, stderr: str = "") -> str:
+    """
+    What retrieval depends on: the normalised error and the normalised stderr
+    of the last run, so a retry that failed the same way as the previous one
+    reuses the docs. A run that reproduced the original error is keyed
+    without its stderr (see _attempt_loop), matching the first attempt.
+    """
+    parts = [fingerprint(text) or normalize_message(text or "") for text in (error_log, stderr)]
+    return hashlib.sha1("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+def _feedback_entry(state: Dict[str, Any]) -> Dict[str, Any]:
+    er = state.get("execution_result") or {}
+    er = er if isinstance(er, dict) else {}
+    stderr = er.get("stderr") or er.get("error") or ""
+    return {
+        "patch": (state.get("patch_text") or "")[:FEEDBACK_PATCH_CHARS],
+        "stderr": stderr[-FEEDBACK_STDERR_CHARS:],
+        "returncode": er.get("returncode"),
+    }
+
+
+def _reproduces(error_log: str, stderr: str) -> bool:
+    """
+    True when `stderr` is the error of `error_log` again: the same fingerprint,
+    or the same exception, message and failing source line (the patch runs as
+    another file, so its frames rarely match the original's).
+    """
+    fp = fingerprint(stderr or "")
+    if fp is None:
+        return False
+    if fp == fingerprint(error_log):
+        return True
+    orig, again = normalize_traceback(error_log), normalize_traceback(stderr)
+    return all(orig[k] == again[k] for k in ("exc_type", "message", "source"))
+
+
+def _replay_remembered_fix(fp: Optional[str], norm: Dict[str, Any], error_log: str,
+                           user_code_snippet: Optional[str], tracer: Tracer,
+                           on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                           cancel_event: Optional[threading.Event] = None):
+    """
+    Re-execute the validated fix stored for this fingerprint before any
+    retrieval or LLM work. Returns (result, feedback): a 'fixed' result when
+    the replay validates, otherwise (None, the failed run as a feedback entry
+    for the generator, or None on a miss). Without frames or a code snippet
+    the fingerprint is too weak to go by, so nothing is looked up.
+    """
+    if not norm["frames"] and not (user_code_snippet or "").strip():
+        return None, None
+    fix_memory = registry.get("fix_memory")
+    memo = fix_memory.lookup(fp)
+    if not memo:
+        return None, None
+    if on_event is not None:
+        on_event(_event("fix_memory_hit", fingerprint=fp, patch_text=memo["patch_text"]))
+    t0 = time.perf_counter()
+    # spans under attempt 0, so a failed replay does not show up in the graph's first attempt
+    with tracer.span("execute", 0):
+        out = registry.get("execution_agent").run(memo["patch_text"], **({"cancel_event": cancel_event} if cancel_event else {}))
+    if cancel_event is not None and cancel_event.is_set():
+        raise Cancelled()
+    t1 = time.perf_counter()
+    with tracer.span("validate", 0):
+        success, message = registry.get("validator_agent").run(out)
+    stderr = (out.get("stderr") or "") if isinstance(out, dict) else ""
+    if success and _reproduces(error_log, stderr):
+        # exit code 0 but the original traceback again (e.g. printed by a handler)
+        success, message = False, "Remembered fix reproduces the original error."
+    if not success:
+        fix_memory.forget(fp)
+        return None, _feedback_entry({"patch_text": memo["patch_text"], "execution_result": out})
+    fix_memory.record_hit(fp)
+    return {
+        "status": "fixed",
+        "attempts": 1,
+        "final_patch": memo["patch_text"],
+        "execution_result": out,
+        "root_cause_summary": memo["root_cause_summary"],
+        "from_memory": True,
+        "fingerprint": fp,
+        "history": [{
+            "attempt": 1,
+            "source": "fix_memory",
+            "replay": True,
+            "root_cause_summary": memo["root_cause_summary"],
+            "patch_text": memo["patch_text"],
+            "execution_result": out,
+            "validation": {"success": True, "message": str(message)},
+            "timings": {"execute": t1 - t0, "validate": time.perf_counter() - t1},
+            **({"spans": tracer.spans_for_attempt(0)} if tracer.enabled else {}),
+        }],
+    }, None
+
+
+def debug_pipeline(
+    error_log: str,
+    user_code_snippet: Optional[str] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    tracer: Optional[Tracer] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Dict[str, Any]:
+    """
+    Run the agentic graph until the patch validates or `max_attempts` is reached.
+    With tracing enabled (TRACING_ENABLED or an explicit `tracer`), every history
+    entry carries its node spans and the result carries the trace_id; spans are
+    also appended to TRACE_EXPORT_PATH when that is set.
+
+    `on_event` is called with each progress event (see iter_debug_pipeline);
+    setting `cancel_event` ends the run early with status "cancelled".
+    """
+    tracer = tracer or Tracer()
+    try:
+        res = _run_pipeline(error_log, user_code_snippet, max_attempts, tracer, on_event, cancel_event)
+    finally:
+        if tracer.enabled and TRACE_EXPORT_PATH:
+            tracer.export_jsonl(TRACE_EXPORT_PATH)
+    if tracer.enabled:
+        res["trace_id"] = tracer.trace_id
+    if on_event is not None:
+        on_event(_event("done", result=res))
+    return res
+
+
+def iter_debug_pipeline(
+    error_log: str,
+    user_code_snippet: Optional[str] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    tracer: Optional[Tracer] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run debug_pipeline in a background thread and yield its events as they
+    happen. Every event has "type" and "ts"; node events also carry "node" and
+    "attempt":
+
+      pipeline_started, fix_memory_hit (patch_text: a remembered fix, re-run before the graph), attempt_started, attempt_finished (success, entry: the history entry),
+      node_started, node_finished (seconds; reused=True when memoized), retrieved_docs (docs),
+      root_cause (summary), patch (patch_text, candidates),
+      execution (execution_result), validation (validation), diagnostic,
+      cancelled, error (error), done (result; always last unless error)
+
+    Setting `cancel_event`, or closing the generator early (e.g. a Streamlit
+    rerun abandoning it), cancels the run.
+    """
+    cancel_event = cancel_event or threading.Event()
+    events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+
+    def _worker():
+        try:
+            debug_pipeline(error_log, user_code_snippet, max_attempts, tracer,
+                           on_event=events.put, cancel_event=cancel_event)
+        except Exception as e:
+            events.put(_event("error", error=repr(e)))
+        finally:
+            events.put(None)
+
+    threading.Thread(target=_worker, name="debug-pipeline", daemon=True).start()
+    try:
+        while True:
+            ev = events.get()
+            if ev is None:
+                return
+            yield ev
+    finally:
+        cancel_event.set()
+
+
+async def aiter_debug_pipeline(
+    error_log: str,
+    user_code_snippet: Optional[str] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    tracer: Optional[Tracer] = None,
+    cancel_event: Optional[threading.Event] = None,
+):
+    """Async-iterator variant of iter_debug_pipeline; cancelling the consuming task cancels the run."""
+    import asyncio
+    cancel_event = cancel_event or threading.Event()
+    events = iter_debug_pipeline(error_log, user_code_snippet, max_attempts, tracer, cancel_event)
+    end = object()
+    try:
+        while True:
+            ev = await asyncio.to_thread(next, events, end)
+            if ev is end:
+                return
+            yield ev
+    finally:
+        cancel_event.set()
+
+
+def _run_pipeline(error_log: str, user_code_snippet: Optional[str], max_attempts: int, tracer: Tracer,
+                  on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  cancel_event: Optional[threading.Event] = None) -> Dict[str, Any]:
     history: List[Dict[str, Any]] = []
+    try:
+        return _attempt_loop(error_log, user_code_snippet, max_attempts, tracer, on_event, cancel_event, history)
+    except Cancelled:
+        if on_event is not None:
+            on_event(_event("cancelled"))
+        return {"status": "cancelled", "attempts": len(history), "history": history, "message": "Cancelled."}
+
+
+def _attempt_loop(error_log: str, user_code_snippet: Optional[str], max_attempts: int, tracer: Tracer,
+                  on_event: Optional[Callable[[Dict[str, Any]], None]], cancel_event: Optional[threading.Event],
+                  history: List[Dict[str, Any]]) -> Dict[str, Any]:
+    emit = on_event or (lambda ev: None)
+    fp = fingerprint(error_log, extra=user_code_snippet)
+    emit(_event("pipeline_started", fingerprint=fp))
+    norm = normalize_traceback(error_log)
+    replayed, replay_feedback = _replay_remembered_fix(fp, norm, error_log, user_code_snippet, tracer,
+                                                       on_event, cancel_event)
+    if replayed is not None:
+        return replayed
+
+    state: Dict[str, Any] = {
+        "error_log": error_log,
+        "user_code_snippet": user_code_snippet,
+        "fingerprint": fp,
+        "exc_type": norm["exc_type"],
+        "query_key": _retrieval_key(error_log),
+        # a remembered fix that no longer validates is the first failed attempt the generator sees
+        "feedback": [replay_feedback] if replay_feedback else [],
+    }
+    graph = build_agentic_graph(tracer, on_event, cancel_event)
+    attempt = 0
 
     while attempt < max_attempts:
         attempt += 1
         state["attempt"] = attempt
+        state["timings"] = {}
+        state["reused_nodes"] = []
+        emit(_event("attempt_started", attempt=attempt))
 
         # Run a single agentic pass
         state = graph.run_one_pass(state)
@@ -223,7 +592,13 @@ def debug_pipeline(error_log: str, user_code_snippet: Optional[str] = None, max_
             "patch_text": state.get("patch_text"),
             "execution_result": state.get("execution_result"),
             "validation": state.get("validation"),
+            "candidates": state.get("candidates"),
+            "timings": state.get("timings"),
+            "reused": list(state.get("reused_nodes") or []),
+            **({"spans": tracer.spans_for_attempt(attempt)} if tracer.enabled else {}),
         })
+        emit(_event("attempt_finished", attempt=attempt, success=bool(state.get("validation", {}).get("success")),
+                    entry=history[-1]))
 
         if state.get("validation", {}).get("success"):
             return {
@@ -235,11 +610,22 @@ def debug_pipeline(error_log: str, user_code_snippet: Optional[str] = None, max_
                 "history": history,
             }
 
-        # prepare for next attempt
+        # prepare for next attempt: only nodes whose inputs change will rerun
         er = state.get("execution_result", {}) or {}
-        stderr = er.get("stderr", "") if isinstance(er, dict) else ""
-        state["query"] = state.get("error_log", "") + "\n\nExecution stderr:\n" + (stderr or "")
-
-        time.sleep(0.5)
+        stderr = (er.get("stderr", "") if isinstance(er, dict) else "") or ""
+        if _reproduces(error_log, stderr):
+            # the patch hit the original error again: nothing new to retrieve or analyze
+            state.pop("query", None)
+            state["query_key"] = _retrieval_key(error_log)
+        else:
+            state["query"] = error_log + "\n\nExecution stderr:\n" + stderr
+            state["query_key"] = _retrieval_key(error_log, stderr)
+        state["feedback"] = state["feedback"] + [_feedback_entry(state)]
+
+        if RETRY_BACKOFF_SECONDS > 0:
+            if cancel_event is None:
+                time.sleep(RETRY_BACKOFF_SECONDS)
+            elif cancel_event.wait(RETRY_BACKOFF_SECONDS):
+                raise Cancelled()
 
     return {"status": "failed", "attempts": attempt, "history": history, "message": f"Max attempts ({max_attempts}) reached."}
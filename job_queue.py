@@ -0,0 +1,566 @@
+# job_queue.py
+"""
+Durable debugging job queue (SQLite) and a pool of worker processes.
+
+CI and other tools submit failures without waiting for them:
+
+    python job_queue.py submit failure.log --snippet test_foo.py   # prints the job id
+    python job_queue.py submit ci_failures/                          # directory / JSONL, as batch.py
+    python job_queue.py work --workers 4 --concurrency 4
+    python job_queue.py status                                       # depth / latency (--prometheus FILE)
+    python job_queue.py show <job id> --wait 600                     # exit 0 once fixed
+
+A worker claims a job by taking a lease (JOB_LEASE_SECONDS) and keeps
+renewing it while debug_pipeline runs. Each finished attempt's history entry
+is written as it happens, so a crashed run keeps what it did. When a worker
+dies, its jobs are handed out again once their leases expire (straight away
+if the pool supervisor saw the process die); after JOB_MAX_RUNS claims a
+job is marked dead instead. A worker whose lease was taken over cannot
+complete the job, so results are never written twice.
+
+SQLite's locking needs a local disk: to spread workers over several hosts,
+give each host its own queue file or put it on storage with working locks
+(not NFS).
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+import socket
+import sqlite3
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, List, Optional
+
+from config import (JOB_QUEUE_PATH, JOB_LEASE_SECONDS, JOB_MAX_RUNS, JOB_WORKERS, JOB_WORKER_CONCURRENCY,
+                    JOB_POLL_SECONDS, MAX_ATTEMPTS)
+from batch import load_jobs, _percentile
+
+WORKER_MIN_UPTIME = 10.0   # a worker dying sooner than this counts as a start-up failure
+WORKER_MAX_START_FAILURES = 3
+
+# queued -> running -> done (outcome = the pipeline's status) | dead (lease expired JOB_MAX_RUNS times)
+STATUSES = ("queued", "running", "done", "dead")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " id TEXT PRIMARY KEY, status TEXT NOT NULL, error_log TEXT NOT NULL, user_code_snippet TEXT,"
+    " max_attempts INTEGER NOT NULL, runs INTEGER NOT NULL DEFAULT 0, lease_owner TEXT, lease_expires REAL,"
+    " enqueued REAL NOT NULL, started REAL, claimed REAL, finished REAL,"
+    " outcome TEXT, result TEXT, last_error TEXT)",
+    "CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, enqueued)",
+    "CREATE INDEX IF NOT EXISTS jobs_finished ON jobs(finished)",
+    "CREATE TABLE IF NOT EXISTS attempts ("
+    " job_id TEXT NOT NULL, run INTEGER NOT NULL, attempt INTEGER NOT NULL, worker TEXT,"
+    " recorded REAL NOT NULL, entry TEXT NOT NULL, PRIMARY KEY (job_id, run, attempt))",
+)
+
+
+class JobQueue:
+    def __init__(self, path: str = JOB_QUEUE_PATH, lease_seconds: float = JOB_LEASE_SECONDS,
+                 max_runs: int = JOB_MAX_RUNS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_runs = max(1, max_runs)
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # autocommit; claim() opens its own write transaction
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            self._conn = conn
+        return self._conn
+
+    # ---- producers ----
+    def enqueue(self, error_log: str, user_code_snippet: Optional[str] = None,
+                max_attempts: int = MAX_ATTEMPTS, job_id: Optional[str] = None) -> str:
+        job_id = job_id or uuid.uuid4().hex
+        with self._lock:
+            self._db().execute(
+                "INSERT INTO jobs (id, status, error_log, user_code_snippet, max_attempts, enqueued)"
+                " VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, error_log, user_code_snippet, int(max_attempts), time.time()),
+            )
+        return job_id
+
+    def requeue(self, job_id: str) -> bool:
+        """Put a dead (or finished) job back in the queue as if newly submitted, with a fresh run budget."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = db.execute(
+                    "UPDATE jobs SET status = 'queued', runs = 0, lease_owner = NULL, lease_expires = NULL,"
+                    " started = NULL, claimed = NULL, finished = NULL, outcome = NULL, result = NULL, enqueued = ?"
+                    " WHERE id = ? AND status IN ('dead', 'done')",
+                    (time.time(), job_id),
+                )
+                if cur.rowcount == 1:
+                    # run numbers start again at 1; the old runs' attempts would mix into the new history
+                    db.execute("DELETE FROM attempts WHERE job_id = ?", (job_id,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return cur.rowcount == 1
+
+    # ---- workers ----
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest runnable job (queued, or running under an expired lease) to `worker`."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "UPDATE jobs SET status = 'dead', finished = ?, lease_owner = NULL, lease_expires = NULL,"
+                    " last_error = 'lease expired on run ' || runs || ' of ' || ?"
+                    " WHERE status = 'running' AND lease_expires < ? AND runs >= ?",
+                    (now, self.max_runs, now, self.max_runs),
+                )
+                row = db.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?)"
+                    " ORDER BY enqueued LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                # the CASE sees the row before this update: a still-'running' job was abandoned by its worker
+                db.execute(
+                    "UPDATE jobs SET last_error = CASE WHEN status = 'running'"
+                    " THEN 'lease held by ' || lease_owner || ' expired' ELSE last_error END,"
+                    " status = 'running', runs = runs + 1, lease_owner = ?, lease_expires = ?,"
+                    " started = COALESCE(started, ?), claimed = ? WHERE id = ?",
+                    (worker, now + self.lease_seconds, now, now, row[0]),
+                )
+                job = db.execute(
+                    "SELECT id, error_log, user_code_snippet, max_attempts, runs, enqueued, last_error"
+                    " FROM jobs WHERE id = ?", (row[0],),
+                ).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return {"id": job[0], "error_log": job[1], "user_code_snippet": job[2], "max_attempts": job[3],
+                "run": job[4], "enqueued": job[5], "last_error": job[6]}
+
+    def heartbeat(self, worker: str) -> int:
+        """Extend every lease `worker` holds; returns how many it still holds."""
+        with self._lock:
+            cur = self._db().execute(
+                "UPDATE jobs SET lease_expires = ? WHERE lease_owner = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, worker),
+            )
+        return cur.rowcount
+
+    def expire_leases(self, worker: str) -> int:
+        """Make `worker`'s jobs claimable now (it is known to be gone)."""
+        with self._lock:
+            cur = self._db().execute(
+                "UPDATE jobs SET lease_expires = 0 WHERE lease_owner = ? AND status = 'running'", (worker,))
+        return cur.rowcount
+
+    def record_attempt(self, job_id: str, run: int, worker: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO attempts (job_id, run, attempt, worker, recorded, entry) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, run, int(entry.get("attempt") or 0), worker, time.time(), json.dumps(entry, default=str)),
+            )
+
+    def complete(self, job_id: str, run: int, worker: str, result: Dict[str, Any]) -> bool:
+        """Store the result; False if `worker` no longer holds the lease (the job was handed to another worker)."""
+        now = time.time()
+        summary = {k: v for k, v in result.items() if k != "history"}
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = db.execute(
+                    "UPDATE jobs SET status = 'done', outcome = ?, result = ?, finished = ?,"
+                    " lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                    (result.get("status", "error"), json.dumps(summary, default=str), now, job_id, worker),
+                )
+                if cur.rowcount == 1:
+                    # attempts that did not go through attempt_finished (a fix-memory replay is only in the result's history)
+                    db.executemany(
+                        "INSERT OR IGNORE INTO attempts (job_id, run, attempt, worker, recorded, entry)"
+                        " VALUES (?, ?, ?, ?, ?, ?)",
+                        [(job_id, run, int(e.get("attempt") or 0), worker, now, json.dumps(e, default=str))
+                         for e in result.get("history") or []],
+                    )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return cur.rowcount == 1
+
+    def release(self, job_id: str, run: int, worker: str) -> bool:
+        """
+        Give a job back unfinished (worker shutting down); the run does not
+        count against it, and its attempts are dropped since the next claim
+        reuses its run number.
+        """
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = db.execute(
+                    "UPDATE jobs SET status = 'queued', runs = MAX(runs - 1, 0), lease_owner = NULL,"
+                    " lease_expires = NULL WHERE id = ? AND lease_owner = ? AND status = 'running' AND runs = ?",
+                    (job_id, worker, run),
+                )
+                if cur.rowcount == 1:
+                    db.execute("DELETE FROM attempts WHERE job_id = ? AND run = ?", (job_id, run))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return cur.rowcount == 1
+
+    # ---- inspection ----
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job with its result and the history of its latest run (earlier runs under "runs_history")."""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT id, status, outcome, runs, max_attempts, enqueued, started, finished, lease_owner,"
+                " last_error, result FROM jobs WHERE id = ?", (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = db.execute(
+                "SELECT run, entry FROM attempts WHERE job_id = ? ORDER BY run, attempt", (job_id,)).fetchall()
+        job = dict(zip(("id", "status", "outcome", "runs", "max_attempts", "enqueued", "started", "finished",
+                        "worker", "last_error"), row[:10]))
+        job["result"] = json.loads(row[10]) if row[10] else None
+        by_run: Dict[int, List[Dict[str, Any]]] = {}
+        for run, entry in attempts:
+            by_run.setdefault(run, []).append(json.loads(entry))
+        job["history"] = by_run.pop(job["runs"], [])
+        if by_run:
+            job["runs_history"] = by_run
+        return job
+
+    def pending(self) -> int:
+        """Jobs not yet finished (queued or running)."""
+        with self._lock:
+            return self._db().execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+
+    def stats(self, window: float = 3600.0) -> Dict[str, Any]:
+        """Queue depth now, and latency / throughput of the jobs finished in the last `window` seconds."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            depth = dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = db.execute("SELECT MIN(enqueued) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            workers = db.execute(
+                "SELECT COUNT(DISTINCT lease_owner) FROM jobs WHERE status = 'running' AND lease_expires >= ?",
+                (now,)).fetchone()[0]
+            finished = db.execute(
+                "SELECT outcome, runs, enqueued, started, claimed, finished FROM jobs"
+                " WHERE status = 'done' AND finished >= ?", (now - window,)).fetchall()
+        waits = [s - e for _, _, e, s, _, _ in finished if s is not None]
+        runs = [f - c for _, _, _, _, c, f in finished if c is not None]
+        totals = [f - e for _, _, e, _, _, f in finished]
+        outcomes: Dict[str, int] = {}
+        for outcome, *_ in finished:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        return {
+            "depth": {s: depth.get(s, 0) for s in STATUSES},
+            "oldest_queued_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "active_workers": workers,
+            "window_seconds": window,
+            "finished": len(finished),
+            "outcomes": outcomes,
+            "retried": sum(1 for _, r, *_ in finished if r > 1),
+            "throughput_per_min": round(60.0 * len(finished) / window, 2),
+            "latency": {
+                name: {"p50": round(_percentile(v, 50), 3), "p95": round(_percentile(v, 95), 3)}
+                for name, v in (("wait", waits), ("run", runs), ("total", totals))
+            },
+        }
+
+    def prometheus_text(self, window: float = 3600.0) -> str:
+        s = self.stats(window)
+        lines = ["# TYPE debugger_jobs gauge"]
+        lines += [f'debugger_jobs{{status="{k}"}} {v}' for k, v in s["depth"].items()]
+        lines += ["# TYPE debugger_job_oldest_queued_seconds gauge",
+                  f"debugger_job_oldest_queued_seconds {s['oldest_queued_seconds']}",
+                  "# TYPE debugger_job_active_workers gauge",
+                  f"debugger_job_active_workers {s['active_workers']}",
+                  "# TYPE debugger_jobs_finished gauge"]
+        lines += [f'debugger_jobs_finished{{outcome="{k}"}} {v}' for k, v in sorted(s["outcomes"].items())]
+        for name, q in s["latency"].items():
+            lines.append(f"# TYPE debugger_job_{name}_seconds gauge")
+            lines += [f'debugger_job_{name}_seconds{{quantile="0.{p[1:]}"}} {v}' for p, v in q.items()]
+        return "\n".join(lines) + "\n"
+
+
+# ---------- workers ----------
+class Worker:
+    """Claims jobs from a JobQueue and runs up to `concurrency` pipelines at once, in threads."""
+
+    def __init__(self, queue: JobQueue, name: Optional[str] = None, concurrency: int = JOB_WORKER_CONCURRENCY,
+                 poll_seconds: float = JOB_POLL_SECONDS):
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = poll_seconds
+        self.finished = 0
+
+    def _heartbeat(self, stop: threading.Event):
+        while not stop.wait(self.queue.lease_seconds / 3):
+            try:
+                self.queue.heartbeat(self.name)
+            except sqlite3.Error as e:
+                print(f"⚠️ [{self.name}] heartbeat failed: {e}", file=sys.stderr)
+
+    def _process(self, job: Dict[str, Any], cancel_event: threading.Event) -> Dict[str, Any]:
+        from graph import debug_pipeline
+        from tracing import METRICS
+
+        def on_event(ev):
+            if ev["type"] == "attempt_finished":
+                self.queue.record_attempt(job["id"], job["run"], self.name, ev["entry"])
+
+        METRICS.observe("debugger_job_wait_seconds", time.time() - job["enqueued"])
+        start = time.perf_counter()
+        try:
+            res = debug_pipeline(job["error_log"], user_code_snippet=job.get("user_code_snippet"),
+                                 max_attempts=int(job["max_attempts"] or MAX_ATTEMPTS),
+                                 on_event=on_event, cancel_event=cancel_event)
+        except Exception as e:
+            res = {"status": "error", "message": repr(e)}
+        elapsed = time.perf_counter() - start
+        METRICS.observe("debugger_job_run_seconds", elapsed)
+        METRICS.inc("debugger_jobs_finished_total", outcome=res.get("status", "error"))
+        return res
+
+    def _finish(self, job: Dict[str, Any], res: Dict[str, Any], aborting: bool):
+        status = res.get("status", "error")
+        if status == "cancelled" and aborting:
+            self.queue.release(job["id"], job["run"], self.name)
+            print(f"[requeued] {job['id']} (worker stopping)", file=sys.stderr)
+            return
+        if self.queue.complete(job["id"], job["run"], self.name, res):
+            self.finished += 1
+            print(f"[{status}] {job['id']} run {job['run']} by {self.name}", file=sys.stderr)
+        else:
+            print(f"⚠️ [{self.name}] lost the lease on {job['id']}; result discarded", file=sys.stderr)
+
+    def run(self, stop: Optional[threading.Event] = None, abort: Optional[threading.Event] = None,
+            exit_when_empty: bool = False):
+        """
+        Work until `stop` is set (running jobs finish first) or `abort` is set
+        (running jobs are cancelled and requeued); with `exit_when_empty`, also
+        stop once no job is queued or running anywhere.
+        """
+        stop = stop or threading.Event()
+        abort = abort or threading.Event()
+        beat_stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(beat_stop,), name="job-heartbeat", daemon=True).start()
+        running: Dict[Any, tuple] = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job") as executor:
+                while True:
+                    if abort.is_set():
+                        for _, cancel_event in running.values():
+                            cancel_event.set()
+                    claimed = None
+                    if not (stop.is_set() or abort.is_set()) and len(running) < self.concurrency:
+                        claimed = self.queue.claim(self.name)
+                        if claimed is not None:
+                            if claimed["last_error"] and claimed["run"] > 1:
+                                print(f"[retry] {claimed['id']} run {claimed['run']}: {claimed['last_error']}",
+                                      file=sys.stderr)
+                            cancel_event = threading.Event()
+                            running[executor.submit(self._process, claimed, cancel_event)] = (claimed, cancel_event)
+                            continue
+                    if not running:
+                        if stop.is_set() or abort.is_set():
+                            return
+                        if exit_when_empty and self.queue.pending() == 0:
+                            return
+                        stop.wait(self.poll_seconds)
+                        continue
+                    done, _ = wait(list(running), timeout=self.poll_seconds, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        job, _ = running.pop(fut)
+                        self._finish(job, fut.result(), abort.is_set())
+        finally:
+            beat_stop.set()
+
+
+def _worker_main(path: str, name: str, concurrency: int, stop, abort, exit_when_empty: bool):
+    # the supervisor owns the signals and tells workers through `stop` / `abort`
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import registry
+    registry.warm_up()
+
+    # the multiprocessing events are not threading.Events; mirror them for Worker.run
+    local_stop, local_abort = threading.Event(), threading.Event()
+
+    def _watch():
+        while not local_abort.is_set():
+            if abort.wait(0.5):
+                local_abort.set()
+            if stop.is_set():
+                local_stop.set()
+
+    threading.Thread(target=_watch, daemon=True).start()
+    worker = Worker(JobQueue(path), name, concurrency)
+    worker.run(local_stop, local_abort, exit_when_empty)
+    local_abort.set()
+
+
+def run_pool(workers: int = JOB_WORKERS, concurrency: int = JOB_WORKER_CONCURRENCY, path: str = JOB_QUEUE_PATH,
+             exit_when_empty: bool = False) -> int:
+    """
+    Start `workers` worker processes and restart any that die. SIGINT/SIGTERM
+    once: finish running jobs and exit; twice: cancel and requeue them.
+    """
+    workers = workers or os.cpu_count() or 1
+    queue = JobQueue(path)
+    ctx = multiprocessing.get_context("spawn")
+    stop, abort = ctx.Event(), ctx.Event()
+    host = socket.gethostname()
+    procs: Dict[str, Any] = {}
+    start_failures: Dict[int, int] = {}
+
+    def _start(n: int) -> str:
+        name = f"{host}:w{n}-{uuid.uuid4().hex[:6]}"
+        p = ctx.Process(target=_worker_main, args=(path, name, concurrency, stop, abort, exit_when_empty),
+                        name=name, daemon=False)
+        p.start()
+        procs[name] = (n, p, time.monotonic())
+        return name
+
+    def _signal(signum, frame):
+        if stop.is_set():
+            print("Cancelling running jobs ...", file=sys.stderr)
+            abort.set()
+        else:
+            print("Stopping after running jobs finish (signal again to cancel them) ...", file=sys.stderr)
+            stop.set()
+
+    signal.signal(signal.SIGINT, _signal)
+    signal.signal(signal.SIGTERM, _signal)
+    for n in range(workers):
+        _start(n)
+    print(f"Job queue {path}: {workers} worker process(es) x {concurrency} pipeline(s)", file=sys.stderr)
+
+    while procs:
+        time.sleep(JOB_POLL_SECONDS)
+        for name, (n, p, started) in list(procs.items()):
+            if p.is_alive():
+                continue
+            del procs[name]
+            if p.exitcode == 0:
+                continue
+            expired = queue.expire_leases(name)
+            print(f"⚠️ Worker {name} exited with {p.exitcode}; {expired} job(s) handed back", file=sys.stderr)
+            quick = time.monotonic() - started < WORKER_MIN_UPTIME
+            start_failures[n] = start_failures.get(n, 0) + 1 if quick else 0
+            if start_failures[n] >= WORKER_MAX_START_FAILURES:
+                print(f"❌ Worker slot {n} failed {start_failures[n]} times in a row at start-up; not restarting it",
+                      file=sys.stderr)
+            elif not stop.is_set():
+                _start(n)
+    print(json.dumps(queue.stats(), indent=2), file=sys.stderr)
+    return 1 if start_failures and max(start_failures.values()) >= WORKER_MAX_START_FAILURES else 0
+
+
+# ---------- CLI ----------
+def _submit(queue: JobQueue, args) -> int:
+    if args.input == "-":
+        jobs = [{"error_log": sys.stdin.read()}]
+    elif os.path.isdir(args.input) or args.input.endswith(".jsonl"):
+        jobs = load_jobs(args.input)
+    else:
+        with open(args.input, "r", encoding="utf-8", errors="replace") as fh:
+            jobs = [{"error_log": fh.read()}]
+    snippet = None
+    if args.snippet:
+        with open(args.snippet, "r", encoding="utf-8", errors="replace") as fh:
+            snippet = fh.read()
+    for job in jobs:
+        print(queue.enqueue(job["error_log"], job.get("user_code_snippet") or snippet,
+                            int(job.get("max_attempts") or args.max_attempts)))
+    return 0
+
+
+def _show(queue: JobQueue, args) -> int:
+    deadline = time.monotonic() + (args.wait or 0)
+    job = queue.get(args.job_id)
+    while job is not None and job["status"] in ("queued", "running") and time.monotonic() < deadline:
+        time.sleep(JOB_POLL_SECONDS)
+        job = queue.get(args.job_id)
+    if job is None:
+        print(f"❌ Unknown job: {args.job_id}", file=sys.stderr)
+        return 2
+    print(json.dumps(job, indent=2, default=str))
+    return 0 if job["outcome"] == "fixed" else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Durable queue of debugging jobs and its worker pool.")
+    parser.add_argument("--db", default=JOB_QUEUE_PATH, help="queue database (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("submit", help="enqueue an error log, a directory of logs or a JSONL file")
+    p.add_argument("input", help="log file, directory, JSONL file, or - for stdin")
+    p.add_argument("--snippet", default=None, help="code snippet file (single log / stdin input)")
+    p.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+
+    p = sub.add_parser("work", help="run the worker pool")
+    p.add_argument("--workers", type=int, default=JOB_WORKERS, help="processes (0 = cpu count)")
+    p.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="pipelines per process")
+    p.add_argument("--exit-when-empty", action="store_true", help="stop once nothing is queued or running")
+
+    p = sub.add_parser("status", help="queue depth and latency")
+    p.add_argument("--window", type=float, default=3600.0, help="seconds of finished jobs to summarise")
+    p.add_argument("--prometheus", default=None, help="also write Prometheus-text gauges here")
+
+    p = sub.add_parser("show", help="print a job, its result and per-attempt history")
+    p.add_argument("job_id")
+    p.add_argument("--wait", type=float, default=0, help="seconds to wait for the job to finish")
+
+    p = sub.add_parser("requeue", help="run a dead or finished job again")
+    p.add_argument("job_id")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    if args.command == "submit":
+        return _submit(queue, args)
+    if args.command == "work":
+        return run_pool(args.workers, args.concurrency, args.db, args.exit_when_empty)
+    if args.command == "status":
+        print(json.dumps(queue.stats(args.window), indent=2))
+        if args.prometheus:
+            with open(args.prometheus, "w", encoding="utf-8") as fh:
+                fh.write(queue.prometheus_text(args.window))
+        return 0
+    if args.command == "show":
+        return _show(queue, args)
+    if queue.requeue(args.job_id):
+        print(f"Requeued {args.job_id}")
+        return 0
+    print(f"❌ {args.job_id} is not dead or done (or does not exist)", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
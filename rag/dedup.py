@@ -0,0 +1,208 @@
+# rag/dedup.py
+"""
+Index-time near-duplicate elimination.
+
+The manuals in data/docs repeat page headers/footers, tables of contents and
+boilerplate, and the overlapping splitter turns those into many
+near-identical chunks that get embedded, stored and retrieved as redundant
+top-k hits. Two stages remove them:
+
+- `strip_page_furniture()` runs per source file before splitting, on paged
+  sources only (documents with `page` metadata, at least FURNITURE_MIN_PAGES
+  of them): lines that open or close a large share of its pages (running
+  headers, footers, page numbers, once digits are masked) and dotted
+  table-of-contents lines are dropped. Single-document text files pass
+  through untouched.
+- `NearDuplicateFilter` runs over the chunk stream before embedding: each
+  chunk gets a MinHash signature of its word 3-grams, LSH banding finds
+  candidate matches among the chunks kept so far, and a chunk whose
+  estimated Jaccard similarity with one of them reaches DEDUP_THRESHOLD is
+  dropped. Its source is recorded on the kept chunk (`merged_sources`,
+  `duplicates` metadata), which the builder writes back after upserting.
+  Builds that keep an index manifest match only within a source file, so
+  each file's chunks can be re-indexed or purged on their own.
+
+Memory is one small signature per kept chunk; texts are not retained.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+from config import DEDUP_THRESHOLD
+
+NUM_PERM = 128
+BANDS = 16                        # 16 bands x 8 rows: candidates from ~0.7 Jaccard up
+SHINGLE_WORDS = 3
+MAX_MERGED_SOURCES = 20           # provenance entries kept per chunk (the count is always exact)
+
+FURNITURE_LINES = 3               # lines at the top / bottom of a page that may be furniture
+FURNITURE_MIN_PAGES = 3
+FURNITURE_MIN_SHARE = 0.3         # of a file's pages (alternating even/odd headers each cover ~half)
+
+_MERSENNE = (1 << 31) - 1
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, _MERSENNE, size=NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.randint(0, _MERSENNE, size=NUM_PERM, dtype=np.int64)
+
+_WORD_RE = re.compile(r"\w+")
+_DIGITS_RE = re.compile(r"\d+")
+_TOC_RE = re.compile(r"(?:\.\s?){4,}\s*[\divxlcIVXLC]+\s*$")
+_PAGE_NUMBER_RE = re.compile(r"^\s*(?:page\s*)?#(?:\s*(?:of|/)\s*#)?\s*$", re.IGNORECASE)
+
+
+# ---------- page furniture ----------
+def _furniture_key(line: str) -> str:
+    return " ".join(_DIGITS_RE.sub("#", line.lower()).split())
+
+
+def _edge_lines(lines: List[str]) -> List[int]:
+    """Indices of the first and last few non-empty lines (fewer on short pages, so body text is not an edge)."""
+    non_empty = [i for i, line in enumerate(lines) if line.strip()]
+    n = min(FURNITURE_LINES, max(1, len(non_empty) // 4))
+    return sorted(set(non_empty[:n] + non_empty[-n:]))
+
+
+def strip_page_furniture(docs: List[Document]) -> List[Document]:
+    """
+    Remove running headers/footers, bare page numbers and dotted TOC lines
+    from page documents, judged per source file. Only sources with at least
+    FURNITURE_MIN_PAGES `page` documents are touched; everything else (e.g.
+    a whole .txt/.md file as one document) is returned as is. Pages left
+    empty are dropped.
+    """
+    by_source: Dict[str, List[int]] = defaultdict(list)
+    for n, doc in enumerate(docs):
+        if "page" in (doc.metadata or {}):
+            by_source[str(doc.metadata.get("source", ""))].append(n)
+
+    furniture: Dict[str, set] = {}
+    for source, pages in by_source.items():
+        if len(pages) < FURNITURE_MIN_PAGES:
+            continue
+        counts: Dict[str, int] = defaultdict(int)
+        for n in pages:
+            lines = docs[n].page_content.splitlines()
+            for key in {_furniture_key(lines[i]) for i in _edge_lines(lines)}:
+                counts[key] += 1
+        needed = max(FURNITURE_MIN_PAGES, FURNITURE_MIN_SHARE * len(pages))
+        furniture[source] = {key for key, c in counts.items() if c >= needed and key}
+
+    out = []
+    for doc in docs:
+        meta = doc.metadata or {}
+        repeated = furniture.get(str(meta.get("source", ""))) if "page" in meta else None
+        if repeated is None:
+            out.append(doc)
+            continue
+        lines = doc.page_content.splitlines()
+        edges = set(_edge_lines(lines))
+        kept = []
+        for i, line in enumerate(lines):
+            if _TOC_RE.search(line):
+                continue
+            if i in edges:
+                key = _furniture_key(line)
+                if key in repeated or _PAGE_NUMBER_RE.match(key):
+                    continue
+            kept.append(line)
+        text = "\n".join(kept)
+        if text.strip():
+            out.append(Document(page_content=text, metadata=doc.metadata))
+    return out
+
+
+# ---------- near-duplicate chunks ----------
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM values) of the word 3-gram set of `text`."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.int64, count=len(shingles))
+    hashes %= _MERSENNE
+    # (a * h + b) mod p for every permutation x shingle; a, h < 2^31 so nothing overflows int64
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE).min(axis=1).astype(np.uint32)
+
+
+def _provenance(doc: Document) -> str:
+    meta = doc.metadata or {}
+    source = str(meta.get("source", "?"))
+    return f"{source}#page={meta['page']}" if "page" in meta else source
+
+
+class NearDuplicateFilter:
+    """
+    Streaming MinHash/LSH filter: `filter(chunks)` yields the chunks to keep;
+    `merged_metadata()` then gives the provenance to record on kept chunks
+    that absorbed duplicates, by their position in the kept stream. With
+    `per_source`, chunks only ever match chunks of the same source file, so
+    what is kept of one file does not depend on any other.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, bands: int = BANDS, per_source: bool = False):
+        self.threshold = threshold
+        self.bands = bands
+        self.per_source = per_source
+        self.rows = NUM_PERM // bands
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: List[np.ndarray] = []
+        self._metadatas: List[dict] = []
+        self._sources: List[str] = []
+        self._merged: Dict[int, List[str]] = defaultdict(list)
+        self.seen = 0
+        self.dropped = 0
+
+    def _match(self, sig: np.ndarray, band_keys: List[bytes], source: str) -> Optional[int]:
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        best, best_sim = None, self.threshold
+        for j in candidates:
+            if self.per_source and self._sources[j] != source:
+                continue
+            sim = float(np.mean(self._signatures[j] == sig))
+            if sim >= best_sim:
+                best, best_sim = j, sim
+        return best
+
+    def filter(self, chunks: Iterable[Document]) -> Iterator[Document]:
+        for doc in chunks:
+            self.seen += 1
+            sig = minhash(doc.page_content)
+            band_keys = [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+            source = str((doc.metadata or {}).get("source", ""))
+            j = self._match(sig, band_keys, source)
+            if j is not None:
+                self.dropped += 1
+                self._merged[j].append(_provenance(doc))
+                continue
+            n = len(self._signatures)
+            self._signatures.append(sig)
+            self._metadatas.append(dict(doc.metadata or {}))
+            self._sources.append(source)
+            for band, key in enumerate(band_keys):
+                self._buckets[band][key].append(n)
+            yield doc
+
+    def merged_metadata(self) -> Dict[int, dict]:
+        """{kept position: metadata with merged_sources / duplicates} for chunks that absorbed duplicates."""
+        out = {}
+        for j, sources in self._merged.items():
+            own = _provenance(Document(page_content="", metadata=self._metadatas[j]))
+            unique = [s for s in dict.fromkeys(sources) if s != own]
+            meta = dict(self._metadatas[j])
+            meta["duplicates"] = len(sources)
+            # Chroma metadata values must be scalars
+            meta["merged_sources"] = " | ".join(unique[:MAX_MERGED_SOURCES])
+            out[j] = meta
+        return out
+
+    def summary(self) -> str:
+        share = self.dropped / self.seen if self.seen else 0.0
+        return f"Dedup: dropped {self.dropped} near-duplicate chunk(s) of {self.seen} ({share:.1%})"
@@ -1,16 +1,59 @@
 # rag/document_loader.py
 import os
-from typing import List
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Iterable, Iterator, Optional, Dict, Tuple
 from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
-from config import DOCS_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+from config import DOCS_PATH, CHUNK_SIZE, CHUNK_OVERLAP, LOADER_WORKERS, LOADER_MAX_PENDING, DEDUP_ENABLED
+from rag.dedup import strip_page_furniture
+from rag.parse_cache import load_cached, parser_version
+
+TEXT_EXTENSIONS = (".txt", ".md", ".log")
+PDF_EXTENSIONS = (".pdf",)
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + PDF_EXTENSIONS
+
 
 def _list_files(path: str):
     for root, _, files in os.walk(path):
         for f in sorted(files):
             yield os.path.join(root, f)
 
+
+def list_document_files(path: str = None) -> List[str]:
+    """
+    Return every file under `path` with a supported extension, in walk order.
+    """
+    path = path or DOCS_PATH
+    return [p for p in _list_files(path) if p.lower().endswith(SUPPORTED_EXTENSIONS)]
+
+
+def load_file(file_path: str) -> List[Document]:
+    """
+    Load a single txt/md/log/pdf file into raw (pre-split) documents.
+    Raises on parser errors so callers can decide whether to skip the file.
+    """
+    basename = os.path.basename(file_path).lower()
+    if basename.endswith(TEXT_EXTENSIONS):
+        # Text files — explicit encoding
+        return TextLoader(file_path, encoding="utf-8").load()
+    if basename.endswith(PDF_EXTENSIONS):
+        # extracted text is cached per content hash, so re-chunking skips re-parsing
+        return load_cached(file_path, lambda: PyPDFLoader(file_path).load(), parser_version("pypdf"))
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def split_documents(docs: List[Document]) -> List[Document]:
+    if not docs:
+        return []
+    if DEDUP_ENABLED:
+        # running headers/footers would otherwise end up in (and near-duplicate) many chunks
+        docs = strip_page_furniture(docs)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return splitter.split_documents(docs)
+
+
 def load_documents(path: str = None) -> List[Document]:
     """
     Load and split documents (txt, md, pdf). Skip files that raise errors but print diagnostics.
@@ -32,18 +75,15 @@ def load_documents(path: str = None) -> List[Document]:
         basename = os.path.basename(file_path).lower()
 
         try:
-            if basename.endswith((".txt", ".md", ".log")):
-                # Text files — explicit encoding
-                loader = TextLoader(file_path, encoding="utf-8")
-                docs = loader.load()
+            if basename.endswith(TEXT_EXTENSIONS):
+                docs = load_file(file_path)
                 loaded_docs.extend(docs)
                 print(f"Loaded text: {file_path} -> {len(docs)} document(s)")
 
-            elif basename.endswith(".pdf"):
+            elif basename.endswith(PDF_EXTENSIONS):
                 # PDF files
                 try:
-                    loader = PyPDFLoader(file_path)
-                    docs = loader.load()
+                    docs = load_file(file_path)
                     loaded_docs.extend(docs)
                     print(f"Loaded PDF: {file_path} -> {len(docs)} page-doc(s)")
                 except Exception as e_pdf:
@@ -66,9 +106,98 @@ def load_documents(path: str = None) -> List[Document]:
 
     # Split into chunks
     if loaded_docs:
-        splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
-        split_docs = splitter.split_documents(loaded_docs)
+        split_docs = split_documents(loaded_docs)
         print(f"Split into {len(split_docs)} chunks (chunk_size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP})")
         return split_docs
 
     return []
+
+
+def _load_and_split(file_path: str) -> Tuple[str, List[Document], int, float, Optional[str]]:
+    """
+    Worker entry point: parse + split one file.
+    Returns (file_path, chunks, n_raw_docs, parse_seconds, error).
+    """
+    start = time.perf_counter()
+    try:
+        docs = load_file(file_path)
+        chunks = split_documents(docs)
+        return file_path, chunks, len(docs), time.perf_counter() - start, None
+    except Exception as exc:
+        return file_path, [], 0, time.perf_counter() - start, repr(exc)
+
+
+def iter_parsed_files(
+    file_paths: Iterable[str],
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+) -> Iterator[Tuple[str, List[Document], int, float, Optional[str]]]:
+    """
+    Parse and split files in a process pool, yielding per-file results as soon
+    as each finishes. At most `max_pending` files are in flight, so memory is
+    bounded by queue depth rather than corpus size while the consumer embeds.
+    """
+    workers = workers or LOADER_WORKERS or os.cpu_count() or 1
+    max_pending = max(1, max_pending or LOADER_MAX_PENDING or workers)
+
+    if workers == 1:
+        for file_path in file_paths:
+            yield _load_and_split(file_path)
+        return
+
+    paths = iter(file_paths)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = set()
+    try:
+        for file_path in paths:
+            pending.add(executor.submit(_load_and_split, file_path))
+            if len(pending) >= max_pending:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+            # refill the pipeline up to max_pending
+            for file_path in paths:
+                pending.add(executor.submit(_load_and_split, file_path))
+                if len(pending) >= max_pending:
+                    break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_document_chunks(
+    path: str = None,
+    workers: Optional[int] = None,
+    max_pending: Optional[int] = None,
+    parse_times: Optional[Dict[str, float]] = None,
+) -> Iterator[Document]:
+    """
+    Streaming counterpart of load_documents(): yields chunks file by file while
+    other files are still being parsed. Per-file parse time is printed and, if
+    `parse_times` is given, recorded into it.
+    """
+    if path is None:
+        path = DOCS_PATH
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Documents path does not exist: {path}")
+
+    for f in _list_files(path):
+        if not f.lower().endswith(SUPPORTED_EXTENSIONS):
+            print(f"Skipping unsupported file type: {f}")
+
+    file_count = 0
+    chunk_count = 0
+    for file_path, chunks, n_raw, elapsed, error in iter_parsed_files(list_document_files(path), workers, max_pending):
+        file_count += 1
+        if parse_times is not None:
+            parse_times[file_path] = elapsed
+        if error:
+            print(f"⚠️ Error processing {file_path}: {error}. Skipping. ({elapsed:.2f}s)")
+            continue
+        print(f"Loaded: {file_path} -> {n_raw} raw doc(s), {len(chunks)} chunk(s) in {elapsed:.2f}s")
+        chunk_count += len(chunks)
+        yield from chunks
+
+    print(f"\nParsed {file_count} files into {chunk_count} chunks (chunk_size={CHUNK_SIZE}, overlap={CHUNK_OVERLAP})")
@@ -0,0 +1,156 @@
+# rag/embedding_pool.py
+"""
+Multi-process CPU embedding for index builds.
+
+A single SentenceTransformer leaves most cores of a CPU-only build host idle,
+and batching chunks in document order pads every short chunk up to the
+longest one in its batch. `EmbeddingPool` instead:
+
+- runs EMBEDDING_WORKERS processes, each loading the model once and using
+  its share of the cores for torch's intra-op threads;
+- sorts each group of chunks by (estimated) token length and cuts it into
+  batches whose padded size (rows x longest row) stays within
+  EMBEDDING_TOKEN_BUDGET, so short chunks travel in big batches and long
+  ones in small batches;
+- re-assembles the embeddings in the original chunk order.
+
+It has the `encode()` shape _embed_and_upsert expects from a
+SentenceTransformer, and keeps per-worker chunks/sec in `stats`.
+"""
+
+import os
+import re
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import EMBEDDING_MODEL, EMBEDDING_TOKEN_BUDGET
+
+MAX_SEQ_TOKENS = 256          # all-MiniLM-L6-v2 truncates longer inputs
+MAX_BATCH_ROWS = 512
+GROUP_BATCHES_PER_WORKER = 4  # chunks pulled per encode() call, in batches per worker
+
+# roughly what a WordPiece tokenizer produces: words, numbers and punctuation marks
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# ---------- worker side ----------
+_model = None
+
+
+def _init_worker(model_name: str, threads: int):
+    global _model
+    try:
+        import torch
+        torch.set_num_threads(max(1, threads))
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_batch(texts: List[str]) -> Tuple[np.ndarray, int, float]:
+    """Returns (embeddings, worker pid, seconds spent encoding)."""
+    start = time.perf_counter()
+    emb = _model.encode(texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True)
+    return np.asarray(emb, dtype=np.float32), os.getpid(), time.perf_counter() - start
+
+
+# ---------- client side ----------
+def estimate_tokens(text: str) -> int:
+    """Token count after the model's truncation (+2 for [CLS]/[SEP])."""
+    return min(len(_TOKEN_RE.findall(text or "")) + 2, MAX_SEQ_TOKENS)
+
+
+def plan_batches(lengths: List[int], token_budget: int = EMBEDDING_TOKEN_BUDGET,
+                 max_rows: int = MAX_BATCH_ROWS) -> List[List[int]]:
+    """
+    Indices grouped into batches of similar length, longest first, each with
+    rows x longest length <= token_budget (a single over-budget row still
+    gets its own batch).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    for i in order:
+        # sorted descending, so the batch's first row is its longest
+        longest = lengths[batch[0]] if batch else lengths[i]
+        if batch and ((len(batch) + 1) * longest > token_budget or len(batch) >= max_rows):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class EmbeddingPool:
+    def __init__(self, workers: int = 0, model_name: str = EMBEDDING_MODEL,
+                 token_budget: int = EMBEDDING_TOKEN_BUDGET):
+        self.workers = workers or os.cpu_count() or 1
+        self.model_name = model_name
+        self.token_budget = token_budget
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # spawn: the parent may already have torch (and its thread pools) loaded
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_name, threads),
+        )
+        # worker pid -> {"chunks", "batches", "tokens", "padded_tokens", "seconds"}
+        self.stats: Dict[int, Dict[str, float]] = {}
+        print(f"Embedding pool: {self.workers} worker(s) x {threads} thread(s), "
+              f"model {model_name}, {token_budget} padded tokens per batch")
+
+    @property
+    def group_size(self) -> int:
+        """How many chunks to hand to encode() at once so every worker stays busy."""
+        rows_per_batch = max(1, self.token_budget // 128)
+        return self.workers * GROUP_BATCHES_PER_WORKER * rows_per_batch
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Embeddings for `texts`, in their order (SentenceTransformer.encode kwargs are ignored)."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        lengths = [estimate_tokens(t) for t in texts]
+        batches = plan_batches(lengths, self.token_budget)
+        futures = {self._executor.submit(_encode_batch, [texts[i] for i in idx]): idx for idx in batches}
+        out: Optional[np.ndarray] = None
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            emb, pid, seconds = fut.result()
+            if out is None:
+                out = np.empty((len(texts), emb.shape[1]), dtype=np.float32)
+            out[idx] = emb
+            s = self.stats.setdefault(pid, {"chunks": 0, "batches": 0, "tokens": 0, "padded_tokens": 0, "seconds": 0.0})
+            s["chunks"] += len(idx)
+            s["batches"] += 1
+            s["tokens"] += sum(lengths[i] for i in idx)
+            s["padded_tokens"] += len(idx) * max(lengths[i] for i in idx)
+            s["seconds"] += seconds
+        return out
+
+    def report(self) -> List[Dict[str, float]]:
+        """Per-worker throughput rows (also printed)."""
+        rows = []
+        for n, (pid, s) in enumerate(sorted(self.stats.items()), 1):
+            rate = s["chunks"] / s["seconds"] if s["seconds"] else 0.0
+            fill = s["tokens"] / s["padded_tokens"] if s["padded_tokens"] else 0.0
+            rows.append({"worker": n, "pid": pid, "chunks": s["chunks"], "batches": s["batches"],
+                         "seconds": round(s["seconds"], 3), "chunks_per_sec": round(rate, 1),
+                         "padding_efficiency": round(fill, 3)})
+            print(f"  worker {n} (pid {pid}): {s['chunks']} chunks in {s['batches']} batches, "
+                  f"{s['seconds']:.1f}s busy, {rate:.1f} chunks/s, {fill:.0%} non-padding tokens")
+        return rows
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,342 @@
+# rag/flat_store.py
+"""
+Flat NumPy vector backend (VECTOR_BACKEND=flat).
+
+For a corpus of a few hundred thousand chunks, exact search over one
+contiguous matrix is faster than the Chroma client plus the LangChain wrapper,
+and opening it is just an mmap. Layout per collection
+(`<persist_dir>/flat/<collection>/`):
+
+  vectors.npy   N x D embedding matrix (FLAT_STORE_DTYPE), L2-normalised rows
+  chunks.pkl    ids, texts and metadatas in row order
+  codes.npy     with FLAT_STORE_QUANTIZATION=int8: N x D int8 codes ...
+  scales.npy    ... and one float32 scale per row (row ~= codes * scale)
+
+With int8 codes, candidates are scored on the codes (a quarter of the
+float32 footprint) and only a shortlist of FLAT_RERANK_FACTOR * k rows is
+re-ranked against the full-precision matrix, so the mmap of vectors.npy only
+pages in those rows.
+
+`FlatCollection` mimics the parts of the Chroma collection API the build
+pipeline uses (upsert / delete / count / get), so create_vector_store and
+update_vector_store drive both backends the same way. `FlatVectorStore` is
+the query side; several worker processes opening the same files share the
+page cache.
+"""
+
+import os
+import pickle
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import VECTOR_DB_PATH, EMBEDDING_MODEL, FLAT_STORE_DTYPE, FLAT_STORE_QUANTIZATION, FLAT_RERANK_FACTOR
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.pkl"
+CODES_FILE = "codes.npy"
+SCALES_FILE = "scales.npy"
+SCORE_BLOCK_ROWS = 16384      # rows scored per block; bounds the float32 temporary for float16 stores
+
+
+def flat_store_dir(persist_dir: str, collection_name: str) -> str:
+    return os.path.join(persist_dir, "flat", collection_name)
+
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def quantize_int8(mat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantisation: (codes, scales) with mat ~= codes * scales[:, None]."""
+    mat = np.asarray(mat, dtype=np.float32)
+    scales = np.abs(mat).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(mat / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def _load(path: str) -> Tuple[Optional[np.ndarray], Dict]:
+    vec_path, chunks_path = os.path.join(path, VECTORS_FILE), os.path.join(path, CHUNKS_FILE)
+    if not (os.path.exists(vec_path) and os.path.exists(chunks_path)):
+        return None, {"ids": [], "texts": [], "metadatas": []}
+    with open(chunks_path, "rb") as fh:
+        table = pickle.load(fh)
+    return np.load(vec_path, mmap_mode="r"), table
+
+
+def _load_codes(path: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    codes_path, scales_path = os.path.join(path, CODES_FILE), os.path.join(path, SCALES_FILE)
+    if not (os.path.exists(codes_path) and os.path.exists(scales_path)):
+        return None, None
+    return np.load(codes_path, mmap_mode="r"), np.load(scales_path, mmap_mode="r")
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+          ) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k rows of `matrix` by dot product with `query`: (row indices, scores), best first."""
+    n = matrix.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    scores = np.empty(n, dtype=np.float32)
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        block = np.asarray(matrix[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[start:start + len(block)] = block @ query
+    if mask is not None:
+        scores[~mask] = -np.inf
+    k = min(k, n)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    idx = idx[np.argsort(-scores[idx])]
+    keep = np.isfinite(scores[idx])
+    return idx[keep], scores[idx][keep]
+
+
+def top_k_quantized(codes: np.ndarray, scales: np.ndarray, matrix: np.ndarray, query: np.ndarray,
+                    k: int, shortlist: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Top-k by int8-code scores, with the best `shortlist` rows re-ranked on `matrix`."""
+    n = codes.shape[0]
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    approx = np.empty(n, dtype=np.float32)
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        block = np.asarray(codes[start:start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        approx[start:start + len(block)] = (block @ query) * scales[start:start + len(block)]
+    shortlist = min(max(shortlist, k), n)
+    cand = np.sort(np.argpartition(-approx, shortlist - 1)[:shortlist])   # sorted: sequential page access
+    exact = np.asarray(matrix[cand], dtype=np.float32) @ query
+    k = min(k, len(cand))
+    best = np.argpartition(-exact, k - 1)[:k]
+    best = best[np.argsort(-exact[best])]
+    return cand[best], exact[best]
+
+
+class FlatCollection:
+    """Writable flat store with a Chroma-collection-like API; call persist() to write it out."""
+
+    # create_vector_store hands embeddings over as the encoder's ndarray (no .tolist())
+    accepts_numpy = True
+
+    def __init__(self, path: str, dtype: str = FLAT_STORE_DTYPE, quantization: str = FLAT_STORE_QUANTIZATION):
+        if quantization not in ("none", "int8"):
+            raise ValueError(f"Unknown FLAT_STORE_QUANTIZATION '{quantization}' (expected 'none' or 'int8')")
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.quantization = quantization
+        self._matrix, table = _load(path)
+        self._ids: List[Optional[str]] = list(table["ids"])
+        self._texts: List[Optional[str]] = list(table["texts"])
+        self._metadatas: List[Optional[dict]] = list(table["metadatas"])
+        self._row = {doc_id: i for i, doc_id in enumerate(self._ids) if doc_id is not None}
+        self._pending: List[np.ndarray] = []   # rows appended since the last persist()
+        self._dirty = False
+
+    def count(self) -> int:
+        return len(self._row)
+
+    def reset(self):
+        self._matrix = None
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._row, self._pending = {}, []
+        self._dirty = True
+
+    def upsert(self, ids: Sequence[str], documents: Sequence[str], metadatas: Sequence[dict], embeddings):
+        self.delete(ids=[i for i in ids if i in self._row])
+        vectors = _normalize(embeddings).astype(self.dtype)
+        for doc_id, text, meta in zip(ids, documents, metadatas):
+            self._row[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+            self._texts.append(text)
+            self._metadatas.append(meta or {})
+        self._pending.append(vectors)
+        self._dirty = True
+
+    def delete(self, ids: Sequence[str]):
+        for doc_id in ids:
+            i = self._row.pop(doc_id, None)
+            if i is not None:
+                self._ids[i] = self._texts[i] = self._metadatas[i] = None
+                self._dirty = True
+
+    def update(self, ids: Sequence[str], metadatas: Sequence[dict]):
+        """Replace the metadata of stored chunks (vectors and texts are unchanged)."""
+        for doc_id, meta in zip(ids, metadatas):
+            i = self._row.get(doc_id)
+            if i is not None:
+                self._metadatas[i] = meta or {}
+                self._dirty = True
+
+    def get(self, include=("documents", "metadatas"), limit: Optional[int] = None, offset: int = 0):
+        live = [i for i, doc_id in enumerate(self._ids) if doc_id is not None]
+        live = live[offset:offset + limit if limit is not None else None]
+        out = {"ids": [self._ids[i] for i in live]}
+        if "documents" in include:
+            out["documents"] = [self._texts[i] for i in live]
+        if "metadatas" in include:
+            out["metadatas"] = [self._metadatas[i] for i in live]
+        return out
+
+    def persist(self):
+        """Write live rows (old matrix + pending batches) to a new vectors.npy / chunks.pkl."""
+        if not self._dirty:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        live = np.fromiter((doc_id is not None for doc_id in self._ids), dtype=bool, count=len(self._ids))
+        n_old = 0 if self._matrix is None else self._matrix.shape[0]
+        dim = self._matrix.shape[1] if self._matrix is not None else (self._pending[0].shape[1] if self._pending else 0)
+
+        vec_tmp = os.path.join(self.path, VECTORS_FILE + ".tmp")
+        out = np.lib.format.open_memmap(vec_tmp, mode="w+", dtype=self.dtype, shape=(int(live.sum()), dim))
+        pos = 0
+        if n_old:
+            for start in range(0, n_old, SCORE_BLOCK_ROWS):
+                block_live = live[start:min(start + SCORE_BLOCK_ROWS, n_old)]
+                block = self._matrix[start:start + SCORE_BLOCK_ROWS][block_live]
+                out[pos:pos + len(block)] = block
+                pos += len(block)
+        row = n_old
+        for batch in self._pending:
+            block = batch[live[row:row + len(batch)]]
+            out[pos:pos + len(block)] = block
+            pos += len(block)
+            row += len(batch)
+        out.flush()
+
+        codes_tmp, scales_tmp = os.path.join(self.path, CODES_FILE + ".tmp"), os.path.join(self.path, SCALES_FILE + ".tmp")
+        if self.quantization == "int8":
+            codes = np.lib.format.open_memmap(codes_tmp, mode="w+", dtype=np.int8, shape=out.shape)
+            scales = np.lib.format.open_memmap(scales_tmp, mode="w+", dtype=np.float32, shape=(out.shape[0],))
+            for start in range(0, out.shape[0], SCORE_BLOCK_ROWS):
+                block_codes, block_scales = quantize_int8(out[start:start + SCORE_BLOCK_ROWS])
+                codes[start:start + len(block_codes)] = block_codes
+                scales[start:start + len(block_scales)] = block_scales
+            codes.flush()
+            scales.flush()
+            del codes, scales
+        del out
+
+        keep = np.flatnonzero(live)
+        table = {
+            "ids": [self._ids[i] for i in keep],
+            "texts": [self._texts[i] for i in keep],
+            "metadatas": [self._metadatas[i] for i in keep],
+        }
+        chunks_tmp = os.path.join(self.path, CHUNKS_FILE + ".tmp")
+        with open(chunks_tmp, "wb") as fh:
+            pickle.dump(table, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        self._matrix = None   # release the old mapping before replacing the file
+        os.replace(vec_tmp, os.path.join(self.path, VECTORS_FILE))
+        for name, tmp in ((CODES_FILE, codes_tmp), (SCALES_FILE, scales_tmp)):
+            final = os.path.join(self.path, name)
+            if self.quantization == "int8":
+                os.replace(tmp, final)
+            elif os.path.exists(final):
+                os.remove(final)   # stale codes from an earlier quantized build
+        # chunks.pkl last: readers reload when it changes
+        os.replace(chunks_tmp, os.path.join(self.path, CHUNKS_FILE))
+
+        self.__init__(self.path, self.dtype.name, self.quantization)
+
+
+class _QueryEmbedder:
+    """SentenceTransformer loaded on first use, so lexical-only queries never pay for it."""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        self.model_name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+            mat = self._model.encode(list(texts), show_progress_bar=False, convert_to_numpy=True)
+        return [_normalize(vec).tolist() for vec in mat]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FlatVectorStore:
+    """
+    Read side of the flat backend with the two methods DocRetriever uses:
+    `embeddings.embed_query()` and `similarity_search_by_vector()`. The files
+    are re-opened when a rebuild replaces them.
+    """
+
+    def __init__(self, path: str, embeddings=None, rerank_factor: int = FLAT_RERANK_FACTOR):
+        self.path = path
+        self.embeddings = embeddings or _QueryEmbedder()
+        self.rerank_factor = rerank_factor
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._matrix = None
+        self._codes = self._scales = None
+        self._table = None
+
+    def _current(self):
+        try:
+            st = os.stat(os.path.join(self.path, CHUNKS_FILE))
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp != self._stamp:
+                self._matrix, self._table = _load(self.path)
+                self._codes, self._scales = _load_codes(self.path)
+                self._stamp = stamp
+            return self._matrix, self._codes, self._scales, self._table
+
+    def similarity_search_by_vector(self, embedding, k: int = 4):
+        from langchain.schema import Document
+        matrix, codes, scales, table = self._current()
+        if matrix is None:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        if codes is not None and codes.shape[0] == matrix.shape[0]:
+            idx, _ = top_k_quantized(codes, scales, matrix, query, k, self.rerank_factor * k)
+        else:
+            idx, _ = top_k(matrix, query, k)
+        return [Document(page_content=table["texts"][i], metadata=table["metadatas"][i] or {}) for i in idx]
+
+
+def load_flat_vectorstore(collection_name: str = "autodoc", persist_directory: Optional[str] = None) -> FlatVectorStore:
+    return FlatVectorStore(flat_store_dir(persist_directory or VECTOR_DB_PATH, collection_name))
+
+
+def quantization_report(path: str, k: int = 6, n_queries: int = 200, factors=(1, 2, 5, 10),
+                        noise: float = 0.05, seed: int = 0) -> Dict:
+    """
+    Recall@k of int8 candidate generation (with shortlist = factor * k re-ranked
+    exactly) against exact search, plus the bytes each layout needs. Queries
+    are stored rows with Gaussian noise, a stand-in for paraphrased lookups.
+    """
+    matrix, _ = _load(path)
+    if matrix is None or matrix.shape[0] == 0:
+        raise FileNotFoundError(f"No flat vector store at {path}")
+    n, dim = matrix.shape
+    codes, scales = _load_codes(path)
+    if codes is None or codes.shape[0] != n:
+        codes, scales = quantize_int8(matrix)
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(n, size=min(n_queries, n), replace=False)
+    queries = _normalize(np.asarray(matrix[rows], dtype=np.float32) + rng.normal(0, noise, (len(rows), dim)))
+    hits = {f: 0 for f in factors}
+    for q in queries:
+        truth = set(top_k(matrix, q, k)[0].tolist())
+        for f in factors:
+            found = top_k_quantized(codes, scales, matrix, q, k, f * k)[0]
+            hits[f] += len(truth.intersection(found.tolist()))
+    total = len(queries) * min(k, n)
+    return {
+        "chunks": n,
+        "dim": dim,
+        "k": k,
+        "bytes": {"float32": n * dim * 4, "float16": n * dim * 2, "int8_codes": n * (dim + 4)},
+        "recall": {f"shortlist_{f}k": hits[f] / total for f in factors},
+    }
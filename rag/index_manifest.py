@@ -0,0 +1,127 @@
+# rag/index_manifest.py
+"""
+Per-file manifest for incremental indexing.
+
+The manifest maps each source file (path relative to the docs dir) to its
+size, mtime, content hash and the ids of the chunks it produced, so a rebuild
+only has to re-embed files whose content actually changed.
+"""
+
+import os
+import json
+import time
+import hashlib
+from typing import Dict, List, Tuple, Any, Optional
+
+from langchain.schema import Document
+
+MANIFEST_VERSION = 1
+INDEX_VERSION_FILE = "index_version"
+
+
+def bump_index_version(persist_dir: str):
+    """Mark the index as rebuilt so in-process retrieval caches invalidate themselves."""
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, INDEX_VERSION_FILE), "w", encoding="utf-8") as fh:
+        fh.write(f"{time.time_ns()}-{os.getpid()}")
+
+
+def read_index_version(persist_dir: str) -> str:
+    try:
+        with open(os.path.join(persist_dir, INDEX_VERSION_FILE), "r", encoding="utf-8") as fh:
+            return fh.read().strip()
+    except OSError:
+        return ""
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def make_chunk_ids(documents: List[Document], seen: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Stable, content-derived chunk ids: sha1(source, text) plus an occurrence
+    counter so identical chunks inside one source do not collide.
+    Pass the same `seen` dict across calls when ids are assigned batch by batch.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for d in documents:
+        meta = getattr(d, "metadata", None) or {}
+        source = str(meta.get("source", ""))
+        digest = hashlib.sha1(f"{source}\x00{d.page_content}".encode("utf-8")).hexdigest()
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        ids.append(f"{digest}-{n}")
+    return ids
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    if not os.path.exists(manifest_path):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except Exception as e:
+        print(f"⚠️ Could not read manifest {manifest_path}: {e}. Treating index as empty.")
+        return {"version": MANIFEST_VERSION, "files": {}}
+    if data.get("version") != MANIFEST_VERSION:
+        print(f"Manifest version {data.get('version')} != {MANIFEST_VERSION}; ignoring it.")
+        return {"version": MANIFEST_VERSION, "files": {}}
+    data.setdefault("files", {})
+    return data
+
+
+def save_manifest(manifest: Dict[str, Any], manifest_path: str):
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def scan_changes(
+    docs_dir: str,
+    file_paths: List[str],
+    manifest: Dict[str, Any],
+) -> Tuple[List[str], List[Tuple[str, Dict[str, Any]]], List[str]]:
+    """
+    Compare files on disk with the manifest.
+
+    Returns (unchanged, changed, removed):
+      - unchanged: relative paths that can be skipped
+      - changed:   (absolute path, new stat entry) for new or modified files
+      - removed:   relative paths present in the manifest but gone from disk
+    Size+mtime matches skip hashing entirely; otherwise the content hash decides,
+    so a `touch` without edits does not trigger re-embedding.
+    """
+    known = manifest.get("files", {})
+    unchanged, changed = [], []
+    seen = set()
+
+    for path in file_paths:
+        rel = os.path.relpath(path, docs_dir)
+        seen.add(rel)
+        st = os.stat(path)
+        entry = {"size": st.st_size, "mtime": st.st_mtime}
+        old = known.get(rel)
+
+        if old and old.get("size") == entry["size"] and old.get("mtime") == entry["mtime"]:
+            unchanged.append(rel)
+            continue
+
+        entry["sha256"] = file_digest(path)
+        if old and old.get("sha256") == entry["sha256"]:
+            # content identical, only metadata moved; refresh stat fields
+            old.update(entry)
+            unchanged.append(rel)
+            continue
+
+        changed.append((path, entry))
+
+    removed = [rel for rel in known if rel not in seen]
+    return unchanged, changed, removed
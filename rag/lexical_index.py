@@ -0,0 +1,230 @@
+# rag/lexical_index.py
+"""
+BM25 inverted index over the same chunks as the Chroma collection.
+
+Error logs are full of exact identifiers (`IndexError`, `PyArg_ParseTuple`,
+module names) that a MiniLM embedding tends to blur. The index is built next
+to the collection by create_vector_store / update_vector_store and persisted
+as `lexical_index.pkl` in the vector DB directory: postings are packed
+`array('I')` doc numbers and term frequencies, so loading it is one unpickle
+and a lookup for an exception name costs well under a millisecond.
+
+DocRetriever uses it for reciprocal-rank fusion with the vector results and
+answers identifier-only queries from it alone, without embedding the query.
+"""
+
+import os
+import re
+import math
+import heapq
+import pickle
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rag.flat_store import flat_store_dir
+
+LEXICAL_INDEX_FILE = "lexical_index.pkl"
+_FORMAT_VERSION = 1
+
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+# identifiers that almost certainly name something exactly (CamelCase, snake_case, dotted, exceptions)
+_IDENTIFIER_RE = re.compile(
+    r"^(?:[A-Za-z_][\w]*\.[\w.]+|\w*_\w+|[A-Z][a-z0-9]+[A-Z]\w*|\w+(?:Error|Exception|Warning))$"
+)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have if in into is it its not of on or that the this "
+    "to was were will with line file most recent call last traceback".split()
+)
+
+K1 = 1.2
+B = 0.75
+MAX_QUERY_TERMS = 32         # long queries (whole tracebacks) keep only their rarest terms
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased identifier/number tokens; snake_case names also yield their parts."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(text or ""):
+        low = tok.lower()
+        if low in _STOPWORDS or len(low) < 2:
+            continue
+        tokens.append(low)
+        if "_" in low.strip("_"):
+            tokens.extend(p for p in low.split("_") if len(p) > 1 and p not in _STOPWORDS)
+    return tokens
+
+
+def is_identifier_query(query: str, max_terms: int = 8) -> bool:
+    """True for short queries made mostly of exact identifiers (e.g. 'IndexError', 'np.linalg.solve')."""
+    words = [w.strip("'\"()[]{}:,;") for w in (query or "").split()]
+    words = [w for w in words if w and w.lower() not in _STOPWORDS]
+    if not words or len(words) > max_terms:
+        return False
+    strong = sum(1 for w in words if _IDENTIFIER_RE.match(w))
+    return strong * 2 >= len(words)
+
+
+class LexicalIndex:
+    def __init__(self):
+        # doc number -> id / text / metadata; removed docs leave a None tombstone
+        self.ids: List[Optional[str]] = []
+        self.texts: List[Optional[str]] = []
+        self.metadatas: List[Optional[dict]] = []
+        self.doc_len = array("I")
+        self._slot: Dict[str, int] = {}
+        # term -> (doc numbers, term frequencies)
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.total_len = 0
+        self.removed = 0
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slot
+
+    # ---------- building ----------
+    def add(self, ids: Iterable[str], texts: Iterable[str], metadatas: Optional[Iterable[dict]] = None):
+        """Upsert chunks by id (same semantics as collection.upsert)."""
+        ids, texts = list(ids), list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{}] * len(ids)
+        self.remove([i for i in ids if i in self._slot])
+        for doc_id, text, meta in zip(ids, texts, metadatas):
+            n = len(self.ids)
+            terms = tokenize(text)
+            self.ids.append(doc_id)
+            self.texts.append(text)
+            self.metadatas.append(meta or {})
+            self.doc_len.append(len(terms))
+            self.total_len += len(terms)
+            self._slot[doc_id] = n
+            counts: Dict[str, int] = {}
+            for t in terms:
+                counts[t] = counts.get(t, 0) + 1
+            for t, c in counts.items():
+                plist = self.postings.get(t)
+                if plist is None:
+                    plist = self.postings[t] = (array("I"), array("I"))
+                plist[0].append(n)
+                plist[1].append(c)
+
+    def remove(self, ids: Iterable[str]):
+        for doc_id in ids:
+            n = self._slot.pop(doc_id, None)
+            if n is None:
+                continue
+            self.ids[n] = self.texts[n] = self.metadatas[n] = None
+            self.total_len -= self.doc_len[n]
+            self.removed += 1
+        if self.removed > 1000 and self.removed > len(self._slot):
+            self.compact()
+
+    def update_metadata(self, ids: Iterable[str], metadatas: Iterable[dict]):
+        for doc_id, meta in zip(ids, metadatas):
+            n = self._slot.get(doc_id)
+            if n is not None:
+                self.metadatas[n] = meta or {}
+
+    def compact(self):
+        """Rebuild without tombstones (postings of removed docs are otherwise skipped at query time)."""
+        live = [(i, t, m) for i, t, m in zip(self.ids, self.texts, self.metadatas) if i is not None]
+        self.__init__()
+        if live:
+            ids, texts, metas = zip(*live)
+            self.add(ids, texts, metas)
+
+    # ---------- querying ----------
+    def search(self, query: str, k: int = 6) -> List[Tuple[int, float]]:
+        """Top-k (doc number, BM25 score) for `query`."""
+        n_docs = len(self._slot)
+        if not n_docs:
+            return []
+        avg_len = self.total_len / n_docs or 1.0
+        terms = {}
+        for t in tokenize(query):
+            plist = self.postings.get(t)
+            if plist is not None:
+                df = len(plist[0])
+                terms[t] = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        if len(terms) > MAX_QUERY_TERMS:
+            terms = dict(heapq.nlargest(MAX_QUERY_TERMS, terms.items(), key=lambda kv: kv[1]))
+
+        scores: Dict[int, float] = {}
+        doc_len, ids = self.doc_len, self.ids
+        for t, idf in terms.items():
+            docs, tfs = self.postings[t]
+            for n, tf in zip(docs, tfs):
+                if ids[n] is None:
+                    continue
+                norm = tf + K1 * (1 - B + B * doc_len[n] / avg_len)
+                scores[n] = scores.get(n, 0.0) + idf * tf * (K1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+
+    def document(self, n: int) -> Tuple[str, str, dict]:
+        return self.ids[n], self.texts[n], self.metadatas[n]
+
+    # ---------- persistence ----------
+    def save(self, path: str):
+        if self.removed:
+            self.compact()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump({
+                "version": _FORMAT_VERSION,
+                "ids": self.ids,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "doc_len": self.doc_len,
+                "postings": self.postings,
+                "total_len": self.total_len,
+            }, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["LexicalIndex"]:
+        """The index at `path`, or None if it is missing or in an older format."""
+        try:
+            with open(path, "rb") as fh:
+                data = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if data.get("version") != _FORMAT_VERSION:
+            return None
+        index = cls()
+        index.ids = data["ids"]
+        index.texts = data["texts"]
+        index.metadatas = data["metadatas"]
+        index.doc_len = data["doc_len"]
+        index.postings = data["postings"]
+        index.total_len = data["total_len"]
+        index._slot = {doc_id: n for n, doc_id in enumerate(index.ids) if doc_id is not None}
+        return index
+
+    @classmethod
+    def from_collection(cls, collection, page_size: int = 1000) -> "LexicalIndex":
+        """Rebuild from everything stored in a Chroma collection."""
+        index = cls()
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            index.add(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+        return index
+
+
+def lexical_index_path(persist_dir: str, collection_name: str = "autodoc", backend: str = "chroma") -> str:
+    """
+    Where the BM25 index of this backend's collection lives, next to its
+    manifest (see rag.vector_store.manifest_path_for): one per store, so
+    building one never rebuilds or edits another's.
+    """
+    if backend == "flat":
+        return os.path.join(flat_store_dir(persist_dir, collection_name), LEXICAL_INDEX_FILE)
+    # the default chroma collection keeps the original location
+    if collection_name == "autodoc":
+        return os.path.join(persist_dir, LEXICAL_INDEX_FILE)
+    stem, ext = os.path.splitext(LEXICAL_INDEX_FILE)
+    return os.path.join(persist_dir, f"{stem}-{collection_name}{ext}")
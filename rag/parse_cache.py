@@ -0,0 +1,81 @@
+# rag/parse_cache.py
+"""
+On-disk cache of extracted PDF text.
+
+PyPDFLoader is the slowest part of building the index, and changing
+CHUNK_SIZE / CHUNK_OVERLAP or the splitter used to mean parsing every PDF
+again. The pages' text and metadata are cached instead, one gzip'd JSON file
+per source under PARSE_CACHE_DIR, keyed by the file's sha256 and the parser
+version. Entries are only opened when that file is loaded, so re-splitting
+a corpus costs a hash and a decompress per file. Writes are atomic
+(temp file + os.replace), so parser processes can fill the cache
+concurrently.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+from typing import Callable, List, Optional
+
+from langchain.schema import Document
+
+from config import PARSE_CACHE_ENABLED, PARSE_CACHE_DIR
+from rag.index_manifest import file_digest
+
+# bump when the extraction or what is stored changes
+PARSE_CACHE_FORMAT = 1
+
+
+def parser_version(name: str) -> str:
+    """`name` plus the installed version of its package, e.g. "pypdf-4.2.0"."""
+    try:
+        from importlib.metadata import version
+        return f"{name}-{version(name)}"
+    except Exception:
+        return name
+
+
+def _entry_path(cache_dir: str, digest: str, parser: str) -> str:
+    tag = hashlib.sha1(f"{parser}\x00{PARSE_CACHE_FORMAT}".encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, digest[:2], f"{digest}-{tag}.json.gz")
+
+
+def _read(path: str, source: str) -> Optional[List[Document]]:
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, EOFError, ValueError):
+        return None
+    # the same content may have been cached under another path
+    return [Document(page_content=p["text"], metadata=dict(p["metadata"], source=source)) for p in data["pages"]]
+
+
+def _write(path: str, parser: str, docs: List[Document]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    payload = {"parser": parser, "pages": [{"text": d.page_content, "metadata": d.metadata or {}} for d in docs]}
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as fh:
+        json.dump(payload, fh, ensure_ascii=False, default=str)
+    os.replace(tmp, path)
+
+
+def load_cached(file_path: str, parse: Callable[[], List[Document]], parser: str,
+                cache_dir: Optional[str] = None) -> List[Document]:
+    """
+    `parse()`'s documents for `file_path`, from the cache when this content
+    was already parsed by the same parser version.
+    """
+    if not PARSE_CACHE_ENABLED:
+        return parse()
+    path = _entry_path(cache_dir or PARSE_CACHE_DIR, file_digest(file_path), parser)
+    if os.path.exists(path):
+        docs = _read(path, file_path)
+        if docs is not None:
+            return docs
+    docs = parse()
+    try:
+        _write(path, parser, docs)
+    except OSError as e:
+        print(f"⚠️ Could not write parse cache entry for {file_path}: {e}")
+    return docs
@@ -0,0 +1,218 @@
+# rag/retrieval_service.py
+"""
+Shared retrieval daemon and its client.
+
+Every process that runs the pipeline (Streamlit sessions, CLI runs, batch
+workers) would otherwise load its own MiniLM model and open the vector store
+itself. `RetrievalService` holds one DocRetriever behind a small HTTP server
+on localhost; concurrent queries are embedded in micro-batches (up to
+RETRIEVAL_SERVICE_MAX_BATCH queries, waiting at most
+RETRIEVAL_SERVICE_BATCH_WAIT_MS for a batch to fill).
+
+    python Scripts/retrieval_service.py --port 8765
+    RETRIEVAL_SERVICE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Endpoints (JSON):
+  POST /retrieve  {"query", "k"?} -> {"docs": [text, ...], "path", "index_version"}
+  GET  /health                    -> {"ok", "pid", "index_version"}
+  GET  /stats                     -> batching and cache counters
+
+`RetrievalClient.retrieve()` returns None whenever the service cannot be
+reached, and RetrieverAgent then retrieves in-process; after a failure the
+service is not tried again for `retry_after` seconds.
+"""
+
+import os
+import json
+import time
+import queue
+import hashlib
+import threading
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+from utils import LRUCache
+from config import (RETRIEVAL_SERVICE_HOST, RETRIEVAL_SERVICE_PORT, RETRIEVAL_SERVICE_MAX_BATCH, RETRIEVAL_SERVICE_BATCH_WAIT_MS, RETRIEVAL_SERVICE_TIMEOUT,
+                    RETRIEVAL_RESULT_CACHE_SIZE, RETRIEVAL_EMBED_CACHE_SIZE)
+
+
+# ---------- server side ----------
+class _EmbedBatcher:
+    """Collects concurrent embed requests and runs them through `embed_many` together."""
+
+    def __init__(self, embed_many: Callable[[List[str]], List[List[float]]],
+                 max_batch: int = RETRIEVAL_SERVICE_MAX_BATCH, max_wait_ms: float = RETRIEVAL_SERVICE_BATCH_WAIT_MS):
+        self.embed_many = embed_many
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        self.largest_batch = 0
+        threading.Thread(target=self._loop, name="embed-batcher", daemon=True).start()
+
+    def embed(self, text: str) -> List[float]:
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut.result()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                vectors = self.embed_many([text for text, _ in batch])
+                for (_, fut), vec in zip(batch, vectors):
+                    fut.set_result(vec)
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+            self.batches += 1
+            self.queries += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self) -> dict:
+        return {"batches": self.batches, "queries": self.queries, "largest_batch": self.largest_batch,
+                "mean_batch": round(self.queries / self.batches, 2) if self.batches else 0.0}
+
+
+class RetrievalService:
+    """One DocRetriever shared by every client process."""
+
+    def __init__(self, retriever, max_batch: int = RETRIEVAL_SERVICE_MAX_BATCH,
+                 max_wait_ms: float = RETRIEVAL_SERVICE_BATCH_WAIT_MS):
+        self.retriever = retriever
+        self.batcher = _EmbedBatcher(retriever.embed_queries, max_batch, max_wait_ms)
+        self._embeddings = LRUCache(RETRIEVAL_EMBED_CACHE_SIZE)
+        self._results = LRUCache(RETRIEVAL_RESULT_CACHE_SIZE)
+        self._index_version = None
+        self._search_lock = threading.Lock()
+
+    def retrieve(self, query: str, k: Optional[int] = None) -> dict:
+        k = k or self.retriever.k
+        version = self.retriever.index_version()
+        if version != self._index_version:
+            self._results.clear()
+            self._index_version = version
+        qkey = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        rkey = (qkey, k, version)
+        hit = self._results.get(rkey)
+        if hit is not None:
+            return {"docs": list(hit[1]), "path": hit[0], "index_version": version, "cached": True}
+
+        docs = self.retriever.lexical_only(query, k)
+        path = "lexical"
+        if docs is None:
+            vector = self._embeddings.get(qkey)
+            if vector is None:
+                vector = self.batcher.embed(query)
+                self._embeddings.put(qkey, vector)
+            # vector search is fast next to embedding; the Chroma client is not shared across threads
+            with self._search_lock:
+                docs = self.retriever.search_hybrid(query, vector, k)
+            path = "hybrid"
+        texts = tuple(d.page_content for d in docs)
+        self._results.put(rkey, (path, texts))
+        return {"docs": list(texts), "path": path, "index_version": version, "cached": False}
+
+    def stats(self) -> dict:
+        return {"batching": self.batcher.stats(),
+                "cache": {"embeddings": self._embeddings.stats(), "results": self._results.stats()}}
+
+    def handler(self):
+        service = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, {"ok": True, "pid": os.getpid(),
+                                      "index_version": service.retriever.index_version()})
+                elif self.path == "/stats":
+                    self._reply(200, service.stats())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/retrieve":
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    req = json.loads(self.rfile.read(length) or b"{}")
+                    query = req["query"]
+                except (ValueError, KeyError) as e:
+                    self._reply(400, {"error": f"bad request: {e}"})
+                    return
+                try:
+                    self._reply(200, service.retrieve(query, req.get("k")))
+                except Exception as e:
+                    self._reply(500, {"error": repr(e)})
+
+            def log_message(self, format, *args):
+                pass   # one line per query would drown the service's own output
+
+        return _Handler
+
+
+def serve(host: str = RETRIEVAL_SERVICE_HOST, port: int = RETRIEVAL_SERVICE_PORT, retriever=None):
+    """Load the retriever once and serve it until interrupted."""
+    if retriever is None:
+        import registry
+        retriever = registry.get("retriever")
+    retriever.embed_queries(["warm-up"])   # load the model before accepting queries
+    service = RetrievalService(retriever)
+    server = ThreadingHTTPServer((host, port), service.handler())
+    server.daemon_threads = True
+    print(f"Retrieval service listening on http://{host}:{port} "
+          f"(micro-batches of up to {service.batcher.max_batch}, {RETRIEVAL_SERVICE_BATCH_WAIT_MS}ms window)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Stopped. {json.dumps(service.stats())}")
+
+
+# ---------- client side ----------
+class RetrievalClient:
+    def __init__(self, url: str, timeout: float = RETRIEVAL_SERVICE_TIMEOUT, retry_after: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._down_until = 0.0
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def retrieve(self, query: str, k: Optional[int] = None) -> Optional[List[str]]:
+        """Doc texts from the service, or None if it is unreachable or failed."""
+        if not self.available():
+            return None
+        body = json.dumps({"query": query, "k": k}).encode("utf-8")
+        req = urllib.request.Request(self.url + "/retrieve", data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())["docs"]
+        except (OSError, ValueError, KeyError) as e:
+            # URLError / refused / timeout / bad payload: use in-process retrieval for a while
+            if self._down_until == 0.0 or self.available():
+                print(f"⚠️ Retrieval service at {self.url} unavailable ({e}); retrieving in-process.")
+            self._down_until = time.monotonic() + self.retry_after
+            return None
@@ -1,8 +1,117 @@
-from rag.vector_store import load_langchain_vectorstore
-from config import TOP_K_RESULTS
+import os
+import hashlib
+import threading
+from typing import List, Optional
 
-def get_retriever():
-    vectordb = load_langchain_vectorstore()
-    retriever = vectordb.as_retriever(search_kwargs={"k": TOP_K_RESULTS})
-    return retriever
+from langchain.schema import Document
+from rag.index_manifest import read_index_version
+from rag.lexical_index import LexicalIndex, lexical_index_path, is_identifier_query
+from config import TOP_K_RESULTS, VECTOR_DB_PATH, HYBRID_RETRIEVAL, LEXICAL_FAST_PATH, RRF_K, VECTOR_BACKEND
+
+
+class DocRetriever:
+    """
+    Retriever over the vector store (LangChain Chroma, or rag.flat_store with
+    VECTOR_BACKEND=flat) that exposes query embedding and
+    vector search as separate steps, so callers (RetrieverAgent) can cache them.
+    When the BM25 index built next to the collection (`collection_name` in
+    `backend`) is present, results are fused with lexical hits, and
+    identifier-only queries are answered from it without embedding the query
+    (`lexical_only`).
+    Keeps the `get_relevant_documents()` interface of a LangChain retriever.
+    """
+
+    def __init__(self, vectordb, k: int = TOP_K_RESULTS, persist_directory: Optional[str] = None,
+                 hybrid: bool = HYBRID_RETRIEVAL, lexical_fast_path: bool = LEXICAL_FAST_PATH,
+                 collection_name: str = "autodoc", backend: Optional[str] = None):
+        self.vectordb = vectordb
+        self.k = k
+        self.persist_directory = persist_directory or VECTOR_DB_PATH
+        self.collection_name = collection_name
+        self.backend = backend or VECTOR_BACKEND
+        self.hybrid = hybrid
+        self.lexical_fast_path = lexical_fast_path
+        self._lexical = None
+        self._lexical_version = None
+        self._lexical_lock = threading.Lock()
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.vectordb.embeddings.embed_query(query)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embeddings for several queries in one model call (rag/retrieval_service.py micro-batches)."""
+        embeddings = self.vectordb.embeddings
+        if hasattr(embeddings, "embed_documents"):
+            return embeddings.embed_documents(list(queries))
+        return [embeddings.embed_query(q) for q in queries]
+
+    def search_by_vector(self, vector: List[float], k: Optional[int] = None) -> List[Document]:
+        return self.vectordb.similarity_search_by_vector(vector, k=k or self.k)
+
+    def index_version(self) -> str:
+        return read_index_version(self.persist_directory)
 
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        """The persisted BM25 index, reloaded when the index version changes; None if absent."""
+        if not self.hybrid:
+            return None
+        version = self.index_version()
+        with self._lexical_lock:
+            if version != self._lexical_version:
+                path = lexical_index_path(self.persist_directory, self.collection_name, self.backend)
+                self._lexical = LexicalIndex.load(path) if os.path.exists(path) else None
+                self._lexical_version = version
+            return self._lexical
+
+    def _lexical_search(self, query: str, k: int) -> List[Document]:
+        index = self.lexical_index()
+        if index is None:
+            return []
+        docs = []
+        for n, score in index.search(query, k):
+            _, text, meta = index.document(n)
+            docs.append(Document(page_content=text, metadata=dict(meta or {}, bm25=score)))
+        return docs
+
+    def lexical_only(self, query: str, k: Optional[int] = None) -> Optional[List[Document]]:
+        """Answer identifier-dominated queries from the BM25 index alone; None means use the hybrid path."""
+        if not self.lexical_fast_path or not is_identifier_query(query):
+            return None
+        docs = self._lexical_search(query, k or self.k)
+        return docs or None
+
+    def search_hybrid(self, query: str, vector: List[float], k: Optional[int] = None) -> List[Document]:
+        """Reciprocal-rank fusion of vector and BM25 results (plain vector search without an index)."""
+        k = k or self.k
+        vector_docs = self.search_by_vector(vector, 2 * k)
+        lexical_docs = self._lexical_search(query, 2 * k)
+        if not lexical_docs:
+            return vector_docs[:k]
+
+        scores, by_key = {}, {}
+        for ranked in (vector_docs, lexical_docs):
+            for rank, doc in enumerate(ranked):
+                key = hashlib.sha1(doc.page_content.encode("utf-8")).digest()
+                scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+                by_key.setdefault(key, doc)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [by_key[key] for key in best]
+
+    def get_relevant_documents(self, query: str) -> List[Document]:
+        docs = self.lexical_only(query)
+        if docs is not None:
+            return docs
+        return self.search_hybrid(query, self.embed_query(query))
+
+
+def get_retriever(backend: Optional[str] = None):
+    backend = backend or VECTOR_BACKEND
+    if backend == "flat":
+        # no Chroma client or LangChain embedding wrapper: just an mmap of the matrix
+        from rag.flat_store import load_flat_vectorstore
+        vectordb = load_flat_vectorstore()
+    else:
+        from rag.vector_store import load_langchain_vectorstore
+        vectordb = load_langchain_vectorstore()
+    retriever = DocRetriever(vectordb, k=TOP_K_RESULTS, backend=backend)
+    return retriever
@@ -1,9 +1,9 @@
 # rag/vector_store.py
 
 import os
-import math
 import time
-from typing import List, Optional
+from itertools import chain, islice
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -11,7 +11,15 @@ import chromadb
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
-from config import VECTOR_DB_PATH, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
+from config import (VECTOR_DB_PATH, DOCS_PATH, INDEX_MANIFEST_PATH, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, VECTOR_BACKEND,
+                    EMBEDDING_WORKERS, DEDUP_ENABLED)
+from rag.index_manifest import MANIFEST_VERSION, make_chunk_ids, load_manifest, save_manifest, scan_changes
+from rag.index_manifest import INDEX_VERSION_FILE, bump_index_version, read_index_version  # noqa: F401 (re-exported)
+from rag.document_loader import list_document_files, iter_parsed_files
+from rag.lexical_index import LexicalIndex, lexical_index_path
+from rag.flat_store import FlatCollection, flat_store_dir
+from rag.embedding_pool import EmbeddingPool
+from rag.dedup import NearDuplicateFilter
 
 try:
     import torch
@@ -32,19 +40,17 @@ def _ensure_client(persist_dir: str) -> chromadb.Client:
     return client
 
 
-def create_vector_store(
-    documents: List[Document],
-    collection_name: str = "autodoc",
-    persist_directory: Optional[str] = None,
-    batch_size: Optional[int] = None,
-):
-    if persist_directory is None:
-        persist_directory = VECTOR_DB_PATH
+def _get_or_create_collection(client, collection_name: str):
+    try:
+        collection = client.get_collection(collection_name)
+        print(f"Collection '{collection_name}' exists — will upsert into it.")
+    except Exception:
+        collection = client.create_collection(collection_name)
+        print(f"Created new collection '{collection_name}'")
+    return collection
 
-    if not documents:
-        raise ValueError("No documents provided to create_vector_store().")
 
-    bs = int(batch_size or EMBEDDING_BATCH_SIZE or 32)
+def _load_embedding_model(bs: int) -> SentenceTransformer:
     device = _get_device()
     print(f"Embedding model: {EMBEDDING_MODEL}    device: {device}    batch_size: {bs}")
 
@@ -53,32 +59,79 @@ def create_vector_store(
         model = model.to(device)
     except Exception:
         print("Warning: model.to(device) failed; continuing on CPU.")
-        device = "cpu"
+    return model
 
-    texts = [d.page_content for d in documents]
-    metadatas = [d.metadata if hasattr(d, "metadata") else {} for d in documents]
-    ids = [str(i) for i in range(len(texts))]
 
-    client = _ensure_client(persist_directory)
+def _load_encoder(bs: int, workers: Optional[int] = None):
+    """
+    (encoder, chunks per encode() call): the model in this process, or an
+    EmbeddingPool of `workers` processes (default EMBEDDING_WORKERS) on CPU.
+    """
+    workers = EMBEDDING_WORKERS if workers is None else workers
+    if workers != 1 and _get_device() == "cpu":
+        pool = EmbeddingPool(workers)
+        return pool, pool.group_size
+    return _load_embedding_model(bs), bs
 
-    try:
-        collection = client.get_collection(collection_name)
-        print(f"Collection '{collection_name}' exists — will upsert into it.")
-    except Exception:
-        collection = client.create_collection(collection_name)
-        print(f"Created new collection '{collection_name}'")
 
-    total = len(texts)
-    n_batches = math.ceil(total / bs)
-    print(f"Total chunks: {total}  — encoding in {n_batches} batches of up to {bs}")
+def _close_encoder(model):
+    if isinstance(model, EmbeddingPool):
+        print("Embedding throughput per worker:")
+        model.report()
+        model.close()
+
+
+def _open_collection(persist_dir: str, collection_name: str, backend: str, reset: bool = False):
+    """Chroma collection or FlatCollection for `backend`; `reset` starts it empty."""
+    if backend == "flat":
+        collection = FlatCollection(flat_store_dir(persist_dir, collection_name))
+        print(f"Using flat vector store at {collection.path} ({collection.count()} chunk(s))")
+        if reset:
+            collection.reset()
+        return collection
+    if backend != "chroma":
+        raise ValueError(f"Unknown VECTOR_BACKEND '{backend}' (expected 'chroma' or 'flat')")
+    client = _ensure_client(persist_dir)
+    if reset:
+        try:
+            client.delete_collection(collection_name)
+            print(f"Reset collection '{collection_name}'.")
+        except Exception:
+            pass
+    return _get_or_create_collection(client, collection_name)
+
+
+def _open_lexical_index(collection, path: str) -> LexicalIndex:
+    """The persisted BM25 index at `path`, rebuilt from the collection if missing or out of sync."""
+    index = LexicalIndex.load(path)
+    count = collection.count()
+    if index is None or len(index) != count:
+        print(f"Rebuilding lexical index from {count} stored chunk(s) ...")
+        index = LexicalIndex.from_collection(collection)
+    return index
+
+
+def _embed_and_upsert(collection, model, documents: Iterable[Document], bs: int,
+                      lexical: Optional[LexicalIndex] = None) -> List[str]:
+    """
+    Consume `documents` lazily in batches of `bs`, embedding and upserting each
+    batch before pulling the next, so a streaming loader keeps parsing while we
+    embed. Chunks are also added to `lexical` when given. Returns the ids of
+    everything inserted.
+    """
+    documents = iter(documents)
+    all_ids: List[str] = []
+    seen: Dict[str, int] = {}
 
     start_time = time.time()
-    for i in range(n_batches):
-        s = i * bs
-        e = min(total, (i + 1) * bs)
-        batch_texts = texts[s:e]
-        batch_ids = ids[s:e]
-        batch_meta = metadatas[s:e]
+    i = 0
+    while True:
+        batch = list(islice(documents, bs))
+        if not batch:
+            break
+        batch_texts = [d.page_content for d in batch]
+        batch_meta = [d.metadata if hasattr(d, "metadata") else {} for d in batch]
+        batch_ids = make_chunk_ids(batch, seen)
 
         embeddings = model.encode(
             batch_texts,
@@ -87,24 +140,260 @@ def create_vector_store(
             convert_to_numpy=True,
         )
         if not isinstance(embeddings, np.ndarray):
-            embeddings = np.array(embeddings)
-        emb_list = embeddings.tolist()
+            embeddings = np.asarray(embeddings, dtype=np.float32)
 
-        collection.add(
+        collection.upsert(
             ids=batch_ids,
             documents=batch_texts,
             metadatas=batch_meta,
-            embeddings=emb_list,
+            # the flat store takes the ndarray as is; Chroma wants nested lists
+            embeddings=embeddings if getattr(collection, "accepts_numpy", False) else embeddings.tolist(),
         )
+        if lexical is not None:
+            lexical.add(batch_ids, batch_texts, batch_meta)
 
-        if (i + 1) % 5 == 0 or i == n_batches - 1:
+        s = len(all_ids)
+        all_ids.extend(batch_ids)
+        i += 1
+        if i % 5 == 0:
             elapsed = time.time() - start_time
-            print(f"  Batch {i+1}/{n_batches} inserted (items {s}:{e}). elapsed: {elapsed:.1f}s")
+            print(f"  Batch {i} inserted (items {s}:{len(all_ids)}). elapsed: {elapsed:.1f}s")
+
+    return all_ids
+
+
+def _record_merged_sources(collection, lexical: LexicalIndex, ids: List[str], dedup: NearDuplicateFilter):
+    """Write the provenance of dropped near-duplicates onto the chunks that absorbed them."""
+    merged = dedup.merged_metadata()
+    if merged:
+        merged_ids = [ids[j] for j in merged]
+        collection.update(ids=merged_ids, metadatas=list(merged.values()))
+        lexical.update_metadata(merged_ids, merged.values())
+
+
+def manifest_path_for(persist_dir: str, collection_name: str, backend: str) -> str:
+    """
+    Where the incremental-build manifest of this backend's collection lives
+    (INDEX_MANIFEST_PATH overrides it). Each store keeps its own, so building
+    one backend never makes another look up to date.
+    """
+    if INDEX_MANIFEST_PATH:
+        return INDEX_MANIFEST_PATH
+    if backend == "flat":
+        return os.path.join(flat_store_dir(persist_dir, collection_name), "index_manifest.json")
+    # the default chroma collection keeps the original location, so existing manifests stay valid
+    name = "index_manifest.json" if collection_name == "autodoc" else f"index_manifest-{collection_name}.json"
+    return os.path.join(persist_dir, name)
+
+
+def _sources_of(documents: Iterable[Document], sources: List[str]) -> Iterator[Document]:
+    """Pass `documents` through, appending each one's source to `sources`."""
+    for d in documents:
+        sources.append(str((d.metadata or {}).get("source", "")))
+        yield d
+
+
+def _purge_unlisted(collection, lexical: LexicalIndex, manifest_path: str, ids: List[str]):
+    """Delete chunks the previous manifest lists but this full build did not produce (e.g. of removed files)."""
+    current = set(ids)
+    stale = [i for entry in load_manifest(manifest_path)["files"].values()
+             for i in entry.get("chunk_ids", []) if i not in current]
+    if stale:
+        collection.delete(ids=stale)
+        lexical.remove(stale)
+        print(f"Purged {len(stale)} stale chunk(s) listed in the previous manifest")
+
+
+def _write_full_build_manifest(docs_dir: str, manifest_path: str, ids: List[str], sources: List[str],
+                               parsed: set):
+    """
+    Manifest for a full build, so the next --incremental run starts from it.
+    Files that produced no chunks (parse errors, empty files) are left out and
+    get retried by the incremental build.
+    """
+    ids_by_source: Dict[str, List[str]] = {}
+    for chunk_id, source in zip(ids, sources):
+        ids_by_source.setdefault(source, []).append(chunk_id)
+    files = [p for p in list_document_files(docs_dir) if p in parsed]
+    manifest = {"version": MANIFEST_VERSION, "files": {}}
+    _, entries, _ = scan_changes(docs_dir, files, manifest)
+    for path, entry in entries:
+        entry["chunk_ids"] = ids_by_source.get(path, [])
+        manifest["files"][os.path.relpath(path, docs_dir)] = entry
+    save_manifest(manifest, manifest_path)
+    print(f"Wrote index manifest for {len(entries)} file(s) to {manifest_path}")
+
+
+def create_vector_store(
+    documents: Iterable[Document],
+    collection_name: str = "autodoc",
+    persist_directory: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    backend: Optional[str] = None,
+    embed_workers: Optional[int] = None,
+    docs_dir: Optional[str] = None,
+    manifest_path: Optional[str] = None,
+):
+    """
+    Embed and upsert `documents` into the collection. Accepts a list or any
+    iterable (e.g. rag.document_loader.iter_document_chunks) — iterables are
+    consumed batch by batch, so peak memory does not grow with corpus size.
+    `backend` ("chroma" / "flat") defaults to VECTOR_BACKEND; `embed_workers`
+    (default EMBEDDING_WORKERS) != 1 encodes in a process pool. With
+    `docs_dir` (where `documents` came from) the index manifest is written
+    too, so a later update_vector_store() only re-embeds what changed.
+    """
+    if persist_directory is None:
+        persist_directory = VECTOR_DB_PATH
+
+    documents = iter(documents)
+    first = next(documents, None)
+    if first is None:
+        raise ValueError("No documents provided to create_vector_store().")
+
+    bs = int(batch_size or EMBEDDING_BATCH_SIZE or 32)
+    model, group = _load_encoder(bs, embed_workers)
+
+    backend = backend or VECTOR_BACKEND
+    manifest_path = manifest_path or manifest_path_for(persist_directory, collection_name, backend)
+    lexical_path = lexical_index_path(persist_directory, collection_name, backend)
+    collection = _open_collection(persist_directory, collection_name, backend)
+    lexical = _open_lexical_index(collection, lexical_path)
+
+    start_time = time.time()
+    chunks = chain([first], documents)
+    parsed_sources: List[str] = []   # every chunk's source, before dedup
+    kept_sources: List[str] = []     # the source of each upserted chunk, in id order
+    if docs_dir is not None:
+        chunks = _sources_of(chunks, parsed_sources)
+    # with a manifest, deduplicate within each file only (as update_vector_store does): a chunk
+    # dropped in favour of another file's would be lost once that file changes on its own
+    dedup = NearDuplicateFilter(per_source=docs_dir is not None) if DEDUP_ENABLED else None
+    if dedup is not None:
+        chunks = dedup.filter(chunks)
+    if docs_dir is not None:
+        chunks = _sources_of(chunks, kept_sources)
+    try:
+        # ids are content-derived: re-running the build upserts instead of colliding
+        ids = _embed_and_upsert(collection, model, chunks, group, lexical)
+    finally:
+        _close_encoder(model)
+    if dedup is not None:
+        _record_merged_sources(collection, lexical, ids, dedup)
+        print(dedup.summary())
+    total = len(ids)
+    if docs_dir is not None:
+        _purge_unlisted(collection, lexical, manifest_path, ids)
+    if backend == "flat":
+        collection.persist()
+    lexical.save(lexical_path)
+    if docs_dir is not None:
+        _write_full_build_manifest(docs_dir, manifest_path, ids, kept_sources,
+                                   set(parsed_sources))
+    bump_index_version(persist_directory)
 
     total_time = time.time() - start_time
     print(f"✅ Done. Indexed {total} chunks into collection '{collection_name}' in {total_time:.1f}s")
 
-    return client.get_collection(collection_name)
+    return collection
+
+
+def update_vector_store(
+    docs_dir: Optional[str] = None,
+    collection_name: str = "autodoc",
+    persist_directory: Optional[str] = None,
+    manifest_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    backend: Optional[str] = None,
+    embed_workers: Optional[int] = None,
+):
+    """
+    Incremental build: only files whose content changed since the last run are
+    re-split and re-embedded. Their previous chunks are deleted before the new
+    ones are upserted, and chunks of files removed from `docs_dir` are purged.
+    """
+    docs_dir = docs_dir or DOCS_PATH
+    persist_directory = persist_directory or VECTOR_DB_PATH
+    backend = backend or VECTOR_BACKEND
+    manifest_path = manifest_path or manifest_path_for(persist_directory, collection_name, backend)
+    if not os.path.isdir(docs_dir):
+        raise FileNotFoundError(f"Documents path does not exist: {docs_dir}")
+
+    manifest = load_manifest(manifest_path)
+    known = manifest["files"]
+
+    # no manifest: the collection may hold legacy positional ids we cannot map
+    # back to files, so start from an empty collection.
+    if not known:
+        print("No manifest found — starting from an empty collection.")
+    collection = _open_collection(persist_directory, collection_name, backend, reset=not known)
+    # the flat store is only written by persist(), so the manifest must not run ahead of it
+    durable = backend != "flat"
+    lexical_path = lexical_index_path(persist_directory, collection_name, backend)
+    lexical = _open_lexical_index(collection, lexical_path)
+
+    unchanged, changed, removed = scan_changes(docs_dir, list_document_files(docs_dir), manifest)
+    print(f"Manifest: {len(unchanged)} unchanged, {len(changed)} new/changed, {len(removed)} removed file(s)")
+
+    for rel in removed:
+        old_ids = known.pop(rel).get("chunk_ids", [])
+        if old_ids:
+            collection.delete(ids=old_ids)
+            lexical.remove(old_ids)
+        print(f"Purged {len(old_ids)} chunk(s) of removed file: {rel}")
+
+    model, group = None, None
+    bs = int(batch_size or EMBEDDING_BATCH_SIZE or 32)
+    entries = {path: entry for path, entry in changed}
+    start_time = time.time()
+    total = 0
+    try:
+        # changed files are parsed in the process pool while earlier ones are embedded
+        for path, chunks, _, elapsed, error in iter_parsed_files(list(entries), workers):
+            rel = os.path.relpath(path, docs_dir)
+            if error:
+                print(f"⚠️ Error processing {path}: {error}. Skipping (previous chunks kept).")
+                continue
+
+            old_ids = known.get(rel, {}).get("chunk_ids", [])
+            if old_ids:
+                collection.delete(ids=old_ids)
+                lexical.remove(old_ids)
+
+            ids: List[str] = []
+            if chunks:
+                if model is None:
+                    model, group = _load_encoder(bs, embed_workers)
+                # deduplicated within the file only: a file's chunks must not depend on other files
+                # that may later change or be removed on their own
+                dedup = NearDuplicateFilter() if DEDUP_ENABLED else None
+                ids = _embed_and_upsert(collection, model, dedup.filter(chunks) if dedup else chunks, group, lexical)
+                if dedup is not None:
+                    _record_merged_sources(collection, lexical, ids, dedup)
+                total += len(ids)
+            print(f"Re-indexed {rel}: {len(old_ids)} old -> {len(ids)} new chunk(s) (parsed in {elapsed:.2f}s)")
+
+            entry = entries[path]
+            entry["chunk_ids"] = ids
+            known[rel] = entry
+            if durable:
+                # persist after every file so an interrupted refresh resumes where it stopped
+                save_manifest(manifest, manifest_path)
+    finally:
+        if model is not None:
+            _close_encoder(model)
+
+    if not durable:
+        collection.persist()
+    save_manifest(manifest, manifest_path)
+    # saved once at the end; an interrupted run is detected (count mismatch) and rebuilt next time
+    lexical.save(lexical_path)
+    if changed or removed:
+        bump_index_version(persist_directory)
+    total_time = time.time() - start_time
+    print(f"✅ Done. Incremental update embedded {total} chunks into '{collection_name}' in {total_time:.1f}s")
+    return collection
 
 
 def load_vector_store(collection_name: str = "autodoc", persist_directory: Optional[str] = None):
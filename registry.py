@@ -0,0 +1,129 @@
+# registry.py
+"""
+Process-wide registry of lazily constructed agents and RAG components.
+
+Nothing heavy happens at import time: the embedding model, the Chroma client
+and the LLM clients are built the first time `get(name)` asks for them and
+then shared by every pipeline in the process. Servers and UIs can call
+`warm_up()` at startup to pay that cost before the first job; tests and
+benchmarks can swap in stand-ins with `set_instance()`.
+"""
+
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def _make_retriever():
+    from rag.retriever import get_retriever
+    return get_retriever()
+
+
+def _make_retriever_agent():
+    from agents.retriever_agent import RetrieverAgent
+    from config import RETRIEVAL_SERVICE_URL
+    if RETRIEVAL_SERVICE_URL:
+        # the service holds the model; load it here only if the service goes away
+        from rag.retrieval_service import RetrievalClient
+        return RetrieverAgent(client=RetrievalClient(RETRIEVAL_SERVICE_URL),
+                              retriever_factory=lambda: get("retriever"))
+    return RetrieverAgent(get("retriever"))
+
+
+def _make_root_cause_agent():
+    from agents.root_cause_agent import RootCauseAgent
+    return RootCauseAgent()
+
+
+def _make_patch_generator_agent():
+    from agents.patch_generator_agent import PatchGeneratorAgent
+    return PatchGeneratorAgent()
+
+
+def _make_execution_agent():
+    from agents.execution_agent import ExecutionAgent
+    return ExecutionAgent()
+
+
+def _make_validator_agent():
+    from agents.validator_agent import ValidatorAgent
+    return ValidatorAgent()
+
+
+def _make_fix_memory():
+    from agents.fix_memory import get_fix_memory
+    return get_fix_memory()
+
+
+_factories: Dict[str, Callable[[], Any]] = {
+    "retriever": _make_retriever,
+    "retriever_agent": _make_retriever_agent,
+    "root_cause_agent": _make_root_cause_agent,
+    "patch_generator_agent": _make_patch_generator_agent,
+    "execution_agent": _make_execution_agent,
+    "validator_agent": _make_validator_agent,
+    "fix_memory": _make_fix_memory,
+}
+# what the pipeline touches directly; "retriever" is built through retriever_agent
+PIPELINE_COMPONENTS = ("retriever_agent", "root_cause_agent", "patch_generator_agent",
+                       "execution_agent", "validator_agent", "fix_memory")
+_instances: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _lock_for(name: str) -> threading.Lock:
+    with _registry_lock:
+        return _locks.setdefault(name, threading.Lock())
+
+
+def register(name: str, factory: Callable[[], Any]):
+    """Register (or replace) the factory for `name`; drops any built instance."""
+    with _registry_lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name: str) -> Any:
+    """Return the shared instance for `name`, building it on first use."""
+    inst = _instances.get(name)
+    if inst is not None:
+        return inst
+    if name not in _factories:
+        raise KeyError(f"Unknown component '{name}'")
+    # per-name lock: a slow model load does not block unrelated components
+    with _lock_for(name):
+        inst = _instances.get(name)
+        if inst is None:
+            inst = _factories[name]()
+            _instances[name] = inst
+        return inst
+
+
+def set_instance(name: str, obj: Any):
+    """Install a ready-made instance (e.g. a stand-in model for benchmarks)."""
+    with _registry_lock:
+        _instances[name] = obj
+
+
+def is_loaded(name: str) -> bool:
+    return name in _instances
+
+
+def reset(name: Optional[str] = None):
+    """Forget built instances so the next get() rebuilds them."""
+    with _registry_lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Eagerly build components (default: the pipeline's); returns seconds spent per component."""
+    timings = {}
+    for name in (names or PIPELINE_COMPONENTS):
+        t0 = time.perf_counter()
+        get(name)
+        timings[name] = time.perf_counter() - t0
+    return timings
@@ -0,0 +1,77 @@
+# tests/test_graph_retry.py
+import pytest
+
+import graph
+import registry
+from agents.fix_memory import FixMemory
+
+ERROR_LOG = (
+    "Traceback (most recent call last):\n"
+    '  File "app.py", line 3, in main\n'
+    '    x = settings["user"]\n'
+    "KeyError: 'user'\n"
+)
+OTHER_ERROR = (
+    "Traceback (most recent call last):\n"
+    '  File "runfile.py", line 7, in <module>\n'
+    "    total = price * qty\n"
+    "TypeError: unsupported operand type(s) for *: 'NoneType' and 'int'\n"
+)
+
+
+class _Counting:
+    def __init__(self, runs, name, result):
+        self.runs, self.name, self.result = runs, name, result
+
+    def run(self, *args, **kwargs):
+        self.runs[self.name] += 1
+        return self.result
+
+    def mark_validated(self, key):
+        pass
+
+
+class _Execution:
+    def __init__(self, stderrs):
+        self.stderrs = list(stderrs)
+
+    def run(self, patch, **kwargs):
+        return {"stdout": "", "stderr": self.stderrs.pop(0), "returncode": 1}
+
+
+class _Validator:
+    def run(self, out):
+        return out["returncode"] == 0, "failed"
+
+
+@pytest.fixture
+def runs(tmp_path):
+    counts = {"retrieve": 0, "analyze": 0, "generate": 0}
+    registry.set_instance("retriever_agent", _Counting(counts, "retrieve", ["doc"]))
+    registry.set_instance("root_cause_agent", _Counting(counts, "analyze", "root cause"))
+    registry.set_instance("patch_generator_agent",
+                          _Counting(counts, "generate", {"type": "patch", "patch_text": "print(1)"}))
+    registry.set_instance("validator_agent", _Validator())
+    registry.set_instance("fix_memory", FixMemory(path=str(tmp_path / "fix_memory.db"), enabled=False))
+    yield counts
+    registry.reset()
+
+
+def _run(stderrs):
+    registry.set_instance("execution_agent", _Execution(stderrs))
+    return graph.debug_pipeline(ERROR_LOG, max_attempts=len(stderrs))
+
+
+def test_retry_that_reproduces_the_error_starts_at_generate(runs):
+    res = _run([ERROR_LOG.replace("app.py", "runfile.py")] * 3)
+    assert res["status"] == "failed"
+    assert runs == {"retrieve": 1, "analyze": 1, "generate": 3}
+    assert res["history"][0]["reused"] == []
+    assert all({"retrieve", "analyze"} <= set(e["reused"]) for e in res["history"][1:])
+
+
+def test_new_error_is_retrieved_once_then_reused(runs):
+    _run([OTHER_ERROR] * 3)
+    # attempt 2 sees a new error; attempt 3 failed the same way as attempt 2.
+    # analyze only reruns when the retrieved docs change, and the stub returns the same ones
+    assert runs == {"retrieve": 2, "analyze": 1, "generate": 3}
@@ -0,0 +1,33 @@
+# tests/test_static_check.py
+import pytest
+
+from agents.static_check import check_patch
+
+MISSING = "surely_not_an_installed_module"
+
+
+@pytest.mark.parametrize("code", [
+    f"try:\n    import {MISSING} as json\nexcept ImportError:\n    import json\n",
+    f"try:\n    import {MISSING}\nexcept ModuleNotFoundError:\n    {MISSING} = None\n",
+    f"try:\n    from {MISSING} import loads\nexcept (ValueError, ImportError):\n    from json import loads\n",
+    f"try:\n    import {MISSING}\nexcept Exception:\n    pass\n",
+    f"try:\n    import {MISSING}\nexcept:\n    pass\n",
+    f"import sys\nif sys.version_info < (3, 11):\n    import {MISSING}\nelse:\n    import tomllib\n",
+    f"def load():\n    import {MISSING}\n    return {MISSING}\n",
+])
+def test_guarded_imports_are_not_flagged(code):
+    for docker in (False, True):
+        assert check_patch(code, docker=docker)["ok"], code
+
+
+@pytest.mark.parametrize("code", [
+    f"import {MISSING}\n",
+    f"from {MISSING}.sub import thing\n",
+    f"try:\n    import {MISSING}\nexcept KeyError:\n    pass\n",
+    f"try:\n    pass\nfinally:\n    import {MISSING}\n",
+    f"class C:\n    import {MISSING}\n",
+])
+def test_unconditional_missing_imports_are_flagged(code):
+    res = check_patch(code, docker=False)
+    assert not res["ok"]
+    assert [e["kind"] for e in res["errors"]] == ["import"]
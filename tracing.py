@@ -0,0 +1,228 @@
+# tracing.py
+"""
+Per-node tracing and metrics for the agentic graph.
+
+AgenticGraph.run_one_pass opens one span per node execution (wall time,
+thread CPU time, attempt number). Agents add details to the active span via
+`annotate()` / `accumulate()` — prompt/response sizes for the LLM nodes,
+subprocess time for execution. Finished spans are attached to the attempt
+`history`, can be appended to a JSONL trace file, and feed process-wide
+Prometheus-style counters and histograms (`METRICS.prometheus_text()`).
+
+When tracing is disabled, `Tracer.span()` hands back a shared no-op context
+and `annotate()` returns after one thread-local lookup.
+"""
+
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import TRACING_ENABLED
+
+_local = threading.local()
+_accumulate_lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace_id", "name", "attempt", "start", "wall_seconds", "cpu_seconds", "attrs", "error")
+
+    def __init__(self, trace_id: str, name: str, attempt: Optional[int]):
+        self.trace_id = trace_id
+        self.name = name
+        self.attempt = attempt
+        self.start = time.time()
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.attrs: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attempt": self.attempt,
+            "start": self.start,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+        }
+        if self.attrs:
+            d["attrs"] = dict(self.attrs)
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+class _NoopContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopContext()
+
+
+def current_span() -> Optional[Span]:
+    return getattr(_local, "span", None)
+
+
+@contextmanager
+def use_span(span: Optional[Span]):
+    """Make `span` the active span in this thread (e.g. inside a worker pool)."""
+    prev = getattr(_local, "span", None)
+    _local.span = span
+    try:
+        yield span
+    finally:
+        _local.span = prev
+
+
+def annotate(**attrs):
+    """Set attributes on the active span, if any."""
+    span = getattr(_local, "span", None)
+    if span is not None:
+        span.attrs.update(attrs)
+
+
+def accumulate(key: str, value: float):
+    """Add `value` to a numeric attribute of the active span, if any."""
+    span = getattr(_local, "span", None)
+    if span is not None:
+        # worker threads may share their parent's span (see use_span)
+        with _accumulate_lock:
+            span.attrs[key] = span.attrs.get(key, 0) + value
+
+
+class Tracer:
+    def __init__(self, enabled: bool = TRACING_ENABLED, trace_id: Optional[str] = None):
+        self.enabled = enabled
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def span(self, name: str, attempt: Optional[int] = None):
+        if not self.enabled:
+            return _NOOP
+        return self._span(name, attempt)
+
+    @contextmanager
+    def _span(self, name: str, attempt: Optional[int]):
+        span = Span(self.trace_id, name, attempt)
+        prev = getattr(_local, "span", None)
+        _local.span = span
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.wall_seconds = time.perf_counter() - w0
+            span.cpu_seconds = time.thread_time() - c0
+            _local.span = prev
+            with self._lock:
+                self.spans.append(span)
+            METRICS.observe_span(span)
+
+    def spans_for_attempt(self, attempt: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [s.to_dict() for s in self.spans if s.attempt == attempt]
+
+    def export_jsonl(self, path: str):
+        with self._lock:
+            lines = [json.dumps(s.to_dict(), default=str) for s in self.spans]
+        if lines:
+            with open(path, "a", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+
+
+# ---------- metrics ----------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                self.counts[i] += 1
+
+
+class Metrics:
+    """Process-wide counters/histograms rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, _Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = _Histogram()
+            h.observe(value)
+
+    def observe_span(self, span: Span):
+        node = span.name
+        self.inc("debugger_node_runs_total", node=node)
+        if span.error:
+            self.inc("debugger_node_errors_total", node=node)
+        self.observe("debugger_node_wall_seconds", span.wall_seconds, node=node)
+        self.inc("debugger_node_cpu_seconds_total", span.cpu_seconds, node=node)
+        for key in ("prompt_chars", "response_chars", "prompt_tokens"):
+            if key in span.attrs:
+                self.inc(f"debugger_llm_{key}_total", span.attrs[key], node=node)
+        if "subprocess_seconds" in span.attrs:
+            self.observe("debugger_subprocess_seconds", span.attrs["subprocess_seconds"], node=node)
+
+    @staticmethod
+    def _labels(labels: tuple, extra: Optional[tuple] = None) -> str:
+        items = list(labels) + list(extra or ())
+        if not items:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def prometheus_text(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            seen_types = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in seen_types:
+                    lines.append(f"# TYPE {name} counter")
+                    seen_types.add(name)
+                lines.append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items(), key=lambda kv: kv[0]):
+                if name not in seen_types:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen_types.add(name)
+                for b, c in zip(h.buckets, h.counts):
+                    lines.append(f"{name}_bucket{self._labels(labels, (('le', b),))} {c}")
+                lines.append(f"{name}_bucket{self._labels(labels, (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {h.sum}")
+                lines.append(f"{name}_count{self._labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(self.prometheus_text())
+
+
+METRICS = Metrics()
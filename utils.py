@@ -1,4 +1,6 @@
 import json
+import threading
+from collections import OrderedDict
 
 def try_parse_json(text: str):
     try:
@@ -17,3 +19,82 @@ def extract_first_code_block(text: str):
             candidate = candidate.split("\n", 1)[1] if "\n" in candidate else ""
         return candidate
     return text
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU map with hit/miss counters.
+    """
+
+    def __init__(self, max_items: int = 256):
+        self.max_items = max(0, max_items)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        if self.max_items == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "max_items": self.max_items, "hits": self.hits, "misses": self.misses}
+
+
+class Cancelled(BaseException):
+    """
+    Raised when a cooperative `cancel_event` is set. Like asyncio.CancelledError
+    it is not an Exception, so the graph nodes' broad `except Exception`
+    handlers do not swallow it.
+    """
+
+
+def call_cancellable(fn, cancel_event=None, poll: float = 0.05):
+    """
+    Return fn(). With a `cancel_event`, fn runs in a daemon thread and the
+    caller stops waiting (raising Cancelled) as soon as the event is set; the
+    abandoned call finishes in the background and its result is dropped.
+    """
+    if cancel_event is None:
+        return fn()
+    if cancel_event.is_set():
+        raise Cancelled()
+    box = {}
+    done = threading.Event()
+
+    def _target():
+        try:
+            box["value"] = fn()
+        except BaseException as e:
+            box["error"] = e
+        finally:
+            done.set()
+
+    threading.Thread(target=_target, daemon=True).start()
+    while not done.wait(poll):
+        if cancel_event.is_set():
+            raise Cancelled()
+    if "error" in box:
+        raise box["error"]
+    return box["value"]